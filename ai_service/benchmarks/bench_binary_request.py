@@ -0,0 +1,119 @@
+"""
+Benchmark for the binary /recommend request format against JSON.
+
+For each candidate count the same profile and programs are sent both ways:
+    json    - JSON body: json.loads + RecommendationRequest validation (one
+              ProgramInput per program), ProgramColumns.from_programs, scoring,
+              JSON response
+    binary  - application/x-recommend-columns body: np.frombuffer onto
+              ProgramColumns, scoring, binary response
+and it reports payload size, parse time, parse + score + serialize time, and
+end-to-end latency through the ASGI app (TestClient). Both formats must return
+the same ranked IDs and scores. The result cache is disabled throughout.
+
+Usage (from ai_service/):
+    python benchmarks/bench_binary_request.py [--sizes 1000 10000 100000] [--top-k 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from binary_format import BINARY_MEDIA_TYPE, decode_recommend_response, encode_recommend_request  # noqa: E402
+from generators import synthetic_catalog  # noqa: E402
+from main import RecommendationRequest  # noqa: E402
+from program_features import ProgramColumns  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+PROFILE = {"study_level": "Bachelor", "field_ids": [], "cgpa": 3.4, "budget": 150000, "preferred_states": []}
+
+
+def json_payload(columns: ProgramColumns, top_k: int) -> bytes:
+    programs = [
+        {"program_id": int(pid), "university_id": int(uid), "field_id": int(fid),
+         "tuition_fee": None if np.isnan(fee) else float(fee), "duration_months": int(dur), "level": str(level)}
+        for pid, uid, fid, fee, dur, level in zip(columns.program_id, columns.university_id, columns.field_id,
+                                                  columns.tuition_fee, columns.duration_months, columns.level)
+    ]
+    return json.dumps({"student_profile": PROFILE, "programs": programs, "top_k": top_k}).encode()
+
+
+def json_path(body: bytes, active):
+    # What FastAPI does for a JSON body, then the endpoint itself
+    request = RecommendationRequest.model_validate(json.loads(body))
+    parsed = time.perf_counter()
+    return parsed, main.score_recommendation(request, active).body
+
+
+def binary_path(body: bytes, active):
+    request, candidates = main.parse_binary_recommendation(body)
+    parsed = time.perf_counter()
+    return parsed, main.score_recommendation(request, active, candidates).body
+
+
+def timed(fn, body: bytes, active, repeat: int):
+    """Best-of-repeat (parse ms, total ms) and the last response body"""
+    parse, total = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed, out = fn(body, active)
+        end = time.perf_counter()
+        parse.append((parsed - start) * 1000)
+        total.append((end - start) * 1000)
+    return min(parse), min(total), out
+
+
+def http_ms(client: TestClient, body: bytes, content_type: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post("/recommend", content=body, headers={"Content-Type": content_type})
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text[:200]
+    return min(samples)
+
+
+def main_bench(sizes: list, top_k: int) -> None:
+    configure_logging(open(os.devnull, "w"))
+    main.recommend_cache = RecommendationCache(None)
+    active = main.load_model()
+    print(f"{'programs':>9} {'format':>7} {'payload KiB':>12} {'parse ms':>9} {'parse+score ms':>15} "
+          f"{'http ms':>9} {'speedup':>8}")
+    with TestClient(main.app) as client:
+        for n in sizes:
+            columns = synthetic_catalog(n, seed=7)
+            repeat = 5 if n <= 10000 else 2
+            bodies = {"json": json_payload(columns, top_k), "binary": encode_recommend_request(PROFILE, columns, top_k)}
+
+            json_parse, json_total, json_out = timed(json_path, bodies["json"], active, repeat)
+            bin_parse, bin_total, bin_out = timed(binary_path, bodies["binary"], active, repeat)
+            expected = json.loads(json_out)["recommendations"]
+            _, records = decode_recommend_response(bin_out)
+            assert records["program_id"].tolist() == [r["program_id"] for r in expected]
+            assert np.array_equal(records["score"], [r["score"] for r in expected])
+
+            json_http = http_ms(client, bodies["json"], "application/json", repeat)
+            bin_http = http_ms(client, bodies["binary"], BINARY_MEDIA_TYPE, repeat)
+            print(f"{n:>9} {'json':>7} {len(bodies['json']) / 1024:>12.1f} {json_parse:>9.2f} {json_total:>15.2f} "
+                  f"{json_http:>9.2f} {'':>8}")
+            print(f"{n:>9} {'binary':>7} {len(bodies['binary']) / 1024:>12.1f} {bin_parse:>9.2f} {bin_total:>15.2f} "
+                  f"{bin_http:>9.2f} {json_total / bin_total:>7.1f}x")
+    print("Parity OK: binary and JSON responses rank the same IDs with identical scores")
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    main_bench(args.sizes, args.top_k)
@@ -0,0 +1,101 @@
+"""
+Micro-batching benchmark for /predict-fields.
+
+Fires bursts of concurrent single-profile requests at the handler in-process,
+with the coalescer off (one predict_proba per request) and on, and reports
+throughput, mean rows per model call, p99 latency and requests rejected with
+429 by the inference pool. Also checks that the coalesced probabilities match
+the per-request ones.
+
+Usage (from ai_service/):
+    python benchmarks/bench_coalescer.py [--requests 2000] [--concurrency 1 8 32 128] [--window-ms 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from coalescer import RowCoalescer  # noqa: E402
+from generators import field_requests  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+async def run_burst(profiles: list, concurrency: int):
+    """Returns (responses with None for rejected requests, per-request latencies, wall seconds)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(profile):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await main.predict_field_interests(profile)
+            except HTTPException as e:
+                if e.status_code != 429:
+                    raise
+                return None
+            latencies.append(time.perf_counter() - start)
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(one(p) for p in profiles))
+    return responses, np.array(latencies), time.perf_counter() - start
+
+
+def model_calls() -> tuple:
+    """(predict_proba calls, rows) recorded so far for /predict-fields"""
+    entry = main.BATCH_SIZE._values.get(("predict_fields",))
+    return (sum(entry[0]), entry[1]) if entry else (0, 0.0)
+
+
+def main_bench(n_requests: int, concurrency_levels: list, window_ms: float, max_rows: int) -> None:
+    main.load_model()
+    main.field_cache.max_bytes = 0  # measure model calls, not cache hits
+    configure_logging(open(os.devnull, "w"))
+    profiles = field_requests(n_requests)
+    coalescer = RowCoalescer(
+        lambda X: main.inference_pool.run(main.coalesced_field_probabilities, X),
+        window=window_ms / 1000, max_rows=max_rows
+    )
+
+    print(f"{'concurrency':>11} {'mode':>9} {'req/s':>9} {'rows/call':>10} {'p99 ms':>8} {'rejected':>9}")
+    for concurrency in concurrency_levels:
+        baseline = None
+        for mode, field_coalescer in (("direct", None), ("coalesced", coalescer)):
+            main.field_coalescer = field_coalescer
+            asyncio.run(run_burst(profiles[:50], concurrency))  # warmup
+            calls_before, rows_before = model_calls()
+            responses, latencies, wall = asyncio.run(run_burst(profiles, concurrency))
+            calls, rows = model_calls()
+
+            probs = {i: [f["probability"] for f in json.loads(r.body)["fields"]]
+                     for i, r in enumerate(responses) if r is not None}
+            if baseline is None:
+                baseline = probs
+            else:
+                shared = probs.keys() & baseline.keys()
+                # The float32 compiled scorer may round a row differently inside a larger matmul
+                assert all(np.allclose(probs[i], baseline[i], rtol=0, atol=1e-6) for i in shared), \
+                    "coalesced probabilities differ from direct"
+            print(f"{concurrency:>11} {mode:>9} {len(probs) / wall:>9.0f} "
+                  f"{(rows - rows_before) / max(calls - calls_before, 1):>10.1f} "
+                  f"{np.percentile(latencies, 99) * 1000:>8.2f} {n_requests - len(probs):>9}")
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-rows", type=int, default=64)
+    args = parser.parse_args()
+    main_bench(args.requests, args.concurrency, args.window_ms, args.max_rows)
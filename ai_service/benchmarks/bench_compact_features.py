@@ -0,0 +1,218 @@
+"""
+Memory footprint and ranking agreement of the compact program feature store.
+
+For seeded synthetic catalogs (100k+ programs) reports the memory the
+program-side features take in each representation:
+
+    ProgramInput      Pydantic objects, one per program (tracemalloc)
+    row lists         program_features() rows as Python lists of floats (tracemalloc)
+    float64 / float32 the dense N x 30 PROGRAM_FEATURES block
+    logits            decomposed scoring's cached program logits (float32, N x n_outputs)
+    compact           CompactProgramFeatures (uint8 one-hot positions, fixed-point ratios)
+
+The Python-object representations are measured on --object-sample programs
+and scaled to N.
+
+Both the logits and the compact store are held on top of the catalog columns,
+so the real per-worker cost of each mode is columns + logits or columns +
+compact. That footprint is reported per process and with SHARED_DATA_DIR,
+where the columns, logits and compact arrays are mapped from the shared store
+and a worker's private copy is whatever is not memory-mapped.
+
+Then checks the compact store against the float32 path (build_feature_matrix
++ LinearScorer.predict_proba) for seeded profiles over the whole catalog: the
+largest dequantization and score differences, and the top-K overlap (share
+of the float32 top K also in the compact top K). Through /recommend it checks
+that RECOMMEND_SCORING=compact returns the same ranking for a program whether
+it is referenced from the catalog or sent inline.
+
+Timing: program-only logits of N candidate rows from the compact store
+against gathering them from the cached logits, and the one-off build cost of
+each.
+
+Usage (from ai_service/):
+    python benchmarks/bench_compact_features.py [--programs 100000 250000] [--profiles 100] [--top-k 10 100]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from catalog import ProgramCatalog  # noqa: E402
+from compact_features import CompactFeatureCache, CompactProgramFeatures  # noqa: E402
+from compiled_scorer import compile_scorer  # noqa: E402
+from decomposed_scoring import ProgramLogitsCache, decomposed_predict_proba, program_logits  # noqa: E402
+from generators import program_inputs, student_profiles, synthetic_catalog  # noqa: E402
+from main import RecommendationRequest  # noqa: E402
+from program_features import build_feature_matrix, program_features  # noqa: E402
+from ranking import top_k_indices  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+from shared_store import SharedStore  # noqa: E402
+
+MiB = 1024 ** 2
+
+
+def traced_bytes(build) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()  # noqa: F841 (held until measured)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def report_memory(scorer, columns, store: CompactProgramFeatures, object_sample: int) -> None:
+    n = len(columns)
+    sample = min(n, object_sample)
+    per_object = traced_bytes(lambda: program_inputs(sample, seed=20)) / sample
+    sample_block = program_features(columns.take(np.arange(sample)))
+    per_row_list = traced_bytes(lambda: sample_block.tolist()) / sample
+    block = program_features(columns)
+    sizes = [
+        ("ProgramInput", per_object * n),
+        ("row lists", per_row_list * n),
+        ("float64", block.nbytes),
+        ("float32", block.astype(np.float32).nbytes),
+        ("logits", program_logits(scorer, columns).nbytes),
+        ("compact", store.nbytes),
+    ]
+    print(f"{n} programs ({store.nbytes / n:.1f} B/program compact, {len(store.outlier_rows)} outlier rows)")
+    print(f"{'layout':>13} {'MiB':>9} {'B/program':>10} {'vs compact':>11}")
+    for name, size in sizes:
+        print(f"{name:>13} {size / MiB:>9.2f} {size / n:>10.1f} {size / store.nbytes:>10.1f}x")
+
+
+def column_arrays(columns) -> list:
+    return [columns.program_id, columns.university_id, columns.field_id, columns.tuition_fee,
+            columns.duration_months, columns.level_idx, columns.level_codes, columns.state_codes]
+
+
+def private_bytes(arrays: list) -> int:
+    """Bytes of the arrays a worker holds itself (memory-mapped arrays live once in the page cache)"""
+    return sum(a.nbytes for a in arrays if not isinstance(a, np.memmap))
+
+
+def report_worker_footprint(scorer, token: str, columns) -> None:
+    n = len(columns)
+    per_process = column_arrays(columns)
+    logits = program_logits(scorer, columns)
+    compact = CompactProgramFeatures.from_columns(columns)
+    with tempfile.TemporaryDirectory() as root:
+        store = SharedStore(root)
+        catalog = store.publish_catalog(columns, source="bench")
+        shared_logits = ProgramLogitsCache(store).get(catalog, scorer, token)
+        shared_compact = CompactFeatureCache(store).get(catalog)
+        shared = column_arrays(catalog.columns)
+        rows = [
+            ("per-process", private_bytes(per_process + [logits]),
+             private_bytes(per_process + [getattr(compact, a) for a in compact.ARRAYS])),
+            ("shared", private_bytes(shared + [shared_logits]),
+             private_bytes(shared + [getattr(shared_compact, a) for a in shared_compact.ARRAYS])),
+        ]
+    print(f"Private bytes per worker for {n} programs (catalog columns {private_bytes(per_process) / MiB:.2f} MiB "
+          f"held in both modes):")
+    print(f"{'state':>12} {'columns+logits MiB':>19} {'columns+compact MiB':>20}")
+    for name, with_logits, with_compact in rows:
+        print(f"{name:>12} {with_logits / MiB:>19.2f} {with_compact / MiB:>20.2f}")
+
+
+def check_agreement(scorer, columns, store: CompactProgramFeatures, n_profiles: int, top_ks: list) -> None:
+    dequantization = float(np.abs(store.dense() - program_features(columns)).max())
+    compact_logits = store.program_logits(scorer)
+    max_diff = 0.0
+    overlaps = {k: [] for k in top_ks}
+    for profile in student_profiles(n_profiles, seed=21):
+        expected = scorer.predict_proba(build_feature_matrix(profile, columns))[:, 1]
+        scores = decomposed_predict_proba(scorer, profile, columns, compact_logits)[:, 1]
+        max_diff = max(max_diff, float(np.abs(scores - expected).max()))
+        for k in top_ks:
+            shared = np.intersect1d(top_k_indices(scores, k), top_k_indices(expected, k))
+            overlaps[k].append(len(shared) / k)
+    print(f"Max dequantization error {dequantization:.2e}, max score diff vs float32 {max_diff:.2e} "
+          f"({n_profiles} profiles, every program)")
+    for k in top_ks:
+        print(f"  top {k:<4} overlap mean {np.mean(overlaps[k]):.4f}  min {np.min(overlaps[k]):.2f}")
+
+
+def check_endpoint(active, n_programs: int) -> None:
+    inputs = program_inputs(n_programs, seed=22)
+    main.catalog = ProgramCatalog(synthetic_catalog(n_programs, seed=22), version=1, source="bench")
+    main.RECOMMEND_SCORING = "compact"
+    for profile in student_profiles(20, seed=23):
+        ids = [p.program_id for p in inputs if p.level == profile.study_level][:200]
+        by_id = {p.program_id: p for p in inputs}
+        catalog_body = main.score_recommendation(
+            RecommendationRequest(student_profile=profile, program_ids=ids, top_k=10), active).body
+        inline_body = main.score_recommendation(
+            RecommendationRequest(student_profile=profile, programs=[by_id[i] for i in ids], top_k=10), active).body
+        assert json.loads(catalog_body)["recommendations"] == json.loads(inline_body)["recommendations"], \
+            "compact scoring differs between catalog and inline candidates"
+    main.RECOMMEND_SCORING = "decomposed"
+    print("Parity OK: RECOMMEND_SCORING=compact ranks catalog and inline candidates identically")
+
+
+def best_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+
+def bench(scorer, columns, sizes: list) -> None:
+    build_logits = best_ms(lambda: program_logits(scorer, columns), 3)
+    build_compact = best_ms(lambda: CompactProgramFeatures.from_columns(columns), 3)
+    partial = program_logits(scorer, columns)
+    store = CompactProgramFeatures.from_columns(columns)
+    print(f"Build for {len(columns)} programs: logits {build_logits:.1f} ms, compact {build_compact:.1f} ms")
+
+    rng = np.random.default_rng(24)
+    print(f"{'rows':>9} {'logits gather ms':>17} {'compact ms':>11}")
+    for n in sizes:
+        rows = np.sort(rng.choice(len(columns), min(n, len(columns)), replace=False))
+        repeat = 20 if n <= 10000 else 5
+        gather = best_ms(lambda: partial[rows], repeat)
+        compact = best_ms(lambda: store.program_logits(scorer, rows), repeat)
+        print(f"{len(rows):>9} {gather:>17.3f} {compact:>11.3f}")
+
+
+def main_bench(program_counts: list, n_profiles: int, top_ks: list, object_sample: int, sizes: list) -> None:
+    configure_logging(open(os.devnull, "w"))
+    main.recommend_cache = RecommendationCache(None)
+    active = main.load_model()
+    check_endpoint(active, 2000)
+    # The float32 path is the reference, whatever COMPILED_SCORER_DTYPE serves
+    scorer = compile_scorer(active.estimator, "float32")
+    for n in program_counts:
+        columns = synthetic_catalog(n, seed=25)
+        store = CompactProgramFeatures.from_columns(columns)
+        print()
+        report_memory(scorer, columns, store, object_sample)
+        report_worker_footprint(scorer, f"{active.version}:compiled-{scorer.dtype}", columns)
+        check_agreement(scorer, columns, store, n_profiles, top_ks)
+    print()
+    bench(scorer, synthetic_catalog(max(program_counts), seed=25), sizes)
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--programs", type=int, nargs="+", default=[100000, 250000])
+    parser.add_argument("--profiles", type=int, default=100)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--object-sample", type=int, default=20000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    main_bench(args.programs, args.profiles, args.top_k, args.object_sample, args.sizes)
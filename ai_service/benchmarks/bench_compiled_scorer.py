@@ -0,0 +1,113 @@
+"""
+Parity check and microbenchmark for the compiled NumPy scorer.
+
+Checks LinearScorer.predict_proba against sklearn's predict_proba for the
+bundled multinomial model (on program feature matrices, encoded field
+profiles and random inputs) and for binary (sigmoid and multinomial) and
+one-vs-rest models fitted on synthetic data, then times single-row and batched scoring.
+
+Usage (from ai_service/):
+    python benchmarks/bench_compiled_scorer.py [--sizes 1 100 1000 10000 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from compiled_scorer import LinearScorer, compile_scorer  # noqa: E402
+from field_prediction import encode_field_profiles  # noqa: E402
+from generators import field_requests, program_inputs, student_profiles  # noqa: E402
+from program_features import ProgramColumns, build_feature_matrix  # noqa: E402
+
+# float32 weights and activations: probabilities agree to ~1e-6
+TOLERANCE = {"float64": 1e-12, "float32": 1e-5}
+
+
+def bundled_inputs() -> dict:
+    program_X = np.vstack([
+        build_feature_matrix(profile, ProgramColumns.from_programs(program_inputs(50, seed=i)))
+        for i, profile in enumerate(student_profiles(100, seed=0))
+    ])
+    field_X = encode_field_profiles(field_requests(2000, seed=0))
+    random_X = np.random.default_rng(0).normal(0, 2, (5000, model.n_features_in_))
+    return {"program features": program_X, "field profiles": field_X, "random": random_X}
+
+
+def synthetic_models() -> dict:
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 20))
+    y_binary = (X[:, 0] + X[:, 1] > 0).astype(int)
+    y_multi = np.digitize(X[:, 0] + 0.5 * X[:, 2], [-1, 0, 1])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return {
+            "binary": (LogisticRegression().fit(X, y_binary), X),
+            "binary (multinomial)": (LogisticRegression(multi_class="multinomial").fit(X, y_binary), X),
+            "ovr (liblinear)": (LogisticRegression(solver="liblinear").fit(X, y_multi), X),
+            "ovr (multi_class)": (LogisticRegression(multi_class="ovr").fit(X, y_multi), X),
+        }
+
+
+def check_parity() -> None:
+    cases = [("bundled model / " + name, model, X) for name, X in bundled_inputs().items()]
+    cases += [(name, estimator, X) for name, (estimator, X) in synthetic_models().items()]
+    for name, estimator, X in cases:
+        expected = estimator.predict_proba(X)
+        for dtype, tolerance in TOLERANCE.items():
+            scorer = compile_scorer(estimator, dtype)
+            assert isinstance(scorer, LinearScorer)
+            probs = scorer.predict_proba(X)
+            diff = float(np.abs(probs - expected).max())
+            assert probs.shape == expected.shape and diff < tolerance, f"{name} {dtype}: max diff {diff:.2e}"
+            argmax_agree = float((probs.argmax(axis=1) == expected.argmax(axis=1)).mean())
+            print(f"Parity OK: {name:<32} {dtype}  max diff {diff:.2e}  argmax agreement {argmax_agree:.4%}")
+
+    tree = DecisionTreeClassifier().fit([[0], [1]], [0, 1])
+    assert compile_scorer(tree) is tree, "unsupported estimators must fall back to sklearn"
+    odd = synthetic_models()["binary"][0]
+    odd.coef_, odd.intercept_ = np.vstack([odd.coef_] * 3), np.r_[odd.intercept_, odd.intercept_, odd.intercept_]
+    assert compile_scorer(odd) is odd, "coefficient shapes the scorer cannot reproduce must fall back to sklearn"
+    print("Fallback OK: unsupported estimator served through sklearn")
+
+
+def per_call_us(fn, X: np.ndarray, min_seconds: float = 0.2) -> float:
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+
+def bench(sizes: list) -> None:
+    scorers = {
+        "sklearn": model,
+        "compiled f64": compile_scorer(model, "float64"),
+        "compiled f32": compile_scorer(model, "float32"),
+    }
+    rng = np.random.default_rng(2)
+    print(f"{'rows':>8} " + " ".join(f"{name + ' (us)':>18}" for name in scorers) + f" {'f32 speedup':>12}")
+    for n in sizes:
+        X = rng.normal(size=(n, model.n_features_in_)).astype(np.float32)
+        timings = [per_call_us(scorer.predict_proba, X) for scorer in scorers.values()]
+        print(f"{n:>8} " + " ".join(f"{t:>18.1f}" for t in timings) + f" {timings[0] / timings[-1]:>11.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    model = main.load_model().estimator
+    check_parity()
+    bench(args.sizes)
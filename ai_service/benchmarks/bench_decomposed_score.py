@@ -0,0 +1,134 @@
+"""
+Parity check and benchmark for decomposed /recommend scoring.
+
+Parity: for seeded profiles over a synthetic catalog, the decomposed
+probabilities (cached program-only logits + request terms) must match
+LinearScorer.predict_proba on the full feature matrix and sklearn's
+predict_proba, for float32 and float64 scorers, and rank the same top K
+(ties and near-ties may swap, so the ranked score sequences are compared).
+The /recommend handler must also return the same ranking with
+RECOMMEND_SCORING=decomposed and full.
+
+Timing: per-request scoring of N catalog candidates, full (build_feature_matrix
++ predict_proba) against decomposed (gather + request terms + softmax), plus
+the one-off cost of computing the program logits of the whole catalog.
+
+Usage (from ai_service/):
+    python benchmarks/bench_decomposed_score.py [--catalog 100000] [--sizes 100 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from catalog import ProgramCatalog  # noqa: E402
+from compiled_scorer import compile_scorer  # noqa: E402
+from decomposed_scoring import decomposed_predict_proba, program_logits  # noqa: E402
+from generators import student_profiles, synthetic_catalog  # noqa: E402
+from main import RecommendationRequest  # noqa: E402
+from program_features import build_feature_matrix  # noqa: E402
+from ranking import top_k_indices  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+# Against the full path with the same scorer: only the order of the float sums differs
+TOLERANCE = {"float64": 1e-12, "float32": 1e-5}
+# Against sklearn's float64 predict_proba
+SKLEARN_TOLERANCE = {"float64": 1e-12, "float32": 1e-5}
+
+
+def check_parity(estimator, n_programs: int, n_profiles: int, top_k: int) -> None:
+    columns = synthetic_catalog(n_programs, seed=3)
+    rng = np.random.default_rng(4)
+    for dtype, tolerance in TOLERANCE.items():
+        scorer = compile_scorer(estimator, dtype)
+        partial = program_logits(scorer, columns)
+        max_diff = max_sklearn_diff = 0.0
+        for profile in student_profiles(n_profiles, seed=5):
+            rows = np.sort(rng.choice(n_programs, int(rng.integers(1, n_programs)), replace=False))
+            candidates = columns.take(rows)
+            X = build_feature_matrix(profile, candidates)
+            expected = scorer.predict_proba(X)
+            probs = decomposed_predict_proba(scorer, profile, candidates, partial[rows])
+            max_diff = max(max_diff, float(np.abs(probs - expected).max()))
+            max_sklearn_diff = max(max_sklearn_diff, float(np.abs(probs - estimator.predict_proba(X)).max()))
+
+            scores, expected_scores = probs[:, 1], expected[:, 1]
+            ranked, expected_ranked = top_k_indices(scores, top_k), top_k_indices(expected_scores, top_k)
+            assert np.allclose(expected_scores[ranked], expected_scores[expected_ranked], rtol=0, atol=tolerance), \
+                f"{dtype}: top {top_k} differs beyond near-ties"
+        assert max_diff < tolerance, f"{dtype}: max diff {max_diff:.2e} vs full predict_proba"
+        assert max_sklearn_diff < SKLEARN_TOLERANCE[dtype], f"{dtype}: max diff {max_sklearn_diff:.2e} vs sklearn"
+        print(f"Parity OK: {dtype}  {n_profiles} profiles, max diff {max_diff:.2e} vs full predict_proba, "
+              f"{max_sklearn_diff:.2e} vs sklearn; top {top_k} agree")
+
+
+def check_endpoint(active, n_programs: int, top_k: int) -> None:
+    main.catalog = ProgramCatalog(synthetic_catalog(n_programs, seed=6), version=1, source="bench")
+    for field_id, profile in enumerate(student_profiles(20, seed=8), start=1):
+        request = RecommendationRequest(student_profile=profile, field_id=field_id, top_k=top_k)
+        ranked = {}
+        for mode in ("full", "decomposed"):
+            main.RECOMMEND_SCORING = mode
+            ranked[mode] = json.loads(main.score_recommendation(request, active).body)["recommendations"]
+        # Same ranked score sequence: only near-ties may swap program IDs
+        assert np.allclose([r["score"] for r in ranked["decomposed"]], [r["score"] for r in ranked["full"]],
+                           rtol=0, atol=TOLERANCE["float32"]), f"field {field_id}: decomposed top K differs"
+    main.RECOMMEND_SCORING = "decomposed"
+    print("Parity OK: /recommend ranks the same top K with RECOMMEND_SCORING=decomposed and full")
+
+
+def best_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+
+def bench(scorer, n_catalog: int, sizes: list) -> None:
+    columns = synthetic_catalog(n_catalog, seed=9)
+    precompute = best_ms(lambda: program_logits(scorer, columns), 3)
+    partial = program_logits(scorer, columns)
+    print(f"Program logits for {n_catalog} programs: {precompute:.2f} ms once per catalog/model version, "
+          f"{partial.nbytes / 1024 ** 2:.1f} MiB")
+
+    profile = student_profiles(1, seed=10)[0]
+    rng = np.random.default_rng(11)
+    print(f"{'programs':>9} {'full ms':>9} {'decomposed ms':>14} {'speedup':>8}")
+    for n in sizes:
+        rows = np.sort(rng.choice(n_catalog, min(n, n_catalog), replace=False))
+        candidates = columns.take(rows)
+        repeat = 20 if n <= 10000 else 5
+        full = best_ms(lambda: scorer.predict_proba(build_feature_matrix(profile, candidates))[:, 1], repeat)
+        decomposed = best_ms(
+            lambda: decomposed_predict_proba(scorer, profile, candidates, partial[rows])[:, 1], repeat
+        )
+        print(f"{len(rows):>9} {full:>9.3f} {decomposed:>14.3f} {full / decomposed:>7.1f}x")
+
+
+def main_bench(n_catalog: int, sizes: list, top_k: int) -> None:
+    configure_logging(open(os.devnull, "w"))
+    main.recommend_cache = RecommendationCache(None)
+    active = main.load_model()
+    check_parity(active.estimator, 5000, 200, top_k)
+    check_endpoint(active, 20000, top_k)
+    bench(active.scorer, n_catalog, sizes)
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog", type=int, default=100000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    main_bench(args.catalog, args.sizes, args.top_k)
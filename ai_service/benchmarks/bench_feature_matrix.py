@@ -0,0 +1,70 @@
+"""
+Parity check and benchmark for the batched /recommend feature path.
+
+Compares extract_features() + per-row predict_proba against
+build_feature_matrix() + a single predict_proba call.
+
+Usage (from ai_service/):
+    python benchmarks/bench_feature_matrix.py [--sizes 100 1000 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from generators import program_inputs, student_profiles  # noqa: E402
+from main import StudentProfile, extract_features  # noqa: E402
+from program_features import ProgramColumns, build_feature_matrix  # noqa: E402
+
+def check_parity(trials: int = 200, n: int = 50) -> None:
+    """Feature rows must be bit-identical; scores may differ only by BLAS summation order"""
+    max_score_diff = 0.0
+    for trial, profile in enumerate(student_profiles(trials, seed=0)):
+        programs = program_inputs(n, seed=trial)
+
+        batch_X = build_feature_matrix(profile, ProgramColumns.from_programs(programs))
+        row_X = np.vstack([extract_features(profile, p) for p in programs])
+        assert batch_X.dtype == row_X.dtype == np.float32
+        assert np.array_equal(batch_X, row_X), "feature matrix differs from extract_features()"
+
+        batch_scores = model.predict_proba(batch_X)[:, 1]
+        row_scores = np.array([model.predict_proba(row_X[i:i + 1])[0][1] for i in range(n)])
+        max_score_diff = max(max_score_diff, float(np.abs(batch_scores - row_scores).max()))
+    assert max_score_diff < 1e-12, f"score drift {max_score_diff}"
+    print(f"Parity OK: {trials} trials x {n} programs, features identical, "
+          f"max score diff {max_score_diff:.2e}")
+
+
+def bench(sizes: list) -> None:
+    profile = StudentProfile(study_level="Bachelor", field_ids=[1], cgpa=3.2, budget=50000)
+    print(f"{'programs':>10} {'per-row (ms)':>14} {'batched (ms)':>14} {'speedup':>9}")
+    for n in sizes:
+        programs = program_inputs(n, seed=1)
+
+        start = time.perf_counter()
+        for p in programs:
+            model.predict_proba(extract_features(profile, p))[0][1]
+        per_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns = ProgramColumns.from_programs(programs)
+        model.predict_proba(build_feature_matrix(profile, columns))[:, 1]
+        batched = time.perf_counter() - start
+
+        print(f"{n:>10} {per_row * 1000:>14.2f} {batched * 1000:>14.2f} {per_row / batched:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    model = main.load_model().estimator
+    check_parity()
+    bench(args.sizes)
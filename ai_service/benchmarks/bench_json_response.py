@@ -0,0 +1,154 @@
+"""
+Benchmark for /recommend and /predict-fields/batch response serialization.
+
+Compares, for the same ranked results:
+    pydantic  - the previous path: one ProgramRecommendation / FieldPrediction
+                model per item, then FastAPI's response_model validation and
+                serialization and JSONResponse rendering
+    fast      - the current path: dicts built from the id/score arrays and
+                dumped in one call (json_response.dumps; orjson when installed)
+    stdlib    - the fast path with the standard json module (the fallback
+                when orjson is not installed)
+after checking that all three produce the same JSON document (same keys in
+the same order, same values), and that the routes still document their
+response models in the OpenAPI schema.
+
+Usage (from ai_service/):
+    python benchmarks/bench_json_response.py [--recommendations 100 1000 10000 100000] [--profiles 100 1000 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_response  # noqa: E402
+import main  # noqa: E402
+from field_prediction import rank_field_probabilities  # noqa: E402
+from main import (  # noqa: E402
+    ConstraintStats, FieldPrediction, FieldPredictionBatchResponse, FieldPredictionResponse, ProgramRecommendation,
+    RecommendationResponse
+)
+
+STATS = {"candidates": 0, "passed": 0, "rejected_by": {"level": 0, "field": 0, "budget": 0, "location": 0}}
+VERSION = "best_logistic_regression_model-0123456789ab"
+
+
+def route(path: str):
+    return next(r for r in main.app.routes if getattr(r, "path", None) == path)
+
+
+def pydantic_body(path: str, content) -> bytes:
+    """Serialize content the way FastAPI does for a route returning a model"""
+    r = route(path)
+    serialized = asyncio.run(serialize_response(
+        field=r.response_field, response_content=content, exclude_none=r.response_model_exclude_none
+    ))
+    return JSONResponse(serialized).body
+
+
+def previous_recommendation(ids: np.ndarray, scores: np.ndarray) -> bytes:
+    response = RecommendationResponse(
+        recommendations=[ProgramRecommendation(program_id=int(i), score=float(s)) for i, s in zip(ids, scores)],
+        constraint_stats=ConstraintStats(**STATS), catalog_version=None, model_version=VERSION
+    )
+    return pydantic_body("/recommend", response)
+
+
+def fast_recommendation(ids: np.ndarray, scores: np.ndarray) -> bytes:
+    return json_response.dumps({
+        "recommendations": json_response.recommendation_items(ids, scores),
+        "constraint_stats": STATS, "catalog_version": None, "model_version": VERSION,
+    })
+
+
+def previous_field_batch(probs: np.ndarray) -> bytes:
+    results = [
+        FieldPredictionResponse(fields=[FieldPrediction(field_name=n, probability=p) for n, p in ranked])
+        for ranked in rank_field_probabilities(probs)
+    ]
+    return pydantic_body("/predict-fields/batch", FieldPredictionBatchResponse(results=results, model_version=VERSION))
+
+
+def fast_field_batch(probs: np.ndarray) -> bytes:
+    results = [{"fields": json_response.field_items(ranked)} for ranked in rank_field_probabilities(probs)]
+    return json_response.dumps({"results": results, "model_version": VERSION})
+
+
+def stdlib(fn):
+    def wrapped(*args):
+        orjson, json_response.orjson = json_response.orjson, None
+        try:
+            return fn(*args)
+        finally:
+            json_response.orjson = orjson
+    return wrapped
+
+
+def same_document(a: bytes, b: bytes) -> bool:
+    # object_pairs_hook keeps key order, so reordered keys also count as a difference
+    return json.loads(a, object_pairs_hook=list) == json.loads(b, object_pairs_hook=list)
+
+
+def per_call_ms(fn, *args, min_seconds: float = 0.3) -> float:
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(*args)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1000
+
+
+def compare(label: str, sizes: list, make_args, previous, fast) -> None:
+    print(f"{label:>16} {'pydantic ms':>12} {'fast ms':>9} {'stdlib ms':>10} {'KiB':>8} {'speedup':>8}")
+    for n in sizes:
+        args = make_args(n)
+        expected = previous(*args)
+        assert same_document(expected, fast(*args)) and same_document(expected, stdlib(fast)(*args)), \
+            f"fast serialization differs from the response models ({label} = {n})"
+        old, new, std = (per_call_ms(fn, *args) for fn in (previous, fast, stdlib(fast)))
+        print(f"{n:>16} {old:>12.3f} {new:>9.3f} {std:>10.3f} {len(expected) / 1024:>8.1f} {old / new:>7.1f}x")
+
+
+def check_openapi() -> None:
+    # The routes keep their response_model declarations, so the documented schemas are the models'
+    schemas = main.app.openapi()["components"]["schemas"]
+    for path, model in (("/recommend", RecommendationResponse), ("/predict-fields", FieldPredictionResponse),
+                        ("/predict-fields/batch", FieldPredictionBatchResponse)):
+        assert route(path).response_model is model, f"{path} no longer declares {model.__name__}"
+        assert list(schemas[model.__name__]["properties"]) == list(model.model_fields)
+    print("OpenAPI OK: routes still document their response models")
+
+
+def main_bench(args) -> None:
+    print(f"Serializer: {'orjson ' + json_response.orjson.__version__ if json_response.orjson else 'json (stdlib)'}")
+    check_openapi()
+    rng = np.random.default_rng(0)
+
+    def recommendations(n):
+        scores = np.sort(rng.random(n).astype(np.float32))[::-1]
+        return rng.permutation(np.arange(1, n + 1, dtype=np.int64)), scores
+
+    def profiles(n):
+        probs = rng.random((n, 14))
+        return (probs / probs.sum(axis=1, keepdims=True),)
+
+    compare("recommendations", args.recommendations, recommendations, previous_recommendation, fast_recommendation)
+    compare("profiles", args.profiles, profiles, previous_field_batch, fast_field_batch)
+    print("Parity OK: identical JSON documents from the response models and the fast path")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recommendations", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--profiles", type=int, nargs="+", default=[100, 1000, 10000])
+    main_bench(parser.parse_args())
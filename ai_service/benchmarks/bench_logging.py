@@ -0,0 +1,97 @@
+"""
+Logging overhead benchmark for /predict-fields and /recommend.
+
+Runs the endpoint handlers in-process with logs written to /dev/null and
+compares three modes:
+    quiet   - LOG_LEVEL=WARNING (no per-request events)
+    normal  - LOG_LEVEL=INFO, request sampled, no debug header
+    debug   - X-Debug-Features set (feature-vector dumps enabled)
+
+Usage (from ai_service/):
+    python benchmarks/bench_logging.py [--iterations 2000] [--programs 500]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from main import FieldPredictionRequest, ProgramInput, RecommendationRequest, StudentProfile  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging, request_log_context  # noqa: E402
+
+MODES = {
+    "quiet": dict(level=logging.WARNING, debug=False),
+    "normal": dict(level=logging.INFO, debug=False),
+    "debug": dict(level=logging.INFO, debug=True),
+}
+
+
+def field_request() -> FieldPredictionRequest:
+    return FieldPredictionRequest(
+        study="SPM",
+        extracurricular=True,
+        grades={"Mathematics": "A", "ICT": "B", "English": "C"},
+        subject_taken={"Took_Mathematics": 1, "Took_ICT": 1},
+        interests={"Computer_Interest": 5, "Maths_Interest": 4},
+        skills={"Logical": 4, "Problem_Solving": 5},
+    )
+
+
+def recommend_request(n_programs: int) -> RecommendationRequest:
+    return RecommendationRequest(
+        student_profile=StudentProfile(study_level="Bachelor", field_ids=[1], cgpa=3.2, budget=50000),
+        programs=[
+            ProgramInput(program_id=i, university_id=i % 90 + 1, field_id=1, tuition_fee=20000 + i * 10,
+                         duration_months=36, level="Bachelor")
+            for i in range(1, n_programs + 1)
+        ],
+        top_k=5,
+    )
+
+
+def run(handler, request, iterations: int, debug: bool) -> float:
+    """Mean handler latency in microseconds"""
+    async def loop():
+        with request_log_context(sampled=True, debug_features=debug):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await handler(request)
+            return time.perf_counter() - start
+    return asyncio.run(loop()) / iterations * 1e6
+
+
+def main_bench(iterations: int, n_programs: int) -> None:
+    main.load_model()
+    # The same requests are sent repeatedly; measure the full path, not cache hits
+    main.field_cache.max_bytes = 0
+    main.recommend_cache = RecommendationCache(None)
+    cases = [
+        ("/predict-fields", main.predict_field_interests, field_request(), iterations),
+        (f"/recommend ({n_programs} programs)", main.get_recommendations, recommend_request(n_programs),
+         max(iterations // 10, 1)),
+    ]
+
+    with open(os.devnull, "w") as sink:
+        logger = configure_logging(sink)
+        print(f"{'endpoint':<28} " + " ".join(f"{mode + ' (us)':>14}" for mode in MODES))
+        for name, handler, request, n in cases:
+            timings = []
+            for mode in MODES.values():
+                logger.setLevel(mode["level"])
+                run(handler, request, max(n // 10, 1), mode["debug"])  # warmup
+                timings.append(run(handler, request, n, mode["debug"]))
+            print(f"{name:<28} " + " ".join(f"{t:>14.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--programs", type=int, default=500)
+    args = parser.parse_args()
+    main_bench(args.iterations, args.programs)
@@ -0,0 +1,108 @@
+"""
+Benchmark for the /predict-fields preprocessing artifact.
+
+Checks that:
+    - the artifact next to the bundled model loads and round-trips through save()
+    - FieldPreprocessor.transform() is bit-identical to the previous per-block
+      encoder (interests/skills (x - 3) / 1.2, grades (x - 2.5) / 1.5)
+    - single-profile and batch encodings of the same profiles agree
+    - the library helper predict_field_interests() ranks exactly like /predict-fields
+then times the previous encoder against transform() for several batch sizes.
+
+Usage (from ai_service/):
+    python benchmarks/bench_preprocessing.py [--sizes 1 100 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from field_prediction import (  # noqa: E402
+    GRADE_COLS, GRADE_MAPPING, INTEREST_COLS, SKILL_COLS, SUBJECT_TAKEN_COLS, FieldPreprocessor,
+    predict_field_interests, preprocessing_path
+)
+from generators import field_requests  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+
+def previous_encoder(profiles) -> np.ndarray:
+    """The block-by-block encoder the service used before the artifact"""
+    interests = np.array([[p.interests.get(c, 3) for c in INTEREST_COLS] for p in profiles], dtype=np.float64)
+    skills = np.array([[p.skills.get(c, 3) for c in SKILL_COLS] for p in profiles], dtype=np.float64)
+    taken = np.array([[p.subject_taken.get(c, 0) for c in SUBJECT_TAKEN_COLS] for p in profiles], dtype=np.float64)
+    grades = np.array(
+        [[GRADE_MAPPING.get(p.grades.get(c, '0'), 0) for c in GRADE_COLS] for p in profiles], dtype=np.float64
+    )
+    study = np.array([{'SPM': [1, 0], 'STPM': [0, 1]}.get(p.study, [1, 0]) for p in profiles], dtype=np.float64)
+    extra = np.array([[1 if p.extracurricular else 0] for p in profiles], dtype=np.float64)
+    return np.hstack([(interests - 3.0) / 1.2, (skills - 3.0) / 1.2, taken, (grades - 2.5) / 1.5, study, extra])
+
+
+def check_parity(preprocessor: FieldPreprocessor) -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "copy.preprocessing.json")
+        preprocessor.save(path)
+        reloaded = FieldPreprocessor.load(path)
+    assert reloaded.feature_columns == preprocessor.feature_columns
+    assert reloaded.field_classes == preprocessor.field_classes
+    assert np.array_equal(reloaded.mean, preprocessor.mean) and np.array_equal(reloaded.std, preprocessor.std)
+
+    profiles = field_requests(2000, seed=4)
+    batch = preprocessor.transform(profiles)
+    assert np.array_equal(batch, previous_encoder(profiles)), "artifact encoding differs from the previous encoder"
+    single = np.vstack([preprocessor.transform([p]) for p in profiles[:200]])
+    assert np.array_equal(single, batch[:200]), "single and batch encodings differ"
+
+    active = main.load_model()
+    for profile in profiles[:50]:
+        response = asyncio.run(main.predict_field_interests(profile))
+        expected = [(f["field_name"], f["probability"]) for f in json.loads(response.body)["fields"]][:3]
+        helper = predict_field_interests(
+            profile.study, profile.extracurricular, profile.grades, profile.subject_taken,
+            profile.interests, profile.skills, active.scorer, top_k=3, preprocessor=active.preprocessor
+        )
+        assert [name for name, _ in helper] == [name for name, _ in expected]
+        assert np.allclose([p for _, p in helper], [p for _, p in expected], rtol=0, atol=1e-6)
+    print(f"Parity OK: artifact round-trip, previous encoder (bitwise), single vs batch, helper vs endpoint "
+          f"({len(profiles)} profiles)")
+
+
+def per_call_us(fn, profiles, min_seconds: float = 0.2) -> float:
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(profiles)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+
+def bench(preprocessor: FieldPreprocessor, sizes: list) -> None:
+    print(f"{'profiles':>9} {'previous (us)':>14} {'artifact (us)':>14} {'speedup':>8}")
+    for n in sizes:
+        profiles = field_requests(n, seed=5)
+        previous = per_call_us(previous_encoder, profiles)
+        compiled = per_call_us(preprocessor.transform, profiles)
+        print(f"{n:>9} {previous:>14.1f} {compiled:>14.1f} {previous / compiled:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    args = parser.parse_args()
+
+    configure_logging(open(os.devnull, "w"))
+    main.field_cache.max_bytes = 0
+    preprocessor = FieldPreprocessor.load(preprocessing_path(main.MODEL_PATH))
+    check_parity(preprocessor)
+    bench(preprocessor, args.sizes)
+    main.inference_pool.shutdown()
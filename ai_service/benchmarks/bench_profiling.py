@@ -0,0 +1,87 @@
+"""
+Benchmark for the on-demand request profiler.
+
+Reports:
+    - the per-request cost of the profiling decision when profiling is off
+      (Profiler.wants() over typical request headers)
+    - /recommend latency through the ASGI app without and with X-Profile: 1
+and checks that a profiled request is exported with samples from both the event
+loop thread and the inference worker, as collapsed stacks and speedscope JSON.
+
+Usage (from ai_service/):
+    python benchmarks/bench_profiling.py [--programs 1000] [--requests 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import timeit
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from generators import program_inputs, student_profiles  # noqa: E402
+from profiling import Profiler  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+HEADERS = [
+    (b"host", b"ai-service:8000"), (b"user-agent", b"python-httpx/0.27"), (b"accept", b"*/*"),
+    (b"accept-encoding", b"gzip, deflate"), (b"connection", b"keep-alive"),
+    (b"content-type", b"application/json"), (b"content-length", b"123456"),
+]
+
+
+def decision_cost() -> None:
+    profiler = Profiler()
+    calls = 200000
+    seconds = timeit.timeit(lambda: profiler.wants(HEADERS), number=calls)
+    print(f"Profiling off: decision costs {seconds / calls * 1e9:.0f} ns per request")
+
+
+def latency_ms(client: TestClient, body: dict, headers: dict, requests: int) -> float:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post("/recommend", json=body, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return statistics.median(samples)
+
+
+def main_bench(programs: int, requests: int) -> None:
+    configure_logging(open(os.devnull, "w"))
+    main.recommend_cache = RecommendationCache(None)
+    decision_cost()
+    body = {
+        "student_profile": student_profiles(1)[0].model_dump(),
+        "programs": [p.model_dump() for p in program_inputs(programs)],
+        "top_k": 10,
+    }
+    with TestClient(main.app) as client:
+        plain = latency_ms(client, body, {}, requests)
+        profiled = latency_ms(client, body, {"X-Profile": "1"}, requests)
+        print(f"/recommend ({programs} programs): {plain:.2f} ms unprofiled, {profiled:.2f} ms profiled "
+              f"(median of {requests})")
+
+        profile_id = client.post("/recommend", json=body, headers={"X-Profile": "1"}).headers["x-profile-id"]
+        collapsed = client.get(f"/admin/profiles/{profile_id}").text
+        speedscope = client.get(f"/admin/profiles/{profile_id}", params={"format": "speedscope"}).json()
+        threads = {line.split(";", 1)[0] for line in collapsed.splitlines()}
+        assert any(t.startswith("inference") for t in threads) and len(threads) >= 2, threads
+        assert "score_recommendation" in collapsed
+        assert len(speedscope["profiles"]) == len(threads)
+        print(f"Export OK: profile {profile_id} has {len(collapsed.splitlines())} stacks across threads "
+              f"{sorted(threads)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--programs", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    main_bench(args.programs, args.requests)
@@ -0,0 +1,95 @@
+"""
+Benchmark for catalog candidate selection (field + level + budget constraints).
+
+Compares the per-program Python scan used by /recommend, a NumPy mask over the
+whole catalog, and the precomputed ProgramIndex lookup, and checks that all
+three select the same rows.
+
+Usage (from ai_service/):
+    python benchmarks/bench_program_index.py [--sizes 1000 10000 100000 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import ProgramCatalog  # noqa: E402
+from constraints import BUDGET_TOLERANCE, normalize_level  # noqa: E402
+from generators import synthetic_catalog  # noqa: E402
+from program_features import ProgramColumns  # noqa: E402
+
+
+def python_scan(columns: ProgramColumns, field_id: int, study_level: str, budget: float) -> np.ndarray:
+    """Per-program scan equivalent to the /recommend constraint loop"""
+    student_level = normalize_level(study_level)
+    rows = []
+    for i, (level, fid, tuition) in enumerate(zip(columns.level, columns.field_id, columns.tuition_fee)):
+        tuition = None if np.isnan(tuition) else tuition
+        if fid != field_id:
+            continue
+        if level and normalize_level(level) != student_level:
+            continue
+        if tuition and tuition > budget * BUDGET_TOLERANCE:
+            continue
+        rows.append(i)
+    return np.array(rows, dtype=np.intp)
+
+
+def numpy_mask(columns: ProgramColumns, field_id: int, study_level: str, budget: float) -> np.ndarray:
+    """Full-catalog boolean mask"""
+    student_level = normalize_level(study_level)
+    level_norm = np.array([normalize_level(lv) for lv in columns.level], dtype=object)
+    tuition = columns.tuition_fee
+    mask = (
+        (columns.field_id == field_id)
+        & (level_norm == student_level)
+        & (np.isnan(tuition) | (tuition <= budget * BUDGET_TOLERANCE))
+    )
+    return np.flatnonzero(mask)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(sizes: list, python_limit: int) -> None:
+    query = dict(field_id=3, study_level="Bachelor", budget=60000.0)
+    print(f"{'programs':>10} {'index build':>12} {'python scan':>12} {'numpy mask':>12} {'index':>10} {'selected':>9}")
+    for n in sizes:
+        columns = synthetic_catalog(n)
+        start = time.perf_counter()
+        catalog = ProgramCatalog(columns, version=1, source="synthetic")
+        build = time.perf_counter() - start
+
+        indexed, index_time = timed(lambda: catalog.index.select(**query), repeat=20)
+        masked, mask_time = timed(lambda: numpy_mask(columns, **query), repeat=3)
+        assert np.array_equal(indexed, masked), "index selection differs from mask"
+
+        if n <= python_limit:
+            scanned, scan_time = timed(lambda: python_scan(columns, **query), repeat=1)
+            assert np.array_equal(indexed, scanned), "index selection differs from python scan"
+            scan_col = f"{scan_time * 1000:>10.2f}ms"
+        else:
+            scan_col = f"{'skipped':>12}"
+
+        print(f"{n:>10} {build * 1000:>10.2f}ms {scan_col} {mask_time * 1000:>10.2f}ms "
+              f"{index_time * 1000:>8.3f}ms {len(indexed):>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--python-limit", type=int, default=100000,
+                        help="Skip the per-program Python scan above this catalog size")
+    args = parser.parse_args()
+    main(args.sizes, args.python_limit)
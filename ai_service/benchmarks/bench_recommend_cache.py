@@ -0,0 +1,104 @@
+"""
+Benchmark for the /recommend result cache.
+
+Times score_recommendation() for catalog requests in four situations:
+    uncached  - cache disabled
+    cold      - cache enabled, nothing stored yet
+    response  - identical request repeated (response layer hit)
+    partial   - one program changed in the catalog since the last call
+                (score layer reuses every other program's score)
+and checks that every cached response equals the uncached one. Also checks
+that one cache shared by RECOMMEND_SCORING=compact and decomposed never serves
+one mode's scores to the other.
+
+Usage (from ai_service/):
+    python benchmarks/bench_recommend_cache.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from catalog import ProgramCatalog  # noqa: E402
+from generators import synthetic_catalog  # noqa: E402
+from main import RecommendationRequest, StudentProfile  # noqa: E402
+from recommendation_cache import MemoryBackend, RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+
+def as_json(response) -> dict:
+    body = response.body if hasattr(response, "body") else response.model_dump_json().encode()
+    return json.loads(body)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def set_catalog(columns, version: int) -> None:
+    main.catalog = ProgramCatalog(columns, version=version, source="synthetic")
+
+
+def check_scoring_modes(request, active, n: int) -> None:
+    set_catalog(synthetic_catalog(n), version=1)
+    shared = RecommendationCache(MemoryBackend(256 * 1024 * 1024, ttl=None))
+    for mode in ("compact", "decomposed"):
+        main.RECOMMEND_SCORING = mode
+        main.recommend_cache = RecommendationCache(None)
+        expected = as_json(main.score_recommendation(request, active))
+        main.recommend_cache = shared
+        assert as_json(main.score_recommendation(request, active)) == expected, \
+            f"{mode} request served scores cached by another scoring mode"
+    main.RECOMMEND_SCORING = "decomposed"
+    print("Parity OK: compact and decomposed scoring keep separate cache entries")
+
+
+def main_bench(sizes: list) -> None:
+    active = main.load_model()
+    configure_logging(open(os.devnull, "w"))
+    request = RecommendationRequest(
+        student_profile=StudentProfile(study_level="Bachelor", field_ids=[3], cgpa=3.2, budget=150000),
+        program_ids=None, field_id=3, top_k=10,
+    )
+    check_scoring_modes(request, active, min(sizes))
+    print(f"{'programs':>10} {'candidates':>11} {'uncached':>10} {'cold':>10} {'response':>10} {'partial':>10}")
+    for n in sizes:
+        columns = synthetic_catalog(n)
+        set_catalog(columns, version=1)
+
+        main.recommend_cache = RecommendationCache(None)
+        expected, uncached = timed(lambda: main.score_recommendation(request, active))
+        main.recommend_cache = RecommendationCache(MemoryBackend(256 * 1024 * 1024, ttl=None))
+        cold_response, cold = timed(lambda: main.score_recommendation(request, active))
+        hit_response, hit = timed(lambda: main.score_recommendation(request, active))
+        assert as_json(cold_response) == as_json(hit_response) == as_json(expected)
+
+        # Change the tuition of one candidate program and publish a new catalog version
+        changed = columns.take(np.arange(n))
+        row = int(np.flatnonzero(changed.field_id == 3)[0])
+        changed.tuition_fee[row] = 1000.0
+        set_catalog(changed, version=2)
+        partial_response, partial = timed(lambda: main.score_recommendation(request, active))
+        main.recommend_cache, cache = RecommendationCache(None), main.recommend_cache
+        assert as_json(partial_response) == as_json(main.score_recommendation(request, active))
+        main.recommend_cache = cache
+
+        candidates = as_json(expected)["constraint_stats"]["passed"]
+        print(f"{n:>10} {candidates:>11} {uncached:>8.2f}ms {cold:>8.2f}ms {hit:>8.2f}ms {partial:>8.2f}ms")
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    main_bench(args.sizes)
@@ -0,0 +1,171 @@
+"""
+Benchmark for sharing the catalog and model across uvicorn worker processes.
+
+First checks in-process that a catalog attached from the shared store selects
+the same rows, IDs and content hash as one built in memory. Then, for each
+worker count, starts `uvicorn --workers N` twice:
+    per-process - every worker parses the snapshot into its own arrays
+    shared      - SHARED_DATA_DIR set: one published copy, memory-mapped by all workers
+and reports per-worker unique memory (USS) and proportional memory (PSS,
+shared pages split between the processes mapping them).
+
+In shared mode it then replaces the catalog through one worker and checks that
+every worker reports the same catalog and model version after the next sync.
+
+Usage (from ai_service/):
+    python benchmarks/bench_shared_memory.py [--programs 200000] [--workers 1 2 4]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import ProgramCatalog  # noqa: E402
+from generators import synthetic_catalog  # noqa: E402
+from shared_store import SharedStore  # noqa: E402
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILE = "best_logistic_regression_model.pkl"
+SYNC_INTERVAL = 0.5
+
+
+def check_parity(columns, workdir: str) -> None:
+    built = ProgramCatalog(columns, version=1, source="synthetic")
+    attached = SharedStore(os.path.join(workdir, "parity")).publish_catalog(columns, source="synthetic")
+    assert attached.content_hash == built.content_hash
+    rng = np.random.default_rng(3)
+    for field_id in range(1, 21):
+        for level in ("Bachelor", "Diploma", None):
+            budget = float(rng.uniform(10000, 150000))
+            assert np.array_equal(built.index.select(field_id, level, budget),
+                                  attached.index.select(field_id, level, budget))
+    ids = rng.integers(0, len(columns) + 100, 5000).tolist()
+    (rows_a, missing_a), (rows_b, missing_b) = built.rows_for_ids(ids), attached.rows_for_ids(ids)
+    assert np.array_equal(rows_a, rows_b) and missing_a == missing_b
+    taken_a, taken_b = built.take(rows_a), attached.take(rows_b)
+    for column in ("program_id", "tuition_fee", "level_idx", "level", "university_state"):
+        assert np.array_equal(getattr(taken_a, column), getattr(taken_b, column), equal_nan=column == "tuition_fee")
+    print(f"Parity OK: attached catalog matches the in-memory one ({len(columns)} programs)")
+
+
+def write_snapshot(columns, path: str) -> None:
+    programs = [
+        {"program_id": int(pid), "university_id": int(uid), "field_id": int(fid),
+         "tuition_fee": None if np.isnan(fee) else float(fee), "duration_months": float(dur), "level": str(level)}
+        for pid, uid, fid, fee, dur, level in zip(columns.program_id, columns.university_id, columns.field_id,
+                                                  columns.tuition_fee, columns.duration_months, columns.level)
+    ]
+    with open(path, "w") as f:
+        json.dump({"programs": programs}, f)
+
+
+def request(port: int, method: str, path: str, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        payload = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    except OSError:
+        return 0, None
+    finally:
+        conn.close()
+
+
+def worker_states(port: int, workers: int, timeout: float = 120.0) -> dict:
+    """pid -> /health body, collected over fresh connections until every worker has answered"""
+    states, started = {}, time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        status, body = request(port, "GET", "/health")
+        if status == 200 and body["catalog_version"] is not None and body["model_version"] is not None:
+            states[body["worker_pid"]] = body
+            if len(states) == workers:
+                return states
+        else:
+            time.sleep(0.05)
+    raise SystemExit(f"Only {len(states)} of {workers} workers became ready within {timeout}s")
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), "pss": fields.get("Pss", 0)}
+
+
+def run(mode: str, workers: int, env: dict, port: int, update) -> None:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        states = worker_states(port, workers)
+        # Touch the catalog in every worker so mapped pages are resident
+        for _ in range(workers * 4):
+            request(port, "POST", "/recommend", {"student_profile": {"study_level": "Bachelor", "budget": 90000},
+                                                 "field_id": 3, "top_k": 5})
+        memory = [memory_kb(pid) for pid in states]
+        uss = np.mean([m["uss"] for m in memory]) / 1024
+        pss = np.mean([m["pss"] for m in memory]) / 1024
+        total = sum(m["pss"] for m in memory) / 1024
+        line = f"{mode:<12} {workers:>7} {uss:>14.1f} {pss:>14.1f} {total:>12.1f}"
+
+        if update is not None:
+            status, _ = request(port, "PUT", "/admin/catalog", {"programs": update})
+            assert status == 200, f"catalog update failed with HTTP {status}"
+            time.sleep(SYNC_INTERVAL * 3)
+            after = worker_states(port, workers)
+            versions = {(s["catalog_version"], s["model_version"]) for s in after.values()}
+            assert len(versions) == 1, f"workers disagree after update: {versions}"
+            line += f"  consistent: all {workers} workers on catalog v{versions.pop()[0]}"
+        print(line)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="bench-shared-")
+    try:
+        columns = synthetic_catalog(args.programs)
+        check_parity(columns, workdir)
+        snapshot = os.path.join(workdir, "programs.json")
+        write_snapshot(columns, snapshot)
+        update = [{"program_id": i, "university_id": 1, "field_id": 3, "level": "Bachelor"} for i in range(1, 101)]
+
+        # Model directory copy so the compiled artifact written in shared mode stays out of the repository
+        shutil.copytree(os.path.join(SERVICE_DIR, "model"), os.path.join(workdir, "model"))
+        model_path = os.path.join(workdir, "model", MODEL_FILE)
+
+        base = {**os.environ, "PROGRAM_CATALOG_PATH": snapshot, "MODEL_PATH": model_path,
+                "MODEL_WATCH_INTERVAL_SECONDS": "0", "LOG_LEVEL": "WARNING", "INFERENCE_WORKERS": "1"}
+        print(f"{'mode':<12} {'workers':>7} {'USS/worker MiB':>14} {'PSS/worker MiB':>14} {'total PSS MiB':>12}")
+        for workers in args.workers:
+            run("per-process", workers, base, args.port, None)
+            shared_dir = os.path.join(workdir, f"shared-{workers}")
+            env = {**base, "SHARED_DATA_DIR": shared_dir, "SHARED_SYNC_INTERVAL_SECONDS": str(SYNC_INTERVAL)}
+            run("shared", workers, env, args.port, update)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--programs", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8791)
+    main(parser.parse_args())
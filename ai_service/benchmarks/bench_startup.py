@@ -0,0 +1,143 @@
+"""
+Startup benchmark: import time, model load time and time to live/ready.
+
+Runs each scenario in fresh processes against a temporary copy of the model
+directory (so compiled artifacts are not written into the repository):
+    standard        - STARTUP_MODE=standard, model unpickled through sklearn
+    fast (cold)     - STARTUP_MODE=fast, no compiled artifact yet (writes one)
+    fast (artifact) - STARTUP_MODE=fast, scorer memory-mapped from the artifact
+
+For each it reports:
+    import    - seconds to `import main`
+    load      - seconds for load_model() (includes validation and warmup)
+    sklearn   - whether sklearn ended up imported
+    live      - seconds from launching uvicorn until /health/live answers
+    ready     - seconds from launching uvicorn until /health/ready returns 200
+    rss       - resident memory once ready, and the part backed by mapped files
+
+Usage (from ai_service/):
+    python benchmarks/bench_startup.py [--runs 3] [--port 8790]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILE = "best_logistic_regression_model.pkl"
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.load_model()
+print(json.dumps({"import": imported - started, "load": time.perf_counter() - imported,
+                  "sklearn": "sklearn" in sys.modules}))
+"""
+
+
+def probe(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def status(port: int, path: str) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().status
+    except OSError:
+        return 0
+    finally:
+        conn.close()
+
+
+def rss_kb(pid: int) -> tuple:
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.split()[0] if value.strip() else "0"
+    return int(fields.get("VmRSS", 0)), int(fields.get("RssFile", 0))
+
+
+def serve(env: dict, port: int, timeout: float = 60.0) -> dict:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    live = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if live is None and status(port, "/health/live") == 200:
+                live = time.perf_counter() - started
+            if live is not None and status(port, "/health/ready") == 200:
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.005)
+        if ready is None:
+            raise SystemExit(f"Server on port {port} was not ready within {timeout}s")
+        rss, rss_file = rss_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"live": live, "ready": ready, "rss": rss, "rss_file": rss_file}
+
+
+def run_scenario(env: dict, artifact: str, keep_artifact: bool, runs: int, port: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        if not keep_artifact and os.path.isdir(artifact):
+            shutil.rmtree(artifact)
+        sample = probe(env)
+        if not keep_artifact and os.path.isdir(artifact):
+            shutil.rmtree(artifact)
+        sample.update(serve(env, port))
+        samples.append(sample)
+    result = {key: statistics.median(s[key] for s in samples) for key in ("import", "load", "live", "ready",
+                                                                          "rss", "rss_file")}
+    result["sklearn"] = any(s["sklearn"] for s in samples)
+    return result
+
+
+def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        # Model directory copy (model plus preprocessing artifact)
+        shutil.copytree(os.path.join(SERVICE_DIR, "model"), os.path.join(workdir, "model"))
+        model_path = os.path.join(workdir, "model", MODEL_FILE)
+        artifact = model_path + ".compiled"
+        base = {**os.environ, "MODEL_PATH": model_path, "MODEL_WATCH_INTERVAL_SECONDS": "0", "LOG_LEVEL": "WARNING"}
+        scenarios = [
+            ("standard", {**base, "STARTUP_MODE": "standard"}, False),
+            ("fast (cold)", {**base, "STARTUP_MODE": "fast"}, False),
+            ("fast (artifact)", {**base, "STARTUP_MODE": "fast"}, True),
+        ]
+        print(f"{'scenario':<16} {'import s':>9} {'load s':>8} {'sklearn':>8} {'live s':>8} {'ready s':>8} "
+              f"{'rss MiB':>8} {'file MiB':>9}")
+        for name, env, keep_artifact in scenarios:
+            if keep_artifact and not os.path.isdir(artifact):
+                probe(env)  # the first fast load writes the artifact
+            r = run_scenario(env, artifact, keep_artifact, args.runs, args.port)
+            print(f"{name:<16} {r['import']:>9.3f} {r['load']:>8.3f} {str(r['sklearn']):>8} {r['live']:>8.3f} "
+                  f"{r['ready']:>8.3f} {r['rss'] / 1024:>8.1f} {r['rss_file'] / 1024:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per scenario (median is reported)")
+    parser.add_argument("--port", type=int, default=8790)
+    main(parser.parse_args())
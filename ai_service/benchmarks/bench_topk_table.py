@@ -0,0 +1,145 @@
+"""
+Parity check and benchmark for the materialized /recommend top-K table.
+
+Materializes a table for a seeded synthetic catalog (materialize_topk.build_table),
+writes it to a temporary directory and loads it memory-mapped. Then:
+
+    parity   for sampled on-grid field_id requests (random top_k, extra
+             field_ids, shuffled preferred_states) the materialized response
+             must be byte-identical to live scoring; off-grid profiles must
+             fall back to live scoring
+    timing   per-request latency of a table lookup against live scoring, and
+             the X-Recommend-Source header through the ASGI app
+
+Also reports the build time and the table's size on disk. The result cache is
+disabled throughout.
+
+Usage (from ai_service/):
+    python benchmarks/bench_topk_table.py [--programs 2000] [--top-k 20] [--samples 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from catalog import ProgramCatalog  # noqa: E402
+from generators import synthetic_catalog  # noqa: E402
+from main import RecommendationRequest, StudentProfile  # noqa: E402
+from materialize_topk import DEFAULT_BUDGETS, DEFAULT_CGPA, build_table  # noqa: E402
+from program_features import LEVEL_MAP  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+from topk_table import BucketGrid, TopKTable, default_state_sets, save_table  # noqa: E402
+
+
+def on_grid_request(grid: BucketGrid, top_k: int, rng: np.random.Generator) -> RecommendationRequest:
+    field_id = int(rng.choice(grid.field_ids))
+    field_ids = []
+    if rng.random() < 0.5:
+        field_ids = [field_id] + [int(f) for f in rng.choice(np.arange(1, 21), int(rng.integers(0, 3)))]
+        rng.shuffle(field_ids)
+    states = list(grid.state_sets[int(rng.integers(len(grid.state_sets)))])
+    profile = StudentProfile(
+        study_level=str(rng.choice(grid.levels)),
+        field_ids=field_ids,
+        cgpa=grid.cgpa[int(rng.integers(len(grid.cgpa)))],
+        budget=grid.budgets[int(rng.integers(len(grid.budgets)))],
+        preferred_states=states * int(rng.integers(1, 3)),
+    )
+    k = None if rng.random() < 0.1 else int(rng.integers(1, top_k + 1))
+    return RecommendationRequest(student_profile=profile, field_id=field_id, top_k=k)
+
+
+def off_grid_requests(grid: BucketGrid) -> list:
+    field_id = grid.field_ids[0]
+    profiles = [
+        StudentProfile(study_level="Bachelor", cgpa=3.37),
+        StudentProfile(study_level="Bachelor", budget=12345),
+        StudentProfile(study_level="bachelor"),
+        StudentProfile(study_level="Bachelor", field_ids=[field_id + 1]),
+        StudentProfile(study_level="Bachelor", preferred_states=grid.state_sets[-1] + ["Nowhere"]),
+    ]
+    return [RecommendationRequest(student_profile=p, field_id=field_id, top_k=5) for p in profiles] + [
+        RecommendationRequest(student_profile=StudentProfile(study_level="Bachelor"), field_id=field_id, top_k=10_000),
+        RecommendationRequest(student_profile=StudentProfile(study_level="Bachelor"), program_ids=[1, 2, 3]),
+    ]
+
+
+def per_request_us(fn, requests: list) -> float:
+    start = time.perf_counter()
+    for request in requests:
+        fn(request)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+def main_bench(n_programs: int, top_k: int, n_samples: int) -> None:
+    configure_logging(open(os.devnull, "w"))
+    main.recommend_cache = RecommendationCache(None)
+    active = main.load_model()
+    current = main.catalog = ProgramCatalog(synthetic_catalog(n_programs, seed=12), version=1, source="bench")
+    grid = BucketGrid(
+        list(LEVEL_MAP), sorted(np.unique(current.columns.field_id).tolist()), DEFAULT_CGPA, DEFAULT_BUDGETS,
+        default_state_sets(current.columns.university_state.tolist()),
+    )
+
+    started = time.perf_counter()
+    arrays = build_table(grid, top_k, active, current)
+    build_seconds = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "topk_table")
+        save_table(path, grid, top_k, *arrays, catalog_hash=current.content_hash, catalog_source=current.source,
+                   model_token=active.token, scoring=main.recommend_scoring_mode(active))
+        disk = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        main.topk_table = TopKTable.load(path)
+        print(f"Built {len(grid)} buckets (top {top_k}) for {n_programs} programs in {build_seconds:.1f}s, "
+              f"{disk / 1024 ** 2:.1f} MiB on disk")
+
+        rng = np.random.default_rng(13)
+        requests = [on_grid_request(grid, top_k, rng) for _ in range(n_samples)]
+        served = 0
+        for request in requests:
+            response = main.materialized_recommendation(request, active)
+            if response is None:
+                continue  # asked for more than the bucket holds
+            served += 1
+            live = main.score_recommendation(request, active)
+            assert response.body == live.body, f"materialized response differs from live for {request}"
+        for request in off_grid_requests(grid):
+            assert main.materialized_recommendation(request, active) is None, f"off-grid request served: {request}"
+        print(f"Parity OK: {served}/{n_samples} on-grid requests served from the table, byte-identical to live; "
+              f"off-grid requests scored live")
+
+        hits = [r for r in requests if main.materialized_recommendation(r, active) is not None]
+        lookup_us = per_request_us(lambda r: main.materialized_recommendation(r, active), hits)
+        live_us = per_request_us(lambda r: main.score_recommendation(r, active), hits)
+        print(f"{'path':>13} {'us/request':>11}")
+        print(f"{'materialized':>13} {lookup_us:>11.1f}")
+        print(f"{'live':>13} {live_us:>11.1f}  ({live_us / lookup_us:.0f}x)")
+
+        with TestClient(main.app) as client:
+            main.catalog = current
+            sources = [
+                client.post("/recommend", json=r.model_dump(exclude_none=True)).headers["X-Recommend-Source"]
+                for r in hits[:20] + off_grid_requests(grid)[:5]
+            ]
+        assert sources == ["materialized"] * len(hits[:20]) + ["live"] * 5, sources
+        print("X-Recommend-Source OK: materialized for table hits, live otherwise")
+        main.topk_table = None
+    main.inference_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--programs", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+    main_bench(args.programs, args.top_k, args.samples)
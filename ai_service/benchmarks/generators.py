@@ -0,0 +1,91 @@
+"""
+Seeded synthetic inputs shared by the benchmarks.
+
+Every generator takes (n, seed) and returns the same data for the same
+arguments, so runs on different machines and commits measure identical work.
+
+    synthetic_catalog   candidate programs as ProgramColumns
+    program_inputs      the same programs as ProgramInput objects (JSON payloads)
+    student_profiles    StudentProfile objects for /recommend
+    field_requests      FieldPredictionRequest objects for /predict-fields
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from field_prediction import GRADE_COLS, INTEREST_COLS, SKILL_COLS, SUBJECT_TAKEN_COLS  # noqa: E402
+from main import FieldPredictionRequest, ProgramInput, StudentProfile  # noqa: E402
+from program_features import ProgramColumns  # noqa: E402
+
+LEVELS = np.array(["Bachelor", "Diploma", "Foundation", "Master", "PhD", "Degree", "bachelor's"], dtype=object)
+STATES = np.array(["Selangor", "Kuala Lumpur", "Penang", "Johor", "Perak", "Sabah", "Sarawak", ""], dtype=object)
+STUDENT_LEVELS = ["Bachelor", "Diploma", "Foundation", "Master"]
+GRADES = ["A", "B", "C", "D", "E", "G"]
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> ProgramColumns:
+    rng = np.random.default_rng(seed)
+    tuition = rng.uniform(5000, 200000, n).round(2)
+    tuition[rng.random(n) < 0.05] = np.nan
+    return ProgramColumns(
+        program_id=np.arange(1, n + 1, dtype=np.int64),
+        university_id=rng.integers(1, 100, n),
+        field_id=rng.integers(1, 21, n),
+        tuition_fee=tuition,
+        duration_months=rng.choice([12, 24, 36, 48], n).astype(np.float64),
+        level=LEVELS[rng.integers(0, len(LEVELS), n)],
+        university_state=STATES[rng.integers(0, len(STATES), n)],
+    )
+
+
+def program_inputs(n: int, seed: int = 0) -> list:
+    columns = synthetic_catalog(n, seed)
+    return [
+        ProgramInput(
+            program_id=int(pid), university_id=int(uid), field_id=int(fid),
+            tuition_fee=None if np.isnan(fee) else float(fee), duration_months=int(duration),
+            level=str(level), university_state=state or None,
+        )
+        for pid, uid, fid, fee, duration, level, state in zip(
+            columns.program_id, columns.university_id, columns.field_id, columns.tuition_fee,
+            columns.duration_months, columns.level, columns.university_state
+        )
+    ]
+
+
+def student_profiles(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        StudentProfile(
+            study_level=str(rng.choice(STUDENT_LEVELS)),
+            field_ids=sorted(int(f) for f in rng.choice(np.arange(1, 21), int(rng.integers(0, 4)), replace=False)),
+            cgpa=None if rng.random() < 0.1 else round(float(rng.uniform(2.0, 4.0)), 2),
+            budget=None if rng.random() < 0.1 else round(float(rng.uniform(20000, 200000)), -3),
+            preferred_states=[str(s) for s in rng.choice(STATES[:-1], int(rng.integers(0, 3)), replace=False)],
+        )
+        for _ in range(n)
+    ]
+
+
+def field_requests(n: int, seed: int = 0) -> list:
+    """Profiles with a random subset of grades/subjects/interests/skills (absent keys use the defaults)"""
+    rng = np.random.default_rng(seed)
+
+    def subset(columns: list) -> list:
+        return [c for c in columns if rng.random() < 0.7]
+
+    return [
+        FieldPredictionRequest(
+            study=str(rng.choice(["SPM", "STPM"])),
+            extracurricular=bool(rng.integers(0, 2)),
+            grades={c: str(rng.choice(GRADES)) for c in subset(GRADE_COLS)},
+            subject_taken={c: int(rng.integers(0, 2)) for c in subset(SUBJECT_TAKEN_COLS)},
+            interests={c: int(rng.integers(1, 6)) for c in subset(INTEREST_COLS)},
+            skills={c: int(rng.integers(1, 6)) for c in subset(SKILL_COLS)},
+        )
+        for _ in range(n)
+    ]
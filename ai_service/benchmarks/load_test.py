@@ -0,0 +1,135 @@
+"""
+Load test: latency of small requests while large /recommend calls are running.
+
+Uploads a synthetic catalog through PUT /admin/catalog, then runs two phases
+against a live server:
+    idle    - only small requests (/health and a single-profile /predict-fields)
+    loaded  - the same small requests while --large-clients threads keep sending
+              /recommend calls that score --large-programs catalog programs each
+and prints p50/p95/p99/max latency of the small requests plus status counts
+(429 means the inference queue was full).
+
+Usage (from ai_service/, with the service running):
+    uvicorn main:app --port 8000
+    python benchmarks/load_test.py [--url http://127.0.0.1:8000] [--duration 10]
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import numpy as np
+
+SMALL_PROFILE = {
+    "study": "SPM",
+    "extracurricular": True,
+    "grades": {"Mathematics": "A", "ICT": "B"},
+    "subject_taken": {"Took_Mathematics": 1},
+    "interests": {"Computer_Interest": 5},
+    "skills": {"Logical": 4},
+}
+
+
+class Client:
+    """Keep-alive HTTP client for one thread"""
+
+    def __init__(self, url: str, headers: dict):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.headers = {"Content-Type": "application/json", **headers}
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+
+    def request(self, method: str, path: str, body=None):
+        """Returns (status, seconds)"""
+        payload = json.dumps(body).encode() if body is not None else None
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=self.headers)
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            status = 0
+        return status, time.perf_counter() - start
+
+
+def upload_catalog(url: str, headers: dict, n_programs: int) -> None:
+    programs = [
+        {"program_id": i, "university_id": i % 90 + 1, "field_id": 1, "tuition_fee": 20000 + i % 5000,
+         "duration_months": 36, "level": "Bachelor"}
+        for i in range(1, n_programs + 1)
+    ]
+    status, _ = Client(url, headers).request("PUT", "/admin/catalog", {"programs": programs})
+    if status != 200:
+        raise SystemExit(f"Catalog upload failed with HTTP {status}")
+
+
+def small_requests(url: str, headers: dict, stop: threading.Event, latencies: list, statuses: Counter) -> None:
+    client = Client(url, headers)
+    while not stop.is_set():
+        for method, path, body in (("GET", "/health", None), ("POST", "/predict-fields", SMALL_PROFILE)):
+            status, seconds = client.request(method, path, body)
+            latencies.append(seconds)
+            statuses[status] += 1
+
+
+def large_requests(url: str, headers: dict, stop: threading.Event, n_programs: int, statuses: Counter) -> None:
+    client = Client(url, headers)
+    body = {
+        "student_profile": {"study_level": "Bachelor", "field_ids": [1], "budget": 100000},
+        "program_ids": list(range(1, n_programs + 1)),
+        "top_k": 10,
+    }
+    while not stop.is_set():
+        # A new budget each time so the /recommend result cache never answers
+        body["student_profile"]["budget"] += 1
+        status, _ = client.request("POST", "/recommend", body)
+        statuses[status] += 1
+
+
+def run_phase(args, headers: dict, large_clients: int) -> None:
+    stop = threading.Event()
+    latencies, small_statuses, large_statuses = [], Counter(), Counter()
+    threads = [
+        threading.Thread(target=large_requests, args=(args.url, headers, stop, args.large_programs, large_statuses))
+        for _ in range(large_clients)
+    ] + [
+        threading.Thread(target=small_requests, args=(args.url, headers, stop, latencies, small_statuses))
+        for _ in range(args.small_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    ms = np.array(latencies) * 1000
+    name = "loaded" if large_clients else "idle"
+    print(f"{name:<8} {len(ms):>8} {np.percentile(ms, 50):>9.2f} {np.percentile(ms, 95):>9.2f} "
+          f"{np.percentile(ms, 99):>9.2f} {ms.max():>9.2f}  small={dict(small_statuses)} large={dict(large_statuses)}")
+
+
+def main(args) -> None:
+    headers = {"X-Admin-Token": args.admin_token} if args.admin_token else {}
+    upload_catalog(args.url, headers, args.large_programs)
+    print(f"{'phase':<8} {'requests':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  status counts")
+    run_phase(args, headers, large_clients=0)
+    run_phase(args, headers, large_clients=args.large_clients)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--admin-token", default=None, help="Value for X-Admin-Token when the server requires one")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--small-clients", type=int, default=4)
+    parser.add_argument("--large-clients", type=int, default=4)
+    parser.add_argument("--large-programs", type=int, default=50000, help="Programs scored per large request")
+    main(parser.parse_args())
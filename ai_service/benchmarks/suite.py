@@ -0,0 +1,283 @@
+"""
+Benchmark suite for /recommend and /predict-fields, with regression comparison.
+
+Runs offline against the bundled model and seeded synthetic inputs
+(generators.py), with the result caches disabled so every call does the full
+work:
+
+    function/...  in-process latency of extract_features, build_feature_matrix,
+                  score_recommendation, predict_field_interests and
+                  score_field_batch (p50/p95/mean ms over repeated calls)
+    asgi/...      end-to-end throughput through the ASGI app (httpx
+                  ASGITransport, whole middleware stack, no sockets) for
+                  /recommend per catalog size and /predict-fields, at each
+                  concurrency level (requests/s and p50/p95/p99 latency)
+
+Results are written as JSON ({"meta": {...}, "results": {name: metrics}}).
+With --baseline, the new results are compared against a saved run. Each case
+whose primary metric (latency p50, or throughput) is worse by more than
+--threshold is flagged, and the exit status is 1.
+
+Usage (from ai_service/):
+    python benchmarks/suite.py --output bench-results.json [--baseline baseline.json] [--threshold 0.15]
+    python benchmarks/suite.py --quick                         # smaller sizes, shorter runs
+    python benchmarks/suite.py --compare baseline.json bench-results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from generators import field_requests, program_inputs, student_profiles  # noqa: E402
+from main import FieldPredictionBatchRequest, RecommendationRequest  # noqa: E402
+from program_features import ProgramColumns, build_feature_matrix  # noqa: E402
+from recommendation_cache import RecommendationCache  # noqa: E402
+from service_logging import configure_logging  # noqa: E402
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+QUICK_SIZES = [100, 1000]
+QUICK_CONCURRENCY = [1, 8]
+
+
+# ===== MEASUREMENT =====
+
+def latency(fn, min_seconds: float, min_calls: int = 5) -> dict:
+    """Per-call latency of fn() after one warm-up call"""
+    fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_calls or time.perf_counter() - started < min_seconds:
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = np.array(samples)
+    return {
+        "kind": "latency", "unit": "ms", "calls": len(samples),
+        "p50": float(np.percentile(samples, 50)), "p95": float(np.percentile(samples, 95)),
+        "mean": float(samples.mean()),
+    }
+
+
+async def throughput(client: httpx.AsyncClient, path: str, bodies: list, concurrency: int,
+                     min_seconds: float) -> dict:
+    """Requests/s with `concurrency` requests in flight, cycling through the pre-encoded bodies"""
+    latencies, errors = [], 0
+    sent = 0
+    deadline = time.perf_counter() + min_seconds
+
+    async def worker():
+        nonlocal sent, errors
+        while time.perf_counter() < deadline:
+            body = bodies[sent % len(bodies)]
+            sent += 1
+            start = time.perf_counter()
+            response = await client.post(path, content=body, headers={"Content-Type": "application/json"})
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    samples = np.array(latencies)
+    return {
+        "kind": "throughput", "unit": "req/s", "requests": len(samples), "errors": errors,
+        "rps": len(samples) / elapsed,
+        "p50_ms": float(np.percentile(samples, 50)), "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+# ===== CASES =====
+
+def function_cases(sizes: list, seed: int, min_seconds: float) -> dict:
+    results = {}
+    active = main.registry.current
+    profiles = student_profiles(64, seed)
+    programs = program_inputs(max(sizes), seed)
+
+    profile, program = profiles[0], programs[0]
+    results["function/extract_features"] = latency(lambda: main.extract_features(profile, program), min_seconds)
+
+    for n in sizes:
+        columns = ProgramColumns.from_programs(programs[:n])
+        results[f"function/build_feature_matrix/programs={n}"] = latency(
+            lambda: build_feature_matrix(profile, columns), min_seconds
+        )
+        requests = [RecommendationRequest(student_profile=p, programs=programs[:n]) for p in profiles[:8]]
+        calls = iter(range(sys.maxsize))
+        results[f"function/score_recommendation/programs={n}"] = latency(
+            lambda: main.score_recommendation(requests[next(calls) % len(requests)], active), min_seconds
+        )
+
+    fields = field_requests(max(sizes), seed)
+    calls = iter(range(sys.maxsize))
+    results["function/predict_field_interests"] = latency(
+        lambda: asyncio.run(main.predict_field_interests(fields[next(calls) % len(fields)])), min_seconds
+    )
+    for n in sizes:
+        batch = FieldPredictionBatchRequest(profiles=fields[:n])
+        results[f"function/score_field_batch/profiles={n}"] = latency(
+            lambda: main.score_field_batch(batch, active), min_seconds
+        )
+    return results
+
+
+async def asgi_cases(sizes: list, concurrency_levels: list, seed: int, min_seconds: float) -> dict:
+    results = {}
+    profiles = [p.model_dump() for p in student_profiles(64, seed)]
+    programs = [p.model_dump() for p in program_inputs(max(sizes), seed)]
+    fields = [f.model_dump_json().encode() for f in field_requests(256, seed)]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for n in sizes:
+            bodies = [
+                json.dumps({"student_profile": p, "programs": programs[:n], "top_k": 10}).encode()
+                for p in profiles[:8]
+            ]
+            for concurrency in concurrency_levels:
+                results[f"asgi/recommend/programs={n}/concurrency={concurrency}"] = await throughput(
+                    client, "/recommend", bodies, concurrency, min_seconds
+                )
+        for concurrency in concurrency_levels:
+            results[f"asgi/predict_fields/concurrency={concurrency}"] = await throughput(
+                client, "/predict-fields", fields, concurrency, min_seconds
+            )
+    return results
+
+
+# ===== RESULTS =====
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata(args) -> dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "model_version": main.registry.current.version,
+        "scorer": main.registry.current.scorer_kind,
+        "seed": args.seed,
+        "sizes": args.sizes,
+        "concurrency": args.concurrency,
+        "min_seconds": args.min_seconds,
+    }
+
+
+def primary(metrics: dict) -> tuple:
+    """(value, higher_is_better) used for regression checks"""
+    if metrics["kind"] == "throughput":
+        return metrics["rps"], True
+    return metrics["p50"], False
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Print per-case changes against the baseline; returns the number of regressions"""
+    print(f"\nComparison against baseline {baseline['meta'].get('git_commit')} "
+          f"(threshold {threshold:.0%}; positive = slower)")
+    print(f"{'case':<56} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = 0
+    for name, metrics in current["results"].items():
+        if name not in baseline["results"]:
+            print(f"{name:<56} {'-':>10} {primary(metrics)[0]:>10.3f} {'new':>8}")
+            continue
+        old, higher_is_better = primary(baseline["results"][name])
+        new, _ = primary(metrics)
+        slowdown = old / new - 1 if higher_is_better else new / old - 1
+        flag = ""
+        if slowdown > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<56} {old:>10.3f} {new:>10.3f} {slowdown:>+7.1%}{flag}")
+    for name in baseline["results"].keys() - current["results"].keys():
+        print(f"{name:<56} {'(missing from current run)':>30}")
+    print(f"{regressions} regression(s)")
+    return regressions
+
+
+def report(results: dict) -> None:
+    print(f"{'case':<56} {'metric':>30}")
+    for name, m in results.items():
+        if m["kind"] == "throughput":
+            line = f"{m['rps']:>9.1f} req/s  p99 {m['p99_ms']:>8.2f} ms"
+        else:
+            line = f"p50 {m['p50']:>9.3f} ms  p95 {m['p95']:>9.3f} ms"
+        print(f"{name:<56} {line:>30}")
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def run(args) -> int:
+    configure_logging(open(os.devnull, "w"))
+    main.field_cache.max_bytes = 0
+    main.recommend_cache = RecommendationCache(None)
+    main.load_model()
+    try:
+        results = function_cases(args.sizes, args.seed, args.min_seconds)
+        results.update(asyncio.run(asgi_cases(args.sizes, args.concurrency, args.seed, args.min_seconds)))
+    finally:
+        main.inference_pool.shutdown()
+
+    current = {"meta": metadata(args), "results": results}
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.baseline:
+        return 1 if compare(load(args.baseline), current, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against this saved results JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Only compare two saved results files")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative slowdown flagged as a regression (default 0.15)")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Catalog sizes / batch sizes")
+    parser.add_argument("--concurrency", type=int, nargs="+", help="Concurrent in-flight requests for ASGI cases")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Minimum measuring time per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and shorter runs")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(load(args.compare[0]), load(args.compare[1]), args.threshold) else 0)
+    if args.quick:
+        args.sizes = args.sizes or QUICK_SIZES
+        args.concurrency = args.concurrency or QUICK_CONCURRENCY
+        args.min_seconds = min(args.min_seconds, 0.3)
+    args.sizes = args.sizes or DEFAULT_SIZES
+    args.concurrency = args.concurrency or DEFAULT_CONCURRENCY
+    sys.exit(run(args))
@@ -0,0 +1,156 @@
+"""
+Binary column format for large /recommend payloads.
+
+Instead of a JSON list of ProgramInput objects, the candidates are sent as the
+bytes of a NumPy structured array. The service maps them onto ProgramColumns
+with np.frombuffer (no Python object per program) and answers with the ranked
+IDs and scores in the same framing:
+
+    magic    4 bytes  b"RCQ1" (request) or b"RCR1" (response)
+    length   uint32   little-endian byte length of the header
+    header   JSON     UTF-8, space-padded so the records start 8-byte aligned
+    records  bytes    PROGRAM_DTYPE (request) or RESULT_DTYPE (response) rows
+
+Request header: {"student_profile": {...}, "top_k": k or null, "count": n,
+"levels": [...], "states": [...]}. The level and university_state record
+fields are indexes into "levels" and "states" ("" for no state); missing
+tuition_fee / duration_months are NaN.
+
+Response header: {"count": n, "constraint_stats": {...}, "catalog_version": v,
+"model_version": "..."}.
+"""
+
+import json
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from program_features import LEVEL_MAP, ProgramColumns
+
+BINARY_MEDIA_TYPE = "application/x-recommend-columns"
+
+REQUEST_MAGIC = b"RCQ1"
+RESPONSE_MAGIC = b"RCR1"
+
+PROGRAM_DTYPE = np.dtype([
+    ("program_id", "<i8"),
+    ("university_id", "<i8"),
+    ("field_id", "<i8"),
+    ("tuition_fee", "<f8"),
+    ("duration_months", "<f8"),
+    ("level", "<u2"),
+    ("university_state", "<u2"),
+    ("_pad", "V4"),
+])
+
+RESULT_DTYPE = np.dtype([("program_id", "<i8"), ("score", "<f8")])
+
+_PREFIX = struct.Struct("<4sI")
+
+
+class BinaryFormatError(ValueError):
+    """Malformed binary payload"""
+
+
+def is_binary_content_type(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.split(";", 1)[0].strip().lower() == BINARY_MEDIA_TYPE
+
+
+# ===== FRAMING =====
+
+def _frame(magic: bytes, header: dict, records: np.ndarray) -> bytes:
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    encoded += b" " * (-(_PREFIX.size + len(encoded)) % 8)
+    return _PREFIX.pack(magic, len(encoded)) + encoded + records.tobytes()
+
+
+def _unframe(body: bytes, magic: bytes, dtype: np.dtype) -> Tuple[dict, np.ndarray]:
+    if len(body) < _PREFIX.size:
+        raise BinaryFormatError("Payload too short")
+    found, length = _PREFIX.unpack_from(body)
+    if found != magic:
+        raise BinaryFormatError(f"Bad magic {found!r}, expected {magic!r}")
+    offset = _PREFIX.size + length
+    try:
+        header = json.loads(body[_PREFIX.size:offset])
+    except ValueError as e:
+        raise BinaryFormatError(f"Invalid header: {e}") from e
+    if not isinstance(header, dict) or not isinstance(header.get("count"), int) or header["count"] < 0:
+        raise BinaryFormatError("Header must be an object with a non-negative integer 'count'")
+    expected = offset + header["count"] * dtype.itemsize
+    if len(body) != expected:
+        raise BinaryFormatError(f"Payload is {len(body)} bytes, expected {expected} for {header['count']} records")
+    # Read-only view over the request body: no copy, no per-row objects
+    return header, np.frombuffer(body, dtype=dtype, count=header["count"], offset=offset)
+
+
+def _vocab_codes(vocab: list, codes: np.ndarray, name: str) -> np.ndarray:
+    if len(codes) and int(codes.max()) >= len(vocab):
+        raise BinaryFormatError(f"'{name}' code out of range of its vocabulary ({len(vocab)} entries)")
+    return codes
+
+
+# ===== REQUEST =====
+
+def encode_recommend_request(student_profile: dict, programs: ProgramColumns, top_k: Optional[int] = None) -> bytes:
+    """Client-side encoder: a profile plus candidate columns as one binary request body"""
+    records = np.zeros(len(programs), dtype=PROGRAM_DTYPE)
+    for column in ("program_id", "university_id", "field_id", "tuition_fee", "duration_months"):
+        records[column] = getattr(programs, column)
+    records["level"] = programs.level_codes
+    records["university_state"] = programs.state_codes
+    header = {
+        "student_profile": student_profile,
+        "top_k": top_k,
+        "count": len(records),
+        "levels": programs.level_vocab.tolist(),
+        "states": programs.state_vocab.tolist(),
+    }
+    return _frame(REQUEST_MAGIC, header, records)
+
+
+def decode_recommend_request(body: bytes) -> Tuple[dict, ProgramColumns]:
+    """(header, candidate columns) for a binary request body; columns are views over the body"""
+    header, records = _unframe(body, REQUEST_MAGIC, PROGRAM_DTYPE)
+    levels, states = header.get("levels", []), header.get("states", [])
+    if not isinstance(levels, list) or not isinstance(states, list) or \
+            not all(isinstance(v, str) for v in levels + states):
+        raise BinaryFormatError("'levels' and 'states' must be lists of strings")
+    level_codes = _vocab_codes(levels, records["level"], "level")
+    # level_idx is computed once per distinct level, then gathered
+    level_idx = np.array([LEVEL_MAP.get(lv, 0) for lv in levels], dtype=np.int64)
+    columns = ProgramColumns(
+        program_id=records["program_id"],
+        university_id=records["university_id"],
+        field_id=records["field_id"],
+        tuition_fee=records["tuition_fee"],
+        duration_months=records["duration_months"],
+        level=level_codes,
+        university_state=_vocab_codes(states, records["university_state"], "university_state"),
+        level_idx=level_idx[level_codes],
+        level_vocab=levels,
+        state_vocab=states,
+    )
+    return header, columns
+
+
+# ===== RESPONSE =====
+
+def encode_recommend_response(program_ids: np.ndarray, scores: np.ndarray, constraint_stats: dict,
+                              catalog_version: Optional[int], model_version: Optional[str]) -> bytes:
+    records = np.empty(len(program_ids), dtype=RESULT_DTYPE)
+    records["program_id"] = program_ids
+    records["score"] = scores
+    header = {
+        "count": len(records),
+        "constraint_stats": constraint_stats,
+        "catalog_version": catalog_version,
+        "model_version": model_version,
+    }
+    return _frame(RESPONSE_MAGIC, header, records)
+
+
+def decode_recommend_response(body: bytes) -> Tuple[dict, np.ndarray]:
+    """Client-side decoder: (header, RESULT_DTYPE records in rank order)"""
+    return _unframe(body, RESPONSE_MAGIC, RESULT_DTYPE)
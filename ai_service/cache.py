@@ -0,0 +1,133 @@
+"""
+In-process LRU cache with a byte budget and TTL.
+
+Entries are evicted least-recently-used first once the summed entry size
+exceeds max_bytes, and expire ttl seconds after they were stored. An optional
+validator (for example the model file signature) is polled at most every
+validate_interval seconds; when its value changes the whole cache is cleared.
+Hits, misses and evictions are exported on /metrics under the cache's name.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+from instrumentation import CACHE_BYTES, CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+# Bookkeeping per entry (key, OrderedDict node, tuple) on top of the value itself
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class LRUCache:
+    """Thread-safe LRU/TTL cache bounded by approximate entry size in bytes"""
+
+    def __init__(self, name: str, max_bytes: int, ttl: Optional[float] = None,
+                 validator: Optional[Callable[[], Hashable]] = None, validate_interval: float = 1.0):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.validator = validator
+        self.validate_interval = validate_interval
+        self.current_bytes = 0
+        # key -> (value, nbytes, stored_at)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._validated_at = 0.0
+        self._validator_value = validator() if validator else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Hashable):
+        """Cached value or None"""
+        self._revalidate()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                CACHE_MISSES.inc(cache=self.name)
+                return None
+            self._entries.move_to_end(key)
+        CACHE_HITS.inc(cache=self.name)
+        return entry[0]
+
+    def put(self, key: Hashable, value, nbytes: Optional[int] = None) -> None:
+        nbytes = (nbytes if nbytes is not None else _sizeof(value)) + ENTRY_OVERHEAD_BYTES
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                CACHE_EVICTIONS.inc(cache=self.name)
+            CACHE_BYTES.set(self.current_bytes, cache=self.name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            CACHE_BYTES.set(0, cache=self.name)
+
+    def info(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": CACHE_HITS.value(cache=self.name),
+            "misses": CACHE_MISSES.value(cache=self.name),
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, nbytes, _ = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def _revalidate(self) -> None:
+        if self.validator is None:
+            return
+        now = time.monotonic()
+        if now - self._validated_at < self.validate_interval:
+            return
+        self._validated_at = now
+        value = self.validator()
+        if value != self._validator_value:
+            self._validator_value = value
+            self.clear()
+
+
+def array_key(row: np.ndarray) -> bytes:
+    """
+    Canonical digest of a feature vector: float64 values, with -0.0 folded
+    into 0.0, so equal encodings always share a key.
+    """
+    canonical = np.ascontiguousarray(row, dtype=np.float64) + 0.0
+    return hashlib.blake2b(canonical.tobytes(), digest_size=16).digest()
+
+
+def file_signature(path: str) -> Optional[tuple]:
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
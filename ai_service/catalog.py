@@ -0,0 +1,262 @@
+"""
+In-memory program catalog for the recommendation service.
+Holds every known program as NumPy columns keyed by program_id, so /recommend
+requests can reference programs by ID or field instead of shipping full payloads.
+"""
+
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constraints import BUDGET_TOLERANCE, normalize_level
+from program_features import ProgramColumns
+
+REQUIRED_COLUMNS = ("program_id", "university_id", "field_id", "level")
+OPTIONAL_COLUMNS = ("tuition_fee", "duration_months", "university_state")
+
+
+class ProgramCatalog:
+    """
+    Versioned, immutable snapshot of the program catalog.
+
+    loaded_at, columns_hash, order, sorted_ids and index may be passed in when
+    the catalog is attached from an already validated copy (see shared_store.py);
+    otherwise they are computed here.
+    """
+
+    def __init__(self, columns: ProgramColumns, version: int, source: str, loaded_at: Optional[str] = None,
+                 columns_hash: Optional[str] = None, order: Optional[np.ndarray] = None,
+                 index: Optional["ProgramIndex"] = None, sorted_ids: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.version = version
+        self.source = source
+        self.loaded_at = loaded_at or datetime.now(timezone.utc).isoformat()
+        self.content_hash = columns_hash or content_hash(columns)
+
+        # Sorted program IDs for vectorized ID -> row lookups
+        self._order = order if order is not None else np.argsort(columns.program_id, kind="stable")
+        self._sorted_ids = sorted_ids if sorted_ids is not None else columns.program_id[self._order]
+        if order is None:
+            duplicates = self._sorted_ids[1:][self._sorted_ids[1:] == self._sorted_ids[:-1]]
+            if len(duplicates):
+                raise ValueError(f"Duplicate program_id values in catalog: {np.unique(duplicates)[:10].tolist()}")
+
+        self.index = index if index is not None else ProgramIndex(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def rows_for_ids(self, program_ids: List[int]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Map program IDs to catalog rows.
+        Returns (rows, missing_ids); rows keep the order of the requested IDs.
+        """
+        ids = np.asarray(program_ids, dtype=np.int64)
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp), ids.tolist()
+        pos = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self) - 1)
+        found = self._sorted_ids[pos] == ids
+        return self._order[pos[found]], ids[~found].tolist()
+
+    def take(self, rows: np.ndarray) -> ProgramColumns:
+        return self.columns.take(rows)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "programs": len(self),
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "content_hash": self.content_hash,
+        }
+
+
+class ProgramIndex:
+    """
+    Candidate index: field_id -> normalized level -> rows sorted by tuition.
+
+    Level and budget constraints become a dictionary lookup plus a searchsorted
+    over the budget ceiling. Programs without tuition always pass the budget
+    check, so they are keyed at -inf and sit at the front of every bucket.
+    Programs with no level at all match any student level and live under the
+    ANY_LEVEL key.
+    """
+
+    ANY_LEVEL = None
+
+    def __init__(self, columns: ProgramColumns):
+        tuition = columns.tuition_fee
+        budget_key = np.where(np.isnan(tuition) | (tuition == 0), -np.inf, tuition)
+
+        # Normalize each distinct level string once
+        level_codes = columns.level_codes
+        level_keys = [self.ANY_LEVEL if lv == "" else normalize_level(lv) for lv in columns.level_vocab]
+
+        self._buckets: Dict[int, Dict[Optional[str], Tuple[np.ndarray, np.ndarray]]] = {}
+        order = np.lexsort((budget_key, level_codes, columns.field_id))
+        group_keys = np.stack([columns.field_id[order], level_codes[order]])
+        boundaries = np.flatnonzero(np.any(group_keys[:, 1:] != group_keys[:, :-1], axis=0)) + 1
+        for group in np.split(order, boundaries):
+            if len(group) == 0:
+                continue
+            field_id = int(columns.field_id[group[0]])
+            level_key = level_keys[level_codes[group[0]]]
+            levels = self._buckets.setdefault(field_id, {})
+            if level_key in levels:
+                # Several raw spellings normalize to the same level; merge them
+                keys, rows = levels[level_key]
+                keys = np.concatenate([keys, budget_key[group]])
+                rows = np.concatenate([rows, group])
+                merged = np.argsort(keys, kind="stable")
+                levels[level_key] = (keys[merged], rows[merged])
+            else:
+                levels[level_key] = (budget_key[group], group)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, List[list]]:
+        """Flatten the buckets into (keys, rows, [[field_id, level_key, start, end], ...])"""
+        keys, rows, buckets, start = [], [], [], 0
+        for field_id, levels in self._buckets.items():
+            for level_key, (bucket_keys, bucket_rows) in levels.items():
+                keys.append(bucket_keys)
+                rows.append(bucket_rows)
+                buckets.append([field_id, level_key, start, start + len(bucket_rows)])
+                start += len(bucket_rows)
+        if not buckets:
+            return np.empty(0), np.empty(0, dtype=np.intp), []
+        return np.concatenate(keys), np.concatenate(rows).astype(np.intp), buckets
+
+    @classmethod
+    def from_arrays(cls, keys: np.ndarray, rows: np.ndarray, buckets: List[list]) -> "ProgramIndex":
+        """Index whose buckets are views into flattened arrays from to_arrays() (e.g. memory-mapped)"""
+        index = cls.__new__(cls)
+        index._buckets = {}
+        for field_id, level_key, start, end in buckets:
+            index._buckets.setdefault(field_id, {})[level_key] = (keys[start:end], rows[start:end])
+        return index
+
+    def select(self, field_id: int, study_level: Optional[str], budget: Optional[float]) -> np.ndarray:
+        """
+        Rows in a field that pass the level and budget constraints, in catalog order.
+        Matches the level/budget checks applied by /recommend.
+        """
+        levels = self._buckets.get(field_id)
+        if not levels:
+            return np.empty(0, dtype=np.intp)
+
+        if study_level:
+            student_level = normalize_level(study_level)
+            buckets = [levels[k] for k in (student_level, self.ANY_LEVEL) if k in levels]
+        else:
+            buckets = list(levels.values())
+
+        ceiling = budget * BUDGET_TOLERANCE if budget else np.inf
+        parts = [rows[:np.searchsorted(keys, ceiling, side="right")] for keys, rows in buckets]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(parts))
+
+    def field_rows(self, field_id: int) -> np.ndarray:
+        """Every row in a field, in catalog order"""
+        levels = self._buckets.get(field_id)
+        if not levels:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate([rows for _, rows in levels.values()]))
+
+
+def columns_from_records(records: List[dict]) -> ProgramColumns:
+    """
+    Build ProgramColumns from raw records (JSON objects, CSV rows, Parquet rows).
+    Values may be strings (CSV); empty strings and None are treated as missing.
+    Raises ValueError for records that are not objects or lack required columns,
+    and for values that are not numbers.
+    """
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"Catalog record {i} is not an object")
+        missing = [c for c in REQUIRED_COLUMNS if _is_missing(record.get(c))]
+        if missing:
+            raise ValueError(f"Catalog record {i} is missing required columns: {missing}")
+
+    try:
+        return _columns(records)
+    except (TypeError, OverflowError) as e:
+        raise ValueError(f"Invalid catalog value: {e}")
+
+
+def _columns(records: List[dict]) -> ProgramColumns:
+    return ProgramColumns(
+        program_id=np.array([_to_int(r["program_id"]) for r in records], dtype=np.int64),
+        university_id=np.array([_to_int(r["university_id"]) for r in records], dtype=np.int64),
+        field_id=np.array([_to_int(r["field_id"]) for r in records], dtype=np.int64),
+        tuition_fee=np.array([_to_float(r.get("tuition_fee")) for r in records], dtype=np.float64),
+        duration_months=np.array([_to_float(r.get("duration_months")) for r in records], dtype=np.float64),
+        level=np.array([str(r["level"]) for r in records], dtype=object),
+        university_state=np.array(
+            ["" if _is_missing(r.get("university_state")) else str(r["university_state"]) for r in records],
+            dtype=object
+        ),
+    )
+
+
+def load_snapshot(path: str) -> ProgramColumns:
+    """
+    Load a catalog snapshot from a JSON, CSV or Parquet file.
+
+    JSON may be a list of program objects or {"programs": [...]}.
+    Parquet support requires pyarrow to be installed.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Catalog snapshot not found at {path}")
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            if "programs" not in data:
+                raise ValueError('JSON catalog snapshot object has no "programs" key')
+            data = data["programs"]
+        if not isinstance(data, list):
+            raise ValueError("JSON catalog snapshot must be a list of programs or {\"programs\": [...]}")
+        records = data
+    elif ext == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            records = list(csv.DictReader(f))
+    elif ext == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Loading Parquet catalog snapshots requires pyarrow (pip install pyarrow)")
+        records = pq.read_table(path).to_pylist()
+    else:
+        raise ValueError(f"Unsupported catalog snapshot format: {ext} (expected .json, .csv or .parquet)")
+
+    return columns_from_records(records)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+
+def _to_int(value) -> int:
+    return int(float(value)) if isinstance(value, str) else int(value)
+
+
+def _to_float(value) -> float:
+    return np.nan if _is_missing(value) else float(value)
+
+
+def content_hash(columns: ProgramColumns) -> str:
+    """Stable hash of catalog contents, independent of load time and version"""
+    digest = hashlib.sha256()
+    for column in (columns.program_id, columns.university_id, columns.field_id,
+                   columns.tuition_fee, columns.duration_months):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    for column in (columns.level, columns.university_state):
+        digest.update("\x1f".join(column.tolist()).encode("utf-8"))
+    return digest.hexdigest()[:16]
@@ -0,0 +1,86 @@
+"""
+Micro-batching for concurrent single-row model calls.
+
+Requests that arrive while a batch is being scored are stacked into one
+matrix and scored with a single model call; each caller gets its own result
+row back. Used by /predict-fields so bursts of single-profile requests share
+one predict_proba call, while a lone request is dispatched without waiting.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from instrumentation import COALESCE_BATCH_SIZE, COALESCE_WAIT_SECONDS
+
+
+class RowCoalescer:
+    """
+    Collects feature rows and scores them in batches.
+
+    score_batch is an async callable taking an (n, d) matrix and returning an
+    array with n result rows. A row arriving when no batch is in flight is
+    dispatched on the next loop iteration (together with rows submitted in the
+    same iteration). Otherwise rows wait until a batch finishes, max_rows rows
+    are waiting or `window` seconds have passed since the first one arrived,
+    whichever comes first.
+    """
+
+    def __init__(self, score_batch: Callable[[np.ndarray], Awaitable[np.ndarray]], window: float, max_rows: int):
+        self.score_batch = score_batch
+        self.window = window
+        self.max_rows = max(1, max_rows)
+        self._pending: List[Tuple[np.ndarray, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight = 0
+
+    async def submit(self, row: np.ndarray) -> np.ndarray:
+        """Score one feature row as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(0 if self._in_flight == 0 else self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        for _, _, enqueued in batch:
+            COALESCE_WAIT_SECONDS.observe(dispatched - enqueued)
+        COALESCE_BATCH_SIZE.observe(len(batch))
+
+        try:
+            results = await self.score_batch(np.vstack([row for row, _, _ in batch]))
+        except BaseException as e:
+            self._finished()
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        self._finished()
+        for (_, future, _), result in zip(batch, results):
+            # A caller that was cancelled (client disconnect) no longer waits for its row
+            if not future.done():
+                future.set_result(result)
+
+    def _finished(self) -> None:
+        """A batch completed: rows that queued up behind it go next"""
+        self._in_flight -= 1
+        if self._pending and self._in_flight == 0:
+            self._flush()
@@ -0,0 +1,160 @@
+"""
+Compact quantized store of the program-only recommendation features.
+
+The 30 PROGRAM_FEATURES columns of a program are two one-hots and five ratios
+(see program_features.py). Held as float32 they take 120 bytes per program,
+and the cached program logits of decomposed scoring take 8 bytes per model
+output with the float64 scorer (112 with the bundled 14-class model, 56 with
+float32). This store keeps them in 12 bytes:
+
+    level_idx   uint8      position of the program level one-hot (columns 5-9)
+    field_slot  uint8      field ID for the field one-hot (columns 11-30), 0 when outside 1-20
+    ratios      (N, 5) uint16 fixed point, 15 fractional bits: duration ratio and
+                category, tuition ratio, university and program ID ratios (37-39, 43-44)
+
+Every ratio lies in [0, 1] for valid programs, so fixed point stores it within
+1.6e-5 and keeps 0, 0.5 and 1 exact. Rows with a ratio outside that range
+(negative fees or IDs) keep their exact values on the side.
+
+Scoring reads the layout directly: a one-hot contributes one row of the
+coefficients, so the program-only logits of candidate rows are two table
+gathers plus an N x 5 product over the dequantized ratios.
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from compiled_scorer import LinearScorer, matmul_rows
+from program_features import MAX_FIELD_ID, PROGRAM_FEATURES, ProgramColumns, program_features
+from service_logging import log_event
+
+if TYPE_CHECKING:
+    from shared_store import SharedStore
+
+# Positions within the PROGRAM_FEATURES block
+LEVEL_SLICE = slice(0, 5)
+FIELD_SLICE = slice(5, 5 + MAX_FIELD_ID)
+RATIO_SLICE = slice(25, 30)
+
+RATIO_FRACTION_BITS = 15
+RATIO_SCALE = float(1 << RATIO_FRACTION_BITS)
+
+
+class CompactProgramFeatures:
+    """PROGRAM_FEATURES of a set of programs in the quantized layout, one entry per row"""
+
+    # Constructor arguments, each one array (the files SharedStore publishes)
+    ARRAYS = ("level_idx", "field_slot", "ratios", "outlier_rows", "outlier_values")
+
+    def __init__(self, level_idx: np.ndarray, field_slot: np.ndarray, ratios: np.ndarray,
+                 outlier_rows: np.ndarray, outlier_values: np.ndarray):
+        self.level_idx = level_idx
+        self.field_slot = field_slot
+        self.ratios = ratios
+        self.outlier_rows = outlier_rows
+        self.outlier_values = outlier_values
+
+    @classmethod
+    def from_columns(cls, columns: ProgramColumns) -> "CompactProgramFeatures":
+        block = program_features(columns)
+        field_id = columns.field_id
+        in_range = (field_id >= 1) & (field_id <= MAX_FIELD_ID)
+        ratios = block[:, RATIO_SLICE]
+        outside = ((ratios < 0) | (ratios > 1)).any(axis=1)
+        outlier_rows = np.flatnonzero(outside).astype(np.int32)
+        return cls(
+            level_idx=columns.level_idx.astype(np.uint8),
+            field_slot=np.where(in_range, field_id, 0).astype(np.uint8),
+            ratios=np.rint(np.clip(ratios, 0.0, 1.0) * RATIO_SCALE).astype(np.uint16),
+            outlier_rows=outlier_rows,
+            outlier_values=ratios[outlier_rows],
+        )
+
+    def __len__(self) -> int:
+        return len(self.level_idx)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def dequantized_ratios(self, rows: Optional[np.ndarray] = None, dtype=np.float64) -> np.ndarray:
+        """N x 5 ratio columns of the given rows (all rows when None)"""
+        codes = self.ratios if rows is None else self.ratios[rows]
+        ratios = codes.astype(dtype)
+        # Scaling by a power of two is exact in both precisions
+        ratios *= 1.0 / RATIO_SCALE
+        if len(self.outlier_rows):
+            rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+            positions = np.minimum(np.searchsorted(self.outlier_rows, rows), len(self.outlier_rows) - 1)
+            hit = self.outlier_rows[positions] == rows
+            ratios[hit] = self.outlier_values[positions[hit]]
+        return ratios
+
+    def dense(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """N x len(PROGRAM_FEATURES) float64 block, as program_features() up to the ratio quantization"""
+        level_idx = self.level_idx if rows is None else self.level_idx[rows]
+        field_slot = self.field_slot if rows is None else self.field_slot[rows]
+        n = len(level_idx)
+        block = np.zeros((n, len(PROGRAM_FEATURES)), dtype=np.float64)
+        block[np.arange(n), level_idx] = 1.0
+        has_field = field_slot > 0
+        block[np.flatnonzero(has_field), FIELD_SLICE.start - 1 + field_slot[has_field]] = 1.0
+        block[:, RATIO_SLICE] = self.dequantized_ratios(rows)
+        return block
+
+    def program_logits(self, scorer: LinearScorer, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        N x n_outputs program-only share of the logits of the given rows,
+        decomposed_scoring.program_logits() computed from the quantized layout.
+        """
+        coef = scorer.coef[PROGRAM_FEATURES]
+        # One-hot columns select a coefficient row; field slot 0 (no one-hot) selects zeros
+        field_table = np.zeros((MAX_FIELD_ID + 1, coef.shape[1]), dtype=coef.dtype)
+        field_table[1:] = coef[FIELD_SLICE]
+        level_idx = self.level_idx if rows is None else self.level_idx[rows]
+        field_slot = self.field_slot if rows is None else self.field_slot[rows]
+
+        logits = matmul_rows(self.dequantized_ratios(rows, scorer.dtype), coef[RATIO_SLICE])
+        logits += coef[LEVEL_SLICE][level_idx]
+        logits += field_table[field_slot]
+        return logits
+
+
+class CompactFeatureCache:
+    """
+    CompactProgramFeatures of the serving catalog. Holds a single entry: a new
+    catalog version rebuilds it on first use. The store does not depend on the
+    model, so model swaps keep it. With a shared store the arrays are
+    published in the catalog version's directory and every worker maps them.
+    """
+
+    def __init__(self, store: Optional["SharedStore"] = None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self, catalog) -> CompactProgramFeatures:
+        entry = self._entry
+        if entry is None or entry[0] is not catalog:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] is not catalog:
+                    def build() -> CompactProgramFeatures:
+                        started = time.perf_counter()
+                        features = CompactProgramFeatures.from_columns(catalog.columns)
+                        log_event(
+                            logging.INFO, "compact_features_built",
+                            catalog_version=catalog.version, programs=len(catalog), bytes=features.nbytes,
+                            outliers=len(features.outlier_rows), shared=self.store is not None,
+                            seconds=round(time.perf_counter() - started, 4)
+                        )
+                        return features
+
+                    features = self.store.compact_features(catalog, build) if self.store else None
+                    entry = (catalog, features or build())
+                    self._entry = entry
+        return entry[1]
@@ -0,0 +1,176 @@
+"""
+Compiled scorer for linear sklearn classifiers.
+
+At load time the weights of a fitted LogisticRegression are copied into
+contiguous NumPy arrays. predict_proba is then a single matmul followed by a
+sigmoid or softmax, skipping sklearn's input validation and dispatch.
+Estimators that are not supported are served through sklearn unchanged.
+
+A compiled scorer can be saved as a directory of .npy files and loaded back
+memory-mapped. Loading it needs neither sklearn nor the pickle, and worker
+processes that map the same files share their pages.
+"""
+
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.linear_model import LogisticRegression
+
+SUPPORTED_DTYPES = {"float32": np.float32, "float64": np.float64}
+
+
+class LinearScorer:
+    """
+    predict_proba for a fitted LogisticRegression without sklearn overhead.
+
+    Mirrors LogisticRegression.predict_proba: softmax over the decision
+    function for multinomial models, and a sigmoid per class (normalized for
+    more than two classes) for binary and one-vs-rest models.
+    """
+
+    def __init__(self, classes: np.ndarray, coef: np.ndarray, intercept: np.ndarray, multinomial: bool):
+        # coef is (n_features, n_outputs) so scoring is X @ coef
+        self.dtype = coef.dtype
+        self.classes_ = classes
+        self.n_features_in_ = coef.shape[0]
+        self.coef = coef
+        self.intercept = intercept
+        self.multinomial = multinomial
+
+    @classmethod
+    def from_estimator(cls, estimator: "LogisticRegression", dtype=np.float32) -> "LinearScorer":
+        dtype = np.dtype(dtype)
+        coef, intercept = estimator.coef_, estimator.intercept_
+        multinomial = not _uses_ovr(estimator)
+        if multinomial and coef.shape[0] == 1:
+            # Binary multinomial models keep one row; sklearn takes the softmax over (-d, d)
+            coef, intercept = np.r_[-coef, coef], np.r_[-intercept, intercept]
+        return cls(
+            estimator.classes_,
+            np.ascontiguousarray(coef.T, dtype=dtype),
+            np.asarray(intercept, dtype=dtype),
+            multinomial=multinomial,
+        )
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has shape {X.shape}, but LinearScorer is expecting {self.n_features_in_} features as input."
+            )
+        return matmul_rows(X, self.coef) + self.intercept
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.proba_from_logits(self.decision_function(X))
+
+    def proba_from_logits(self, logits: np.ndarray) -> np.ndarray:
+        """Class probabilities for decision function values (logits is overwritten)"""
+        if self.multinomial:
+            logits -= logits.max(axis=1, keepdims=True)
+            np.exp(logits, out=logits)
+            logits /= logits.sum(axis=1, keepdims=True)
+            return logits
+
+        probs = _expit(logits)
+        if probs.shape[1] == 1:
+            return np.hstack([1 - probs, probs])
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs
+
+
+def matmul_rows(X: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """
+    X @ W for a 2-D X, with each row's result independent of how many rows X
+    has. OpenBLAS computes single-row float64 products with a gemv kernel that
+    rounds differently from gemm, so a lone row is computed inside a pair.
+    """
+    if X.shape[0] == 1:
+        return (np.concatenate([X, X]) @ W)[:1]
+    return X @ W
+
+
+def compile_scorer(estimator, dtype: str = "float64") -> Union[LinearScorer, object]:
+    """LinearScorer for supported estimators, otherwise the estimator itself"""
+    # Imported here: unpickling the estimator has already loaded sklearn
+    from sklearn.linear_model import LogisticRegression
+
+    if isinstance(estimator, LogisticRegression) and hasattr(estimator, "coef_") and _known_shape(estimator):
+        return LinearScorer.from_estimator(estimator, SUPPORTED_DTYPES[dtype])
+    return estimator
+
+
+def save_scorer(scorer: LinearScorer, path: str, source: str) -> None:
+    """
+    Write the scorer to the directory path. source identifies the model file
+    it was compiled from (load_scorer ignores artifacts from another source).
+    The directory is renamed into place, so readers never see a partial one.
+    """
+    parent = os.path.dirname(path) or "."
+    staging = tempfile.mkdtemp(prefix=".compiling-", dir=parent)
+    np.save(os.path.join(staging, "coef.npy"), scorer.coef)
+    np.save(os.path.join(staging, "intercept.npy"), scorer.intercept)
+    np.save(os.path.join(staging, "classes.npy"), scorer.classes_)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"source": source, "dtype": scorer.dtype.name, "multinomial": scorer.multinomial}, f)
+    try:
+        if os.path.isdir(path):
+            _remove_artifact(path)
+        os.rename(staging, path)
+    except OSError:
+        # Another worker published the same artifact first
+        _remove_artifact(staging)
+
+
+def load_scorer(path: str, source: str, dtype: str) -> Optional[LinearScorer]:
+    """Memory-mapped LinearScorer from save_scorer(), or None when missing or stale"""
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("source") != source or meta.get("dtype") != dtype:
+        return None
+    return LinearScorer(
+        np.load(os.path.join(path, "classes.npy")),
+        np.load(os.path.join(path, "coef.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "intercept.npy")),
+        multinomial=meta["multinomial"],
+    )
+
+
+def _remove_artifact(path: str) -> None:
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+    os.rmdir(path)
+
+
+def _uses_ovr(estimator: "LogisticRegression") -> bool:
+    """Same rule LogisticRegression.predict_proba uses to pick one-vs-rest"""
+    multi_class = getattr(estimator, "multi_class", "auto")
+    if multi_class in ("ovr", "warn"):
+        return True
+    if multi_class in ("auto", "deprecated"):
+        return len(estimator.classes_) <= 2 or estimator.solver == "liblinear"
+    return False
+
+
+def _known_shape(estimator: "LogisticRegression") -> bool:
+    """Whether coef_ has the rows LinearScorer reproduces: one for two classes, else one per class"""
+    n_classes = len(estimator.classes_)
+    rows = 1 if n_classes == 2 else n_classes
+    return n_classes >= 2 and estimator.coef_.shape[0] == rows and len(estimator.intercept_) == rows
+
+
+def _expit(x: np.ndarray) -> np.ndarray:
+    # Numerically stable logistic function
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1 / (1 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1 + exp_x)
+    return out
@@ -0,0 +1,104 @@
+"""
+Hard constraints applied to candidate programs before ML scoring.
+Constraints are evaluated over ProgramColumns arrays and returned as boolean masks.
+String constraints are decided once per vocabulary entry and gathered by code.
+"""
+
+from typing import TYPE_CHECKING, Dict
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from program_features import ProgramColumns
+
+# Allowed tuition overshoot relative to the student's budget
+BUDGET_TOLERANCE = 1.1
+
+# Common level spellings mapped to their standard form
+LEVEL_ALIASES = {
+    "bachelor": "bachelor",
+    "bachelor's": "bachelor",
+    "bachelors": "bachelor",
+    "degree": "bachelor",
+    "undergraduate": "bachelor",
+    "diploma": "diploma",
+    "foundation": "foundation",
+    "master": "master",
+    "masters": "master",
+    "phd": "phd",
+    "doctorate": "phd",
+}
+
+
+def normalize_level(level: str) -> str:
+    """Normalize level string for comparison (case-insensitive, common variations mapped)"""
+    if not level:
+        return ""
+    level_lower = level.lower().strip()
+    return LEVEL_ALIASES.get(level_lower, level_lower)
+
+
+class ConstraintMasks:
+    """
+    Boolean masks for a set of candidate programs, one per hard constraint.
+    True means the program satisfies that constraint.
+    """
+
+    def __init__(self, masks: Dict[str, np.ndarray]):
+        self.masks = masks
+        self.passed = np.logical_and.reduce(list(masks.values()))
+
+    def stats(self) -> dict:
+        """Per-constraint rejection counts (a program failing several constraints counts in each)"""
+        total = len(self.passed)
+        return {
+            "candidates": total,
+            "passed": int(self.passed.sum()),
+            "rejected_by": {name: int(total - mask.sum()) for name, mask in self.masks.items()},
+        }
+
+
+def combine_stats(first: dict, second: dict) -> dict:
+    """ConstraintMasks.stats() of two disjoint candidate sets taken together"""
+    return {
+        "candidates": first["candidates"] + second["candidates"],
+        "passed": first["passed"] + second["passed"],
+        "rejected_by": {name: count + second["rejected_by"][name] for name, count in first["rejected_by"].items()},
+    }
+
+
+def evaluate_constraints(student_profile, columns: "ProgramColumns") -> ConstraintMasks:
+    """
+    Evaluate every hard constraint over column arrays.
+
+    - level: normalized levels must match (missing level on either side passes)
+    - field: program field must be one of the student's fields (no fields = no filter)
+    - budget: tuition must be within budget * BUDGET_TOLERANCE (missing tuition or budget passes)
+    - location: university state must be a preferred state (missing state or no preference passes)
+    """
+    n = len(columns)
+    everything = np.ones(n, dtype=bool)
+
+    level = everything
+    if student_profile.study_level:
+        student_level = normalize_level(student_profile.study_level)
+        matches = np.array([lv == "" or normalize_level(lv) == student_level for lv in columns.level_vocab], dtype=bool)
+        level = matches[columns.level_codes]
+
+    field = everything
+    if student_profile.field_ids:
+        field = np.isin(columns.field_id, student_profile.field_ids)
+
+    budget = everything
+    if student_profile.budget:
+        tuition = columns.tuition_fee
+        has_tuition = ~np.isnan(tuition) & (tuition != 0)
+        budget = ~has_tuition | (tuition <= student_profile.budget * BUDGET_TOLERANCE)
+
+    location = everything
+    if student_profile.preferred_states:
+        preferred = set(student_profile.preferred_states)
+        allowed = np.array([state == "" or state in preferred for state in columns.state_vocab], dtype=bool)
+        location = allowed[columns.state_codes]
+
+    return ConstraintMasks({"level": level, "field": field, "budget": budget, "location": location})
@@ -0,0 +1,121 @@
+"""
+Decomposed linear scoring for /recommend.
+
+The logits of a linear model are a sum over feature columns, and 30 of the 47
+recommendation features depend only on the program (PROGRAM_FEATURES in
+program_features.py). Their share of the logits, program_features @
+coef[PROGRAM_FEATURES], is computed once per catalog version and model version
+and kept as an N x n_outputs array. A request then builds only the 9
+interaction columns for its candidates and adds the gathered program rows and
+the student-only term (one vector for every candidate) before the softmax:
+a gather-and-add plus an N x 9 product instead of building and multiplying
+the N x 47 matrix.
+
+Inline candidates (JSON programs or binary columns) have their program logits
+computed per request with the same sums, so a program scores identically
+whether it was sent inline or referenced from the catalog.
+
+Scores match the full predict_proba up to float rounding (the float32 sums are
+grouped differently); benchmarks/bench_decomposed_score.py checks the parity.
+Only compiled LinearScorer models are decomposed.
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from compiled_scorer import LinearScorer, matmul_rows
+from program_features import (
+    INTERACTION_FEATURES,
+    PROGRAM_FEATURES,
+    STUDENT_FEATURES,
+    ProgramColumns,
+    interaction_features,
+    program_features,
+    student_features,
+)
+from service_logging import log_event
+from shared_store import SharedStore
+
+
+def is_decomposable(scorer) -> bool:
+    return isinstance(scorer, LinearScorer)
+
+
+def program_logits(scorer: LinearScorer, columns: ProgramColumns) -> np.ndarray:
+    """N x n_outputs program-only share of the logits"""
+    return matmul_rows(_scorer_input(scorer, program_features(columns)), scorer.coef[PROGRAM_FEATURES])
+
+
+def request_logits(scorer: LinearScorer, student_profile, columns: ProgramColumns) -> np.ndarray:
+    """N x n_outputs logits minus the program-only share: interaction terms, student-only term and intercept"""
+    student = _scorer_input(scorer, student_features(student_profile)) @ scorer.coef[STUDENT_FEATURES]
+    logits = matmul_rows(
+        _scorer_input(scorer, interaction_features(student_profile, columns)), scorer.coef[INTERACTION_FEATURES]
+    )
+    logits += student + scorer.intercept
+    return logits
+
+
+def decomposed_logits(scorer: LinearScorer, student_profile, columns: ProgramColumns,
+                      partial_logits: np.ndarray) -> np.ndarray:
+    """Full logits given the program_logits() rows of the same programs"""
+    logits = request_logits(scorer, student_profile, columns)
+    logits += partial_logits
+    return logits
+
+
+def decomposed_predict_proba(scorer: LinearScorer, student_profile, columns: ProgramColumns,
+                             partial_logits: np.ndarray) -> np.ndarray:
+    """
+    LinearScorer.predict_proba(build_feature_matrix(student_profile, columns))
+    given the program_logits() rows of the same programs.
+    """
+    return scorer.proba_from_logits(decomposed_logits(scorer, student_profile, columns, partial_logits))
+
+
+def _scorer_input(scorer: LinearScorer, block: np.ndarray) -> np.ndarray:
+    # Same rounding as the full path: features are float32, then cast to the scorer dtype
+    return block.astype(np.float32).astype(scorer.dtype, copy=False)
+
+
+class ProgramLogitsCache:
+    """
+    program_logits() of the catalog under the serving scorer. Holds a single
+    entry: a new catalog version or model version recomputes it on first use.
+    With a shared store the logits are published there, keyed by catalog
+    content hash and model token, and every worker maps the same copy.
+    """
+
+    def __init__(self, store: Optional[SharedStore] = None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self, catalog, scorer: LinearScorer, model_token: str) -> np.ndarray:
+        entry = self._entry
+        if entry is None or entry[0] is not catalog or entry[1] is not scorer:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry[0] is not catalog or entry[1] is not scorer:
+                    def compute() -> np.ndarray:
+                        started = time.perf_counter()
+                        logits = program_logits(scorer, catalog.columns)
+                        log_event(
+                            logging.INFO, "program_logits_computed",
+                            catalog_version=catalog.version, programs=len(catalog), shared=self.store is not None,
+                            seconds=round(time.perf_counter() - started, 4)
+                        )
+                        return logits
+
+                    logits = self.store.program_logits(catalog.content_hash, model_token, compute) \
+                        if self.store else compute()
+                    entry = (catalog, scorer, logits)
+                    self._entry = entry
+        return entry[2]
+
+    def clear(self) -> None:
+        self._entry = None
@@ -3,15 +3,15 @@ Field category prediction using the trained ML model.
 This matches the notebook's field-first recommendation approach.
 """
 
+import json
 import os
-import joblib
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
 import numpy as np
-import pandas as pd
-from typing import List, Tuple
-from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 
-# Field category names from the notebook (these are the model's output classes)
-# Based on the notebook output, these are the 14 field categories
+# Field category names from the notebook (the model's output classes), used for
+# models without a preprocessing artifact; an artifact carries its own field_classes
 FIELD_CATEGORIES = [
     "Computer Science & IT",
     "Engineering",
@@ -58,13 +58,172 @@ SKILL_COLS = [
     'Teamwork', 'Leadership', 'Attention_to_Detail'
 ]
 
-# Global scalers and encoders (would need to be loaded from training artifacts)
-# For now, we'll create placeholders - in production, these should be saved/loaded
-subject_scaler = StandardScaler()
-interest_scaler = StandardScaler()
-skill_scaler = StandardScaler()
-onehot_encoder = OneHotEncoder(sparse_output=False)
-extra_encoder = LabelEncoder()
+# Model input columns in order (study one-hot and extracurricular come last)
+FEATURE_COLS = INTEREST_COLS + SKILL_COLS + SUBJECT_TAKEN_COLS + GRADE_COLS + ['Study_SPM', 'Study_STPM', 'Extracurricular']
+NUM_FIELD_FEATURES = len(FEATURE_COLS)
+
+# Study level one-hot categories (OneHotEncoder.categories_); unknown levels encode as the first
+STUDY_CATEGORIES = ['SPM', 'STPM']
+
+# Extracurricular label classes (LabelEncoder.classes_); a profile with activities encodes as the "Yes" class
+EXTRACURRICULAR_CLASSES = ['No', 'Yes']
+
+# Neutral value used for a missing interest or skill rating
+DEFAULT_RATING = 3
+
+# StandardScaler (mean, std) per block, used when the model has no preprocessing artifact
+DEFAULT_SCALERS = {
+    'interests': (3.0, 1.2),
+    'skills': (3.0, 1.2),
+    'grades': (2.5, 1.5),
+}
+
+# Preprocessing artifact stored next to a model file: <model file without extension> + suffix
+PREPROCESSING_SUFFIX = ".preprocessing.json"
+
+
+class FieldPreprocessor:
+    """
+    Fitted /predict-fields preprocessing: column orders, grade mapping, study
+    one-hot categories, extracurricular label classes, StandardScaler
+    statistics and the field label classes (the model's output names, in
+    class order), loaded from a JSON artifact saved next to the model.
+
+    The scalers are compiled into 47-wide mean and std vectors (0 and 1 for
+    unscaled columns), so the whole transform is one in-place (X - mean) / std
+    over the raw feature matrix.
+    """
+
+    BLOCKS = ('interests', 'skills', 'subject_taken', 'grades')
+
+    def __init__(self, columns: Dict[str, List[str]], grade_mapping: Dict[str, float],
+                 study_categories: List[str], extracurricular_classes: List[str],
+                 scalers: Dict[str, Tuple[Sequence[float], Sequence[float]]],
+                 field_classes: Optional[List[str]] = None):
+        self.columns = {block: list(columns[block]) for block in self.BLOCKS}
+        self.grade_mapping = dict(grade_mapping)
+        self.study_categories = list(study_categories)
+        self.extracurricular_classes = list(extracurricular_classes)
+        self.scalers = {
+            block: (np.broadcast_to(np.asarray(mean, dtype=np.float64), len(self.columns[block])).tolist(),
+                    np.broadcast_to(np.asarray(std, dtype=np.float64), len(self.columns[block])).tolist())
+            for block, (mean, std) in scalers.items()
+        }
+        # None: no fitted label classes (artifacts saved before they were stored), names fall back to FIELD_CATEGORIES
+        self.field_classes = list(field_classes) if field_classes is not None else None
+
+        self.feature_columns = [col for block in self.BLOCKS for col in self.columns[block]]
+        self.feature_columns += [f'Study_{c}' for c in self.study_categories] + ['Extracurricular']
+        self.n_features = len(self.feature_columns)
+
+        self.mean = np.zeros(self.n_features)
+        self.std = np.ones(self.n_features)
+        start = 0
+        for block in self.BLOCKS:
+            end = start + len(self.columns[block])
+            if block in self.scalers:
+                self.mean[start:end], self.std[start:end] = self.scalers[block]
+            start = end
+
+        # Lookup tables for the raw encoding; numeric grade keys also match their int form
+        self._grades = {**self.grade_mapping, **{int(k): v for k, v in self.grade_mapping.items() if k.isdigit()}}
+        self._study = {c: [float(c == other) for other in self.study_categories] for c in self.study_categories}
+        self._default_study = self._study[self.study_categories[0]]
+        classes = self.extracurricular_classes
+        positive = next((i for i, c in enumerate(classes) if c.lower() in ('yes', 'true', '1')), len(classes) - 1)
+        negative = next(i for i in range(len(classes)) if i != positive)
+        self._extracurricular = (float(negative), float(positive))
+
+    @property
+    def field_names(self) -> List[str]:
+        """Field name of each model output class, in class order"""
+        return self.field_classes if self.field_classes is not None else FIELD_CATEGORIES
+
+    @classmethod
+    def default(cls) -> "FieldPreprocessor":
+        """The parameters the service used before preprocessing artifacts existed"""
+        return cls(
+            {'interests': INTEREST_COLS, 'skills': SKILL_COLS,
+             'subject_taken': SUBJECT_TAKEN_COLS, 'grades': GRADE_COLS},
+            {str(k): v for k, v in GRADE_MAPPING.items()}, STUDY_CATEGORIES, EXTRACURRICULAR_CLASSES,
+            DEFAULT_SCALERS,
+        )
+
+    @classmethod
+    def from_fitted(cls, interest_scaler, skill_scaler, grade_scaler, study_encoder, extracurricular_encoder,
+                    field_encoder, grade_mapping: Optional[dict] = None) -> "FieldPreprocessor":
+        """
+        Build from the fitted training objects (StandardScaler, OneHotEncoder,
+        LabelEncoder); column orders are the ones the model was trained on.
+        field_encoder is the LabelEncoder of the target field names.
+        """
+        return cls(
+            {'interests': INTEREST_COLS, 'skills': SKILL_COLS,
+             'subject_taken': SUBJECT_TAKEN_COLS, 'grades': GRADE_COLS},
+            {str(k): v for k, v in (grade_mapping or GRADE_MAPPING).items()},
+            [str(c) for c in study_encoder.categories_[0]],
+            [str(c) for c in extracurricular_encoder.classes_],
+            {'interests': (interest_scaler.mean_, interest_scaler.scale_),
+             'skills': (skill_scaler.mean_, skill_scaler.scale_),
+             'grades': (grade_scaler.mean_, grade_scaler.scale_)},
+            [str(c) for c in field_encoder.classes_],
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FieldPreprocessor":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        preprocessor = cls(
+            data['columns'], data['grade_mapping'], data['study_categories'], data['extracurricular_classes'],
+            {block: (scaler['mean'], scaler['std']) for block, scaler in data['scalers'].items()},
+            data.get('field_classes'),
+        )
+        if data.get('feature_columns', preprocessor.feature_columns) != preprocessor.feature_columns:
+            raise ValueError(f"{path}: feature_columns do not match the column blocks")
+        return preprocessor
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'columns': self.columns,
+                'feature_columns': self.feature_columns,
+                'grade_mapping': self.grade_mapping,
+                'study_categories': self.study_categories,
+                'extracurricular_classes': self.extracurricular_classes,
+                'scalers': {block: {'mean': mean, 'std': std} for block, (mean, std) in self.scalers.items()},
+                'field_classes': self.field_classes,
+            }, f, indent=2)
+            f.write('\n')
+
+    def transform(self, profiles: Sequence) -> np.ndarray:
+        """
+        Encode profiles into one N x n_features float64 matrix: the raw values
+        are written in a single allocation, then scaled in place.
+        """
+        interests, skills = self.columns['interests'], self.columns['skills']
+        subject_taken, grades = self.columns['subject_taken'], self.columns['grades']
+        grade_map, study, default_study = self._grades, self._study, self._default_study
+        extracurricular = self._extracurricular
+        X = np.array([
+            [p.interests.get(col, DEFAULT_RATING) for col in interests]
+            + [p.skills.get(col, DEFAULT_RATING) for col in skills]
+            + [p.subject_taken.get(col, 0) for col in subject_taken]
+            + [grade_map.get(p.grades.get(col, '0'), 0) for col in grades]
+            + study.get(p.study, default_study)
+            + [extracurricular[bool(p.extracurricular)]]
+            for p in profiles
+        ], dtype=np.float64).reshape(len(profiles), self.n_features)
+        X -= self.mean
+        X /= self.std
+        return X
+
+
+DEFAULT_PREPROCESSOR = FieldPreprocessor.default()
+
+
+def preprocessing_path(model_path: str) -> str:
+    """Where the preprocessing artifact for a model file lives"""
+    return os.path.splitext(model_path)[0] + PREPROCESSING_SUFFIX
 
 
 def predict_field_interests(
@@ -75,7 +234,8 @@ def predict_field_interests(
     interest_dict: dict,
     skill_dict: dict,
     model,
-    top_k: int = 3
+    top_k: int = 3,
+    preprocessor: Optional[FieldPreprocessor] = None
 ) -> List[Tuple[str, float]]:
     """
     Predict field category interests from student profile data.
@@ -83,55 +243,37 @@ def predict_field_interests(
     
     Returns: List of (field_name, probability) tuples, sorted by probability descending.
     """
-    # Convert grades to numeric
-    grade_numeric = [GRADE_MAPPING.get(grades_dict.get(col, '0'), 0) for col in GRADE_COLS]
-    
-    # Prepare subject grade vector (scaled)
-    # Note: In production, the scaler should be loaded from training artifacts
-    # For now, we'll use a simple normalization
-    subject_grade_vec = np.array([grade_numeric]) / 5.0  # Normalize to 0-1
-    
-    # Subject taken vector
-    subject_taken_vec = [[subject_taken_dict.get(col, 0) for col in SUBJECT_TAKEN_COLS]]
-    
-    # Interest vector (scaled)
-    interest_values = [interest_dict.get(col, 3) for col in INTEREST_COLS]  # Default to 3 (neutral)
-    interest_vec = np.array([interest_values]) / 5.0  # Normalize to 0-1
-    
-    # Skill vector (scaled)
-    skill_values = [skill_dict.get(col, 3) for col in SKILL_COLS]  # Default to 3 (neutral)
-    skill_vec = np.array([skill_values]) / 5.0  # Normalize to 0-1
-    
-    # Study one-hot encoding
-    # Note: In production, the encoder should be loaded from training artifacts
-    # For now, we'll create a simple encoding
-    study_map = {'SPM': [1, 0], 'STPM': [0, 1]}
-    study_vec = np.array([study_map.get(study, [1, 0])])
-    
-    # Extracurricular encoding
-    extracurricular_encoded = [[1 if extracurricular else 0]]
-    
-    # Combine all features (matching notebook structure)
-    X_input = np.hstack([
-        interest_vec,
-        skill_vec,
-        subject_taken_vec,
-        subject_grade_vec,
-        study_vec,
-        extracurricular_encoded
-    ])
-    
-    # Get predictions from model
-    probs = model.predict_proba(X_input)[0]
-    
-    # Map probabilities to field category names
-    # The model outputs probabilities for each class in order
-    # We need to map them to field category names
-    field_probs = list(zip(FIELD_CATEGORIES, probs))
-    
-    # Sort by probability descending
-    field_probs.sort(key=lambda x: x[1], reverse=True)
-    
-    # Return top K
-    return field_probs[:top_k]
+    profile = SimpleNamespace(
+        study=study, extracurricular=extracurricular, grades=grades_dict,
+        subject_taken=subject_taken_dict, interests=interest_dict, skills=skill_dict
+    )
+    probs = model.predict_proba(encode_field_profiles([profile], preprocessor))
+    return rank_field_probabilities(probs, preprocessor)[0][:top_k]
+
+
+def encode_field_profiles(profiles: Sequence, preprocessor: Optional[FieldPreprocessor] = None) -> np.ndarray:
+    """
+    Encode many student profiles into one N x 47 float64 feature matrix.
 
+    Each profile needs the FieldPredictionRequest attributes (study,
+    extracurricular, grades, subject_taken, interests, skills). Column order:
+    interests | skills | subjects taken | subject grades | study one-hot | extracurricular
+    Uses the model's preprocessing artifact when given, otherwise the defaults.
+    """
+    return (preprocessor or DEFAULT_PREPROCESSOR).transform(profiles)
+
+
+def rank_field_probabilities(probs: np.ndarray,
+                             preprocessor: Optional[FieldPreprocessor] = None) -> List[List[Tuple[str, float]]]:
+    """
+    Map a N x classes probability matrix to ranked (field_name, probability) lists,
+    one per row, sorted by probability descending (ties keep class order).
+    Field names are the preprocessor's field classes (default: FIELD_CATEGORIES).
+    """
+    field_names = (preprocessor or DEFAULT_PREPROCESSOR).field_names
+    if probs.shape[1] != len(field_names):
+        raise ValueError(f"Model returned {probs.shape[1]} classes, preprocessing names {len(field_names)} fields")
+    order = np.argsort(-probs, axis=1, kind="stable")
+    names = np.array(field_names, dtype=object)[order].tolist()
+    values = np.take_along_axis(probs, order, axis=1).tolist()
+    return [list(zip(row_names, row_values)) for row_names, row_values in zip(names, values)]
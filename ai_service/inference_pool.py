@@ -0,0 +1,90 @@
+"""
+Bounded worker pool for CPU-bound inference.
+
+Feature encoding, predict_proba and ranking run in worker threads so a large
+/recommend call does not block the event loop (NumPy and BLAS release the GIL
+for the heavy parts). Admission is bounded: once `workers + queue_size` jobs
+are in flight, new requests are rejected with 429. Each job has a timeout
+after which the request fails with 504; the worker keeps its slot until the
+job actually finishes, so a timed-out job still counts against capacity.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from instrumentation import INFERENCE_IN_FLIGHT, INFERENCE_REJECTED, INFERENCE_TIMEOUTS
+from profiling import run_tracked
+
+
+class InferencePool:
+    """Thread pool with an admission limit and per-job timeout"""
+
+    def __init__(self, workers: int, queue_size: int, timeout: Optional[float]):
+        self.workers = workers
+        self.max_in_flight = workers + queue_size
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.in_flight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._executor
+
+    async def run(self, fn: Callable, *args, always_admit: bool = False):
+        """
+        Run fn(*args) on a worker thread and return its result.
+
+        Raises HTTPException 429 when the pool is full (unless always_admit,
+        used by streams that are already flow-controlled) and 504 on timeout.
+        Context variables (log sampling, stage timers, request profile) are
+        carried over, and a profiled request's samples include the worker thread.
+        """
+        if not always_admit and self.in_flight >= self.max_in_flight:
+            INFERENCE_REJECTED.inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Inference queue is full, retry later",
+                headers={"Retry-After": "1"}
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(copy_context().run, run_tracked, fn, *args))
+        self._acquire()
+        future.add_done_callback(self._release)
+        try:
+            # Shielded so a timeout does not release the slot while the worker is still busy
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            INFERENCE_TIMEOUTS.inc()
+            raise HTTPException(
+                status_code=504,
+                detail=f"Inference timed out after {self.timeout:g}s"
+            )
+
+    def _acquire(self) -> None:
+        self.in_flight += 1
+        INFERENCE_IN_FLIGHT.set(self.in_flight)
+
+    def _release(self, _future) -> None:
+        self.in_flight -= 1
+        INFERENCE_IN_FLIGHT.set(self.in_flight)
+
+    def info(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "timeout_seconds": self.timeout,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
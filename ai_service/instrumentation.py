@@ -0,0 +1,326 @@
+"""
+Prometheus-style metrics and per-stage latency timers for the AI service.
+
+Endpoints are wrapped with @instrument_endpoint and mark their internal stages
+with `with stage("...")`. MetricsMiddleware adds the stages that happen outside
+the handler: request parsing (routing, body read, validation) and response
+serialization. Everything is exposed in Prometheus text format by render_metrics().
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+class _Metric:
+    """Base for labelled metrics; label values are keyed by a tuple in label order"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket upper bounds"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list = []
+
+STAGE_SECONDS = Histogram(
+    "ai_service_stage_duration_seconds",
+    "Time spent in each request stage",
+    ["endpoint", "stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "ai_service_request_duration_seconds",
+    "End-to-end request latency",
+    ["endpoint"],
+)
+BATCH_SIZE = Histogram(
+    "ai_service_batch_size",
+    "Rows per predict_proba call",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+PROGRAMS_FILTERED = Counter(
+    "ai_service_programs_filtered_total",
+    "Candidate programs rejected by each hard constraint",
+    ["constraint"],
+)
+PROGRAMS_SCORED = Counter(
+    "ai_service_programs_scored_total",
+    "Candidate programs that passed the hard constraints and were scored",
+)
+PREDICTION_ERRORS = Counter(
+    "ai_service_prediction_errors_total",
+    "Model prediction failures",
+    ["endpoint"],
+)
+COALESCE_BATCH_SIZE = Histogram(
+    "ai_service_coalesce_batch_size",
+    "Rows per micro-batch dispatched by the /predict-fields coalescer",
+    buckets=SIZE_BUCKETS,
+)
+COALESCE_WAIT_SECONDS = Histogram(
+    "ai_service_coalesce_wait_seconds",
+    "Time a row waited in the coalescer before its batch was dispatched",
+)
+CACHE_HITS = Counter(
+    "ai_service_cache_hits_total",
+    "Cache lookups that returned a stored result",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "ai_service_cache_misses_total",
+    "Cache lookups that found no valid entry",
+    ["cache"],
+)
+CACHE_EVICTIONS = Counter(
+    "ai_service_cache_evictions_total",
+    "Entries evicted to stay within the cache byte budget",
+    ["cache"],
+)
+CACHE_BYTES = Gauge(
+    "ai_service_cache_bytes",
+    "Approximate size of the cached entries",
+    ["cache"],
+)
+RECOMMEND_CACHE_LOOKUPS = Counter(
+    "ai_service_recommend_cache_lookups_total",
+    "/recommend cache outcomes: response_hit, scores_hit (no re-scoring), partial or miss",
+    ["result"],
+)
+RECOMMEND_CACHE_SCORES_REUSED = Counter(
+    "ai_service_recommend_cache_scores_reused_total",
+    "Program scores served from the /recommend score cache instead of the model",
+)
+RECOMMEND_SERVED = Counter(
+    "ai_service_recommend_served_total",
+    "/recommend responses by source: materialized (top-K table), cache (result cache) or live (scored now)",
+    ["source"],
+)
+MODEL_RELOADS = Counter(
+    "ai_service_model_reloads_total",
+    "Model loads by outcome: swapped in, or failed (old version kept serving)",
+    ["result"],
+)
+INFERENCE_IN_FLIGHT = Gauge(
+    "ai_service_inference_in_flight",
+    "Inference jobs running or queued on the worker pool",
+)
+INFERENCE_REJECTED = Counter(
+    "ai_service_inference_rejected_total",
+    "Requests rejected with 429 because the inference pool was full",
+)
+INFERENCE_TIMEOUTS = Counter(
+    "ai_service_inference_timeouts_total",
+    "Inference jobs that exceeded the per-request timeout",
+)
+
+
+class RequestTimer:
+    """Timestamps for one request, shared between the middleware and the endpoint"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint: Optional[str] = None
+        self.streaming = False
+        self.handler_finished: Optional[float] = None
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current endpoint (no-op outside an instrumented request)"""
+    timer = _current_timer.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        endpoint = timer.endpoint if timer and timer.endpoint else None
+        if endpoint:
+            STAGE_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, stage=name)
+
+
+def instrument_endpoint(endpoint: str, streaming: bool = False):
+    """
+    Decorator for async endpoints: records the parse stage (request start to
+    handler start), labels the request, and counts 5xx prediction errors.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is not None:
+                timer.endpoint = endpoint
+                timer.streaming = streaming
+                STAGE_SECONDS.observe(time.perf_counter() - timer.started, endpoint=endpoint, stage="parse")
+            try:
+                return await func(*args, **kwargs)
+            except HTTPException as e:
+                if e.status_code == 500:
+                    PREDICTION_ERRORS.inc(endpoint=endpoint)
+                raise
+            finally:
+                if timer is not None:
+                    timer.handler_finished = time.perf_counter()
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that owns the per-request timer. Serialization is measured
+    from handler return to the response start message; total latency to the
+    final body message. Requests not handled by an instrumented endpoint are
+    not recorded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+
+        async def timed_send(message):
+            if timer.endpoint:
+                now = time.perf_counter()
+                if message["type"] == "http.response.start" and timer.handler_finished and not timer.streaming:
+                    STAGE_SECONDS.observe(now - timer.handler_finished, endpoint=timer.endpoint, stage="serialize")
+                elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                    REQUEST_SECONDS.observe(now - timer.started, endpoint=timer.endpoint)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current_timer.reset(token)
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
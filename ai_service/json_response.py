@@ -0,0 +1,48 @@
+"""
+Fast JSON serialization for large scoring responses.
+
+Endpoints build plain dicts and lists straight from the NumPy id, score and
+probability arrays and return them as pre-rendered JSON bytes. Returning a
+Response skips FastAPI's response_model validation and serialization (one
+Pydantic object per item); the response_model declarations stay on the routes,
+so the OpenAPI schema is unchanged.
+
+Uses orjson when it is installed and falls back to the standard json module.
+"""
+
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(payload) -> bytes:
+    """Compact UTF-8 JSON for dicts/lists of str, int, float, bool and None"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def json_response(payload) -> Response:
+    return Response(content=dumps(payload), media_type=JSON_MEDIA_TYPE)
+
+
+def recommendation_items(program_ids: np.ndarray, scores: np.ndarray) -> list:
+    """RecommendationResponse.recommendations entries for ranked id and score arrays"""
+    return [
+        {"program_id": program_id, "score": score}
+        for program_id, score in zip(program_ids.tolist(), scores.tolist())
+    ]
+
+
+def field_items(ranked: list) -> list:
+    """FieldPredictionResponse.fields entries for one ranked (field_name, probability) list"""
+    return [{"field_name": name, "probability": probability} for name, probability in ranked]
+
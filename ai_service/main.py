@@ -3,19 +3,157 @@ FastAPI service for ML-based program recommendations.
 Loads a trained sklearn model and provides inference-only recommendations.
 """
 
+import asyncio
+import logging
 import os
-import joblib
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import time
+from typing import Dict, List, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 import numpy as np
-from sklearn.linear_model import LogisticRegression
+
+from binary_format import (
+    BINARY_MEDIA_TYPE, BinaryFormatError, decode_recommend_request, encode_recommend_response, is_binary_content_type
+)
+from cache import LRUCache, array_key
+from catalog import ProgramCatalog, load_snapshot
+from coalescer import RowCoalescer
+from constraints import combine_stats, evaluate_constraints
+from compact_features import CompactFeatureCache, CompactProgramFeatures
+from decomposed_scoring import ProgramLogitsCache, decomposed_logits, is_decomposable, program_logits
+from field_prediction import NUM_FIELD_FEATURES, encode_field_profiles, rank_field_probabilities
+from inference_pool import InferencePool
+from json_response import JSON_MEDIA_TYPE, dumps, field_items, json_response, recommendation_items
+from instrumentation import (
+    BATCH_SIZE, PREDICTION_ERRORS, PROGRAMS_FILTERED, PROGRAMS_SCORED, PROMETHEUS_CONTENT_TYPE, RECOMMEND_SERVED,
+    MetricsMiddleware, instrument_endpoint, render_metrics, stage
+)
+from model_registry import ModelRegistry, ModelVersion
+from profiling import Profiler, ProfilingMiddleware
+from program_features import ProgramColumns, build_feature_matrix
+from ranking import top_k_indices
+from recommendation_cache import RecommendationCache, create_backend, profile_fingerprint
+from service_logging import (
+    DEBUG_DUMP_MAX_ROWS, RequestLogContextMiddleware, configure_logging, debug_features_enabled, log_event
+)
+from shared_store import SharedStore
+from streaming import NDJSON_MEDIA_TYPE, DuplexStreamingResponse, iter_chunks, ndjson_line
+from topk_table import TopKTable
 
 app = FastAPI(title="AI Recommendation Service", version="1.0.0")
+logger = configure_logging()
+
+# Active model file; the registry reloads it when it changes and /admin/model/reload
+# can switch to another file in the same directory
+MODEL_PATH = os.environ.get(
+    "MODEL_PATH",
+    os.path.join(os.path.dirname(__file__), "model", "best_logistic_regression_model.pkl")
+)
+# Seconds between checks of the model file for changes (0 disables watching)
+MODEL_WATCH_INTERVAL_SECONDS = float(os.environ.get("MODEL_WATCH_INTERVAL_SECONDS", "5"))
+
+# Requests are served by the compiled NumPy scorer when MODEL_SCORER=compiled
+# and the estimator is supported, otherwise by the estimator itself
+MODEL_SCORER = os.environ.get("MODEL_SCORER", "compiled").lower()
+# Matmul precision of the compiled scorer: float64 (default) matches sklearn's
+# probabilities; float32 is faster and drifts by up to ~1e-5
+COMPILED_SCORER_DTYPE = os.environ.get("COMPILED_SCORER_DTYPE", "float64").lower()
+
+# "standard": load and warm up the model before the server accepts requests.
+# "fast": accept connections right away and load the model in the background,
+# from a memory-mapped compiled artifact when one exists (no sklearn import);
+# /health/ready reports 503 until the model is warm.
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "standard").lower()
+
+# Global program catalog (replaced atomically on refresh)
+catalog: Optional[ProgramCatalog] = None
+CATALOG_PATH = os.environ.get(
+    "PROGRAM_CATALOG_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "programs.json")
+)
+
+# Directory (ideally on tmpfs, e.g. /dev/shm/ai_service) where worker processes
+# share memory-mapped catalog versions and the active model file; unset = per-process state
+SHARED_DATA_DIR = os.environ.get("SHARED_DATA_DIR", "")
+# Seconds between checks for catalog versions and model switches published by other workers
+SHARED_SYNC_INTERVAL_SECONDS = float(os.environ.get("SHARED_SYNC_INTERVAL_SECONDS", "1"))
+shared_store = SharedStore(SHARED_DATA_DIR) if SHARED_DATA_DIR else None
+
+# Max profiles per predict_proba call in /predict-fields/batch (bounds feature matrix memory)
+FIELD_BATCH_CHUNK_SIZE = int(os.environ.get("FIELD_BATCH_CHUNK_SIZE", "1000"))
+
+# Lines scored per chunk by the NDJSON streaming endpoints
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "256"))
+
+# Worker threads for feature encoding and predict_proba (keeps the event loop free)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs allowed to wait for a worker before requests are rejected with 429
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "32"))
+# Per-request inference timeout in seconds (504 when exceeded, 0 disables)
+INFERENCE_TIMEOUT_SECONDS = float(os.environ.get("INFERENCE_TIMEOUT_SECONDS", "30"))
+inference_pool = InferencePool(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_TIMEOUT_SECONDS)
+
+# Micro-batching for concurrent /predict-fields calls: rows arriving within the
+# window (or until the row limit) share one predict_proba call. 0 disables it.
+FIELD_COALESCE_WINDOW_MS = float(os.environ.get("FIELD_COALESCE_WINDOW_MS", "2"))
+FIELD_COALESCE_MAX_ROWS = int(os.environ.get("FIELD_COALESCE_MAX_ROWS", "64"))
 
-# Global model variable
-model: Optional[LogisticRegression] = None
-model_loaded = False
+# /predict-fields result cache keyed by the encoded feature vector (0 bytes disables it).
+# Keys include the model version, and the cache is cleared whenever a new model is swapped in.
+FIELD_CACHE_MAX_BYTES = int(os.environ.get("FIELD_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+FIELD_CACHE_TTL_SECONDS = float(os.environ.get("FIELD_CACHE_TTL_SECONDS", "3600"))
+field_cache = LRUCache("field_predictions", FIELD_CACHE_MAX_BYTES, ttl=FIELD_CACHE_TTL_SECONDS)
+
+# /recommend result cache: "memory" (per process), "redis" (shared, RECOMMEND_CACHE_URL) or "off"
+RECOMMEND_CACHE_BACKEND = os.environ.get("RECOMMEND_CACHE_BACKEND", "memory").lower()
+RECOMMEND_CACHE_MAX_BYTES = int(os.environ.get("RECOMMEND_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RECOMMEND_CACHE_TTL_SECONDS = float(os.environ.get("RECOMMEND_CACHE_TTL_SECONDS", "600"))
+RECOMMEND_CACHE_URL = os.environ.get("RECOMMEND_CACHE_URL", "redis://localhost:6379/0")
+recommend_cache = RecommendationCache(create_backend(
+    RECOMMEND_CACHE_BACKEND, RECOMMEND_CACHE_MAX_BYTES, RECOMMEND_CACHE_TTL_SECONDS, RECOMMEND_CACHE_URL
+))
+
+# /recommend scoring with the compiled scorer: "decomposed" adds each program's
+# program-only logits (cached once per catalog and model version for catalog programs)
+# to the request's student and interaction terms; "compact" does the same from a quantized
+# per-catalog feature store (compact_features.py) instead of cached logits, trading float
+# rounding for memory; "full" builds the whole feature matrix
+RECOMMEND_SCORING = os.environ.get("RECOMMEND_SCORING", "decomposed").lower()
+program_logits_cache = ProgramLogitsCache(shared_store)
+compact_feature_cache = CompactFeatureCache(shared_store)
+
+# Materialized top-K table built by materialize_topk.py; field_id requests whose
+# profile lies on its grid are answered from it while it matches the serving
+# catalog and model (loaded at startup when present)
+TOPK_TABLE_PATH = os.environ.get(
+    "TOPK_TABLE_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "topk_table")
+)
+topk_table: Optional[TopKTable] = None
+
+# Response header reporting how /recommend was served: materialized, cache or live
+RECOMMEND_SOURCE_HEADER = "X-Recommend-Source"
+
+# Shared secret for /admin endpoints (admin endpoints are open when unset)
+ADMIN_TOKEN = os.environ.get("AI_SERVICE_ADMIN_TOKEN")
+
+# On-demand request profiling (off by default): requests sending X-Profile: 1
+# (plus X-Admin-Token when one is configured), and this fraction of all requests,
+# are sampled every PROFILE_INTERVAL_MS; the last PROFILE_RING_SIZE profiles are kept
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "1"))
+PROFILE_RING_SIZE = int(os.environ.get("PROFILE_RING_SIZE", "20"))
+profiler = Profiler(PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS / 1000, PROFILE_RING_SIZE, admin_token=ADMIN_TOKEN)
+
+# Innermost: profiles routing, body parsing, the handler and serialization
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+# Per-request log sampling and X-Debug-Features handling
+app.add_middleware(RequestLogContextMiddleware, admin_token=ADMIN_TOKEN)
+# Outermost: request timer for parse/serialize stages and total latency
+app.add_middleware(MetricsMiddleware)
 
 
 class StudentProfile(BaseModel):
@@ -35,6 +173,7 @@ class ProgramInput(BaseModel):
     tuition_fee: Optional[float] = None
     duration_months: Optional[int] = None
     level: str
+    university_state: Optional[str] = Field(None, description="State of the university (enables the preferred_states constraint)")
 
 
 class FieldPredictionRequest(BaseModel):
@@ -55,13 +194,36 @@ class FieldPrediction(BaseModel):
 
 class FieldPredictionResponse(BaseModel):
     """Response with ranked field category predictions"""
+    model_config = ConfigDict(protected_namespaces=())
+
     fields: List[FieldPrediction]
+    model_version: Optional[str] = Field(None, description="Model version that produced the predictions")
+
+
+class FieldPredictionBatchRequest(BaseModel):
+    """Request body for batch field category prediction"""
+    profiles: List[FieldPredictionRequest]
+
+
+class FieldPredictionBatchResponse(BaseModel):
+    """Ranked field category predictions, one entry per input profile (same order)"""
+    model_config = ConfigDict(protected_namespaces=())
+
+    results: List[FieldPredictionResponse]
+    model_version: Optional[str] = Field(None, description="Model version that produced the predictions")
 
 
 class RecommendationRequest(BaseModel):
-    """Request body for recommendations"""
+    """
+    Request body for recommendations.
+    Candidates come from `programs` unless `program_ids` or `field_id` is given,
+    in which case they are looked up in the loaded program catalog.
+    """
     student_profile: StudentProfile
-    programs: List[ProgramInput]
+    programs: List[ProgramInput] = Field(default_factory=list, description="Full candidate program payloads")
+    program_ids: Optional[List[int]] = Field(None, description="Candidate program IDs from the catalog")
+    field_id: Optional[int] = Field(None, description="Use every catalog program in this field as a candidate")
+    top_k: Optional[int] = Field(None, ge=1, description="Return only the K highest-scoring programs (all when omitted)")
 
 
 class ProgramRecommendation(BaseModel):
@@ -70,32 +232,136 @@ class ProgramRecommendation(BaseModel):
     score: float = Field(..., ge=0.0, le=1.0, description="Confidence score between 0 and 1")
 
 
+class ConstraintStats(BaseModel):
+    """Hard-constraint filtering summary for a recommendation request"""
+    candidates: int
+    passed: int
+    rejected_by: Dict[str, int] = Field(..., description="Programs rejected per constraint (level, field, budget, location)")
+
+
 class RecommendationResponse(BaseModel):
     """Response with ranked program recommendations"""
+    model_config = ConfigDict(protected_namespaces=())
+
     recommendations: List[ProgramRecommendation]
+    constraint_stats: Optional[ConstraintStats] = None
+    catalog_version: Optional[int] = Field(None, description="Catalog version used when candidates came from the catalog")
+    model_version: Optional[str] = Field(None, description="Model version that produced the scores")
 
 
-def load_model():
-    """Load the trained sklearn model from pickle file"""
-    global model, model_loaded
-    
-    if model_loaded:
-        return
-    
-    model_path = os.path.join(os.path.dirname(__file__), "model", "best_logistic_regression_model.pkl")
-    
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file not found at {model_path}")
+class CatalogUpdateRequest(BaseModel):
+    """Request body for replacing the program catalog"""
+    programs: List[ProgramInput]
+
+
+class ModelReloadRequest(BaseModel):
+    """Request body for reloading the model"""
+    file: Optional[str] = Field(
+        None, description="Model file name in the model directory (default: reload the active file)"
+    )
+
+
+def model_smoke_batch(version: ModelVersion) -> np.ndarray:
+    """Feature rows every new model must score sanely before it is swapped in"""
+    field_rows = encode_field_profiles([
+        FieldPredictionRequest(study="SPM", extracurricular=True, grades={}, subject_taken={}, interests={}, skills={}),
+        FieldPredictionRequest(
+            study="STPM", extracurricular=False, grades={"Mathematics": "A"},
+            subject_taken={"Took_Mathematics": 1}, interests={"Computer_Interest": 5}, skills={"Logical": 5}
+        ),
+    ], version.preprocessor)
+    program_rows = build_feature_matrix(
+        StudentProfile(study_level="Bachelor", field_ids=[1], cgpa=3.2, budget=40000),
+        ProgramColumns.from_programs([
+            ProgramInput(program_id=1, university_id=1, field_id=1, tuition_fee=30000, duration_months=36, level="Bachelor"),
+            ProgramInput(program_id=2, university_id=50, field_id=7, level="Diploma"),
+        ])
+    )
+    return np.vstack([field_rows, program_rows])
+
+
+def warm_up_model(version: ModelVersion) -> None:
+    """Run scoring, ranking and serialization once so the first real request pays no first-call costs"""
+    started = time.perf_counter()
+    probs = version.scorer.predict_proba(model_smoke_batch(version))
+    ranked = rank_field_probabilities(probs[:1], version.preprocessor)[0]
+    dumps({"fields": field_items(ranked), "model_version": version.version})
+    top_k_indices(probs[:, 1], 1)
+    log_event(
+        logging.DEBUG, "model_warmed_up", version=version.version,
+        seconds=round(time.perf_counter() - started, 4)
+    )
+
+
+def on_model_swap(version: ModelVersion) -> None:
+    # Entries are keyed by model version; drop the old version's entries right away
+    field_cache.clear()
+    program_logits_cache.clear()
+
+
+registry = ModelRegistry(
+    MODEL_PATH, MODEL_SCORER, COMPILED_SCORER_DTYPE, expected_features=NUM_FIELD_FEATURES,
+    smoke_batch=model_smoke_batch, on_swap=on_model_swap, warm_up=warm_up_model,
+    use_artifacts=STARTUP_MODE == "fast" or shared_store is not None
+)
+
+
+def load_model() -> ModelVersion:
+    """Load the model file at MODEL_PATH through the registry (no-op when a version is already serving)"""
+    if registry.current is not None:
+        return registry.current
     
     try:
-        # Use joblib.load() for sklearn models (more reliable than pickle)
-        model = joblib.load(model_path)
-        model_loaded = True
-        print(f"Model loaded successfully from {model_path}")
+        if shared_store:
+            # One worker at a time: the first compiles the artifact, the rest map it.
+            # Follows a model switch another worker already published.
+            with shared_store.lock():
+                return registry.load(shared_store.model_path())
+        return registry.load()
+    except FileNotFoundError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to load model: {str(e)}")
 
 
+def require_model() -> ModelVersion:
+    """The serving model version, or 503 when no model is loaded"""
+    active = registry.current
+    if active is None:
+        raise HTTPException(
+            status_code=503,
+            detail="ML model not loaded. Service unavailable."
+        )
+    return active
+
+
+def load_catalog(path: str = CATALOG_PATH):
+    """Load (or refresh) the program catalog from a JSON/CSV/Parquet snapshot"""
+    global catalog
+    
+    columns = load_snapshot(path)
+    if shared_store:
+        catalog = shared_store.publish_catalog(columns, source=path)
+    else:
+        next_version = catalog.version + 1 if catalog else 1
+        catalog = ProgramCatalog(columns, version=next_version, source=path)
+    log_event(logging.INFO, "catalog_loaded", version=catalog.version, programs=len(catalog), source=path)
+
+
+def load_topk_table(path: str = TOPK_TABLE_PATH):
+    """Load (or reload) the materialized top-K table, memory-mapped"""
+    global topk_table
+    
+    topk_table = TopKTable.load(path)
+    log_event(logging.INFO, "topk_table_loaded", **topk_table.info())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject admin calls without the shared admin token (when one is configured)"""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 def extract_features(student_profile: StudentProfile, program: ProgramInput) -> np.ndarray:
     """
     Extract features from student profile and program for model inference.
@@ -228,7 +494,7 @@ def extract_features(student_profile: StudentProfile, program: ProgramInput) ->
     
     # Ensure we have exactly 47 features
     if len(features) != 47:
-        print(f"[WARNING] Feature count mismatch: expected 47, got {len(features)}. Padding or truncating.")
+        log_event(logging.WARNING, "feature_count_mismatch", expected=47, got=len(features))
         # Pad with zeros if too few, truncate if too many
         while len(features) < 47:
             features.append(0.0)
@@ -237,57 +503,312 @@ def extract_features(student_profile: StudentProfile, program: ProgramInput) ->
     return np.array(features, dtype=np.float32).reshape(1, -1)
 
 
-def apply_hard_constraints(
-    student_profile: StudentProfile,
-    program: ProgramInput,
-    university_state: Optional[str] = None
-) -> bool:
-    """
-    Apply hard constraints to filter out incompatible programs.
-    Returns True if program passes all constraints, False otherwise.
-    """
-    # Level mismatch
-    if student_profile.study_level and program.level:
-        if student_profile.study_level != program.level:
-            return False
-    
-    # Field mismatch (if student has specific field interests)
-    if student_profile.field_ids and program.field_id not in student_profile.field_ids:
-        return False
-    
-    # Budget constraint (strict: must be within budget)
-    if student_profile.budget and program.tuition_fee:
-        if program.tuition_fee > student_profile.budget * 1.1:  # Allow 10% tolerance
-            return False
-    
-    # Location preference (if specified)
-    if student_profile.preferred_states and university_state:
-        if university_state not in student_profile.preferred_states:
-            return False
-    
-    return True
+async def load_model_in_background() -> None:
+    """Load and warm up the model off the event loop; the service is ready once it is serving"""
+    started = time.perf_counter()
+    try:
+        active = await asyncio.to_thread(load_model)
+    except Exception as e:
+        log_event(
+            logging.WARNING, "model_load_failed", error=str(e),
+            detail="Service will start but recommendations will fail until model is available"
+        )
+        return
+    log_event(
+        logging.INFO, "service_ready", model_version=active.version, startup_mode=STARTUP_MODE,
+        model_load_seconds=round(time.perf_counter() - started, 4)
+    )
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Load model on application startup"""
+    """Load model on application startup (in the background when STARTUP_MODE=fast)"""
+    if STARTUP_MODE == "fast":
+        app.state.model_loader = asyncio.create_task(load_model_in_background())
+    else:
+        await load_model_in_background()
+    if MODEL_WATCH_INTERVAL_SECONDS > 0:
+        app.state.model_watcher = asyncio.create_task(registry.watch(MODEL_WATCH_INTERVAL_SECONDS))
+    
+    if shared_store:
+        attach_shared_catalog()
+        app.state.shared_sync = asyncio.create_task(sync_shared_state(SHARED_SYNC_INTERVAL_SECONDS))
+    elif os.path.exists(CATALOG_PATH):
+        try:
+            load_catalog(CATALOG_PATH)
+        except Exception as e:
+            log_event(logging.WARNING, "catalog_load_failed", error=str(e), path=CATALOG_PATH)
+    else:
+        log_event(
+            logging.INFO, "catalog_snapshot_missing", path=CATALOG_PATH,
+            detail="Catalog requests disabled until refreshed"
+        )
+    
+    if os.path.exists(TOPK_TABLE_PATH):
+        try:
+            load_topk_table(TOPK_TABLE_PATH)
+        except Exception as e:
+            log_event(logging.WARNING, "topk_table_load_failed", error=str(e), path=TOPK_TABLE_PATH)
+
+
+def attach_shared_catalog():
+    """Attach the shared catalog; the first worker to start publishes it from the snapshot"""
+    global catalog
+    
     try:
-        load_model()
+        catalog = shared_store.attach_catalog()
+        if catalog is None and os.path.exists(CATALOG_PATH):
+            catalog = shared_store.publish_catalog(load_snapshot(CATALOG_PATH), source=CATALOG_PATH, if_absent=True)
     except Exception as e:
-        print(f"WARNING: Failed to load model on startup: {e}")
-        print("Service will start but recommendations will fail until model is available")
+        log_event(logging.WARNING, "catalog_load_failed", error=str(e), path=CATALOG_PATH)
+        return
+    if catalog is None:
+        log_event(
+            logging.INFO, "catalog_snapshot_missing", path=CATALOG_PATH,
+            detail="Catalog requests disabled until refreshed"
+        )
+    else:
+        log_event(logging.INFO, "catalog_attached", version=catalog.version, programs=len(catalog))
+
+
+async def sync_shared_state(interval: float) -> None:
+    """Follow catalog versions and model switches published by other workers"""
+    global catalog
+    
+    failed_model_path = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version = shared_store.catalog_version()
+            if version is not None and (catalog is None or catalog.version != version):
+                catalog = await asyncio.to_thread(shared_store.attach_catalog)
+                log_event(logging.INFO, "catalog_attached", version=catalog.version, programs=len(catalog))
+            
+            path = shared_store.model_path()
+            active = registry.current
+            if path and path != failed_model_path and (active is None or active.path != path):
+                try:
+                    await asyncio.to_thread(registry.load, path)
+                except Exception:
+                    # Already logged by the registry; retry only after the next switch
+                    failed_model_path = path
+        except Exception as e:
+            log_event(logging.WARNING, "shared_sync_failed", error=str(e))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background model tasks and the inference worker threads"""
+    for name in ("model_loader", "model_watcher", "shared_sync"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    inference_pool.shutdown()
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    active = registry.current
     return {
         "status": "healthy",
-        "model_loaded": model_loaded
+        "model_loaded": active is not None,
+        "ready": active is not None,
+        "model_version": active.version if active else None,
+        "catalog_version": catalog.version if catalog else None,
+        "worker_pid": os.getpid()
+    }
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and the event loop responds (model may still be loading)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: a validated, warmed-up model is serving; 503 until then"""
+    active = registry.current
+    if active is None:
+        raise HTTPException(status_code=503, detail="Model not loaded yet")
+    return {"status": "ready", "model_version": active.version}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms, batch sizes and counters"""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/admin/model", dependencies=[Depends(require_admin)])
+async def get_model_info():
+    """Serving model version and the model files available for reload"""
+    active = registry.current
+    return {
+        "active": active.info() if active else None,
+        "available": registry.available()
+    }
+
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+async def reload_model(request: Optional[ModelReloadRequest] = None):
+    """
+    Load, validate and swap in a model file without restarting. The current
+    version keeps serving until the swap; on failure it stays in place.
+    """
+    try:
+        path = registry.resolve(request.file) if request and request.file else None
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        version = await asyncio.to_thread(registry.load, path)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Model rejected, still serving previous version: {str(e)}")
+    if shared_store:
+        # Other workers switch on their next sync
+        shared_store.publish_model_path(version.path)
+    return version.info()
+
+
+@app.get("/admin/catalog", dependencies=[Depends(require_admin)])
+async def get_catalog_info():
+    """Report the currently loaded program catalog version"""
+    if catalog is None:
+        raise HTTPException(status_code=404, detail="Program catalog not loaded")
+    return catalog.info()
+
+
+@app.post("/admin/catalog/reload", dependencies=[Depends(require_admin)])
+async def reload_catalog():
+    """Reload the program catalog from the configured snapshot file"""
+    try:
+        load_catalog(CATALOG_PATH)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid catalog snapshot: {str(e)}")
+    return catalog.info()
+
+
+@app.put("/admin/catalog", dependencies=[Depends(require_admin)])
+async def replace_catalog(request: CatalogUpdateRequest):
+    """Replace the program catalog with the programs in the request body"""
+    global catalog
+    
+    columns = ProgramColumns.from_programs(request.programs)
+    next_version = catalog.version + 1 if catalog else 1
+    try:
+        if shared_store:
+            catalog = shared_store.publish_catalog(columns, source="admin-upload")
+        else:
+            catalog = ProgramCatalog(columns, version=next_version, source="admin-upload")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    log_event(logging.INFO, "catalog_replaced", version=catalog.version, programs=len(catalog))
+    return catalog.info()
+
+
+@app.get("/admin/topk-table", dependencies=[Depends(require_admin)])
+async def get_topk_table_info():
+    """Report the loaded materialized top-K table and whether it serves the current catalog and model"""
+    if topk_table is None:
+        raise HTTPException(status_code=404, detail="Top-K table not loaded")
+    active = registry.current
+    return {
+        **topk_table.info(),
+        "serving": catalog is not None and active is not None and topk_table.serves(
+            catalog.content_hash, active.token, recommend_scoring_mode(active)
+        ),
+        "served": RECOMMEND_SERVED.value(source="materialized"),
     }
 
 
+@app.post("/admin/topk-table/reload", dependencies=[Depends(require_admin)])
+async def reload_topk_table():
+    """Reload the materialized top-K table from TOPK_TABLE_PATH (e.g. after materialize_topk.py ran)"""
+    try:
+        await asyncio.to_thread(load_topk_table, TOPK_TABLE_PATH)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, KeyError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid top-K table: {str(e)}")
+    return await get_topk_table_info()
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Profiler settings and the profiled requests still in the ring, newest first"""
+    return profiler.info()
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def export_profile(profile_id: int, format: str = "collapsed"):
+    """
+    Export one request profile: "collapsed" (flamegraph.pl / inferno / speedscope
+    collapsed stacks, text) or "speedscope" (speedscope JSON).
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found (it may have been evicted)")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    if format == "speedscope":
+        return json_response(profile.speedscope())
+    raise HTTPException(status_code=400, detail=f"Unknown format: {format} (expected collapsed or speedscope)")
+
+
+def excluded_by_index(request: RecommendationRequest, current: Optional[ProgramCatalog],
+                      rows: Optional[np.ndarray]) -> Optional[ProgramColumns]:
+    """
+    Programs of a field_id request's field that the field index left out
+    (they fail the level or budget constraint). Counting them in the
+    constraint stats makes the stats match sending the whole field inline.
+    None for other requests.
+    """
+    if current is None or request.program_ids is not None or request.field_id is None:
+        return None
+    left_out = np.setdiff1d(current.index.field_rows(request.field_id), rows, assume_unique=True)
+    return current.take(left_out)
+
+
+def resolve_candidates(request: RecommendationRequest):
+    """
+    Resolve the candidate programs for a request as ProgramColumns.
+    Returns (columns, catalog, rows): the catalog snapshot and the catalog rows
+    of the columns, both None for inline payloads.
+    """
+    if request.program_ids is None and request.field_id is None:
+        return ProgramColumns.from_programs(request.programs), None, None
+    
+    # Take a local reference so a concurrent refresh can't swap the catalog mid-request
+    current = catalog
+    if current is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Program catalog not loaded. Send full program payloads instead."
+        )
+    
+    if request.program_ids is not None:
+        rows, missing_ids = current.rows_for_ids(request.program_ids)
+        if missing_ids:
+            log_event(
+                logging.DEBUG, "catalog_ids_missing",
+                catalog_version=current.version, missing=len(missing_ids), sample=missing_ids[:10]
+            )
+    else:
+        # Field index applies the level and budget constraints up front
+        rows = current.index.select(
+            request.field_id,
+            request.student_profile.study_level,
+            request.student_profile.budget
+        )
+    return current.take(rows), current, rows
+
+
 @app.post("/predict-fields", response_model=FieldPredictionResponse)
+@instrument_endpoint("predict_fields")
 async def predict_field_interests(request: FieldPredictionRequest):
     """
     Predict field category interests from student profile.
@@ -295,337 +816,605 @@ async def predict_field_interests(request: FieldPredictionRequest):
     
     Returns top field categories with probabilities.
     """
-    if not model_loaded or model is None:
-        raise HTTPException(
-            status_code=503,
-            detail="ML model not loaded. Service unavailable."
+    active = require_model()
+    
+    # Shared encoder with /predict-fields/batch, so single and batch predictions agree
+    with stage("features"):
+        X_input = encode_field_profiles([request], active.preprocessor)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        columns = active.preprocessor.columns
+        missing_grades = [col for col in columns["grades"] if col not in request.grades]
+        missing_subjects = [col for col in columns["subject_taken"] if col not in request.subject_taken]
+        if missing_grades or missing_subjects:
+            log_event(
+                logging.DEBUG, "field_prediction_missing_inputs",
+                missing_grades=missing_grades, missing_subjects=missing_subjects
+            )
+    if debug_features_enabled():
+        log_event(
+            logging.INFO, "field_prediction_features",
+            study=request.study, features=dict(zip(active.preprocessor.feature_columns, X_input[0].tolist()))
         )
     
-    # Map grades to numeric values (matching notebook)
-    grade_mapping = {'A': 5, 'B': 4, 'C': 3, 'D': 2, 'E': 1, 'G': 0, '0': 0, 0: 0}
-    grade_cols = [
-        'BM', 'English', 'History', 'Mathematics', 'IslamicOrMoral',
-        'Physics', 'Chemistry', 'Bio', 'AddMaths', 'Geography',
-        'Economics', 'Accounting', 'Chinese', 'Tamil', 'ICT'
-    ]
-    
-    # Debug: Log what grades we received
-    print(f"[DEBUG] ========== GRADES DATA RECEIVED ==========")
-    print(f"[DEBUG] Keys in request.grades: {list(request.grades.keys())}")
-    print(f"[DEBUG] Total keys received: {len(request.grades)}")
-    print(f"[DEBUG] Expected keys: {grade_cols}")
-    
-    # Convert grades to numeric and log each one
-    grade_numeric = []
-    missing_grades = []
-    for col in grade_cols:
-        value = request.grades.get(col, '0')
-        numeric_value = grade_mapping.get(value, 0)
-        grade_numeric.append(numeric_value)
-        if col not in request.grades:
-            missing_grades.append(col)
-        print(f"[DEBUG]   {col}: '{value}' → {numeric_value} {'(MISSING - using default 0)' if col not in request.grades else ''}")
-    
-    if missing_grades:
-        print(f"[DEBUG] ⚠️  WARNING: Missing grades in request: {missing_grades}")
-    print(f"[DEBUG] ============================================")
-    
-    # Subject taken vector - MUST have all 15 subjects
-    subject_taken_cols = [
-        'Took_BM', 'Took_English', 'Took_History', 'Took_Mathematics',
-        'Took_IslamicOrMoral', 'Took_Physics', 'Took_Chemistry', 'Took_Bio',
-        'Took_AddMaths', 'Took_Geography', 'Took_Economics', 'Took_Accounting',
-        'Took_Chinese', 'Took_Tamil', 'Took_ICT'
-    ]
-    
-    # Debug: Log what we received in subject_taken
-    print(f"[DEBUG] ========== SUBJECT_TAKEN DATA RECEIVED ==========")
-    print(f"[DEBUG] Keys in request.subject_taken: {list(request.subject_taken.keys())}")
-    print(f"[DEBUG] Total keys received: {len(request.subject_taken)}")
-    print(f"[DEBUG] Expected keys: {subject_taken_cols}")
-    
-    # Check each expected subject
-    missing_subjects = []
-    subject_taken_values = []
-    for col in subject_taken_cols:
-        value = request.subject_taken.get(col, 0)
-        subject_taken_values.append(value)
-        if col not in request.subject_taken:
-            missing_subjects.append(col)
-        print(f"[DEBUG]   {col}: {value} {'(MISSING - using default 0)' if col not in request.subject_taken else ''}")
-    
-    if missing_subjects:
-        print(f"[DEBUG] ⚠️  WARNING: Missing subjects in request: {missing_subjects}")
-    print(f"[DEBUG] ============================================")
-    
-    subject_taken_vec = [subject_taken_values]
-    
-    # Interest vector
-    # CRITICAL: The notebook uses StandardScaler for these features!
-    # Since we don't have the saved scalers, we approximate StandardScaler normalization
-    # StandardScaler: (x - mean) / std
-    # For interest scores (1-5), typical mean≈3, std≈1.2
-    # We'll use approximate scaling: (value - 3) / 1.2
-    interest_cols = [
-        'Maths_Interest', 'Science_Interest', 'Computer_Interest',
-        'Writing_Interest', 'Art_Interest', 'Business_Interest', 'Social_Interest'
-    ]
-    interest_values = [request.interests.get(col, 3) for col in interest_cols]
-    # Approximate StandardScaler: (x - mean) / std where mean≈3, std≈1.2
-    interest_vec = (np.array([interest_values]) - 3.0) / 1.2
-    
-    # Skill vector
-    # Same approximation for skills
-    skill_cols = [
-        'Logical', 'Problem_Solving', 'Creativity', 'Communication',
-        'Teamwork', 'Leadership', 'Attention_to_Detail'
-    ]
-    skill_values = [request.skills.get(col, 3) for col in skill_cols]
-    # Approximate StandardScaler: (x - mean) / std where mean≈3, std≈1.2
-    skill_vec = (np.array([skill_values]) - 3.0) / 1.2
-    
-    # Subject grade vector
-    # For grades (0-5), typical mean≈2.5, std≈1.5
-    # Approximate StandardScaler: (x - mean) / std
-    subject_grade_vec = (np.array([grade_numeric]) - 2.5) / 1.5
-    
-    # Study one-hot encoding
-    study_map = {'SPM': [1, 0], 'STPM': [0, 1]}
-    study_vec = np.array([study_map.get(request.study, [1, 0])])
-    
-    # Extracurricular encoding
-    extracurricular_encoded = [[1 if request.extracurricular else 0]]
-    
-    # Field category names (from notebook output - these are the model's classes)
-    # Note: The actual class names depend on the label encoder used during training
-    # This is a placeholder - in production, these should be loaded from the label encoder
-    # MUST be defined before use in debug logging
-    field_categories = [
-        "Computer Science & IT",
-        "Engineering",
-        "Health Science",
-        "Medicine, Dentistry & Pharmacy",
-        "Traditional and Complementary Medicine",
-        "Business & Management",
-        "Arts & Design",
-        "Education",
-        "Social Sciences",
-        "Law",
-        "Agriculture & Forestry",
-        "Hospitality & Tourism",
-        "Architecture & Built Environment",
-        "Others"
-    ]
-    
-    # Combine features (matching notebook structure)
-    X_input = np.hstack([
-        interest_vec,
-        skill_vec,
-        subject_taken_vec,
-        subject_grade_vec,
-        study_vec,
-        extracurricular_encoded
-    ])
-    
-    # Debug: Log input features to understand why predictions might be inaccurate
-    print(f"[DEBUG] ========== FIELD PREDICTION INPUT ==========")
-    print(f"[DEBUG] Input features shape: {X_input.shape}")
-    print(f"[DEBUG] Study level: {request.study}, Extracurricular: {request.extracurricular}")
-    print(f"[DEBUG] Interest values: {dict(zip(interest_cols, interest_values))}")
-    print(f"[DEBUG] Skill values: {dict(zip(skill_cols, skill_values))}")
-    print(f"[DEBUG] Grade numeric (all 15): {grade_numeric}")
-    print(f"[DEBUG] Subject taken vector (all 15): {subject_taken_vec[0]}")
-    print(f"[DEBUG] Subject taken count: {sum(subject_taken_vec[0])} out of {len(subject_taken_vec[0])}")
-    
-    # Detailed breakdown of feature vector
-    print(f"[DEBUG] Feature vector breakdown:")
-    print(f"[DEBUG]   Interest vector (7): {interest_vec[0]}")
-    print(f"[DEBUG]   Skill vector (7): {skill_vec[0]}")
-    print(f"[DEBUG]   Subject taken vector (15): {subject_taken_vec[0]}")
-    print(f"[DEBUG]   Subject grade vector (15): {subject_grade_vec[0]}")
-    print(f"[DEBUG]   Study vector (2): {study_vec[0]}")
-    print(f"[DEBUG]   Extracurricular (1): {extracurricular_encoded[0]}")
-    print(f"[DEBUG]   Total features: {X_input.shape[1]} (expected 47)")
-    
-    # Check for CS/IT relevant features
-    print(f"[DEBUG] CS/IT Relevant Features:")
-    print(f"[DEBUG]   Computer_Interest: {interest_values[interest_cols.index('Computer_Interest')]}/5")
-    print(f"[DEBUG]   Took_ICT: {subject_taken_vec[0][subject_taken_cols.index('Took_ICT')]}")
-    print(f"[DEBUG]   ICT Grade: {grade_numeric[grade_cols.index('ICT')]}/5")
-    print(f"[DEBUG]   Mathematics Grade: {grade_numeric[grade_cols.index('Mathematics')]}/5")
-    print(f"[DEBUG]   Logical Thinking: {skill_values[skill_cols.index('Logical')]}/5")
-    print(f"[DEBUG]   Problem Solving: {skill_values[skill_cols.index('Problem_Solving')]}/5")
-    print(f"[DEBUG] ============================================")
-    
-    # Get predictions from model
+    # Same encoded profile as an earlier request: reuse its probabilities
+    features_key = array_key(X_input[0]) if field_cache.enabled else None
+    cached = field_cache.get((active.token, features_key)) if features_key else None
+    
+    # Get predictions from model, batched with concurrent requests when coalescing is on
     try:
-        probs = model.predict_proba(X_input)[0]
+        if cached is not None:
+            probs, served = cached[np.newaxis], active
+        elif field_coalescer is not None:
+            row, served = await field_coalescer.submit(X_input[0])
+            probs = row[np.newaxis]
+        else:
+            probs, served = await inference_pool.run(field_probabilities, X_input, active)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[ERROR] Model prediction failed: {e}")
-        print(f"[ERROR] Input shape: {X_input.shape}")
-        print(f"[ERROR] Expected features: {model.n_features_in_ if hasattr(model, 'n_features_in_') else 'Unknown'}")
+        log_event(
+            logging.ERROR, "field_prediction_failed", error=str(e),
+            input_shape=list(X_input.shape), expected_features=getattr(active.scorer, "n_features_in_", None)
+        )
         raise HTTPException(
             status_code=500,
             detail=f"Model prediction error: {str(e)}"
         )
+    if features_key and cached is None:
+        field_cache.put((served.token, features_key), probs[0].copy())
     
-    # Debug: Log all probabilities sorted
-    all_probs = [(field_categories[i], probs[i]) for i in range(min(len(probs), len(field_categories)))]
-    all_probs.sort(key=lambda x: x[1], reverse=True)
-    print(f"[DEBUG] All field probabilities (sorted): {[(name, f'{prob:.4f}') for name, prob in all_probs]}")
+    # Map probabilities to field names, sorted by probability descending
+    # Names come from the label classes in the model's preprocessing artifact
+    with stage("ranking"):
+        ranked = rank_field_probabilities(probs, served.preprocessor)[0]
+        # FieldPredictionResponse body, serialized directly (see json_response)
+        response = json_response({"fields": field_items(ranked), "model_version": served.version})
+    log_event(logging.DEBUG, "field_prediction", top_fields=ranked[:5])
     
-    # Map probabilities to field names
-    # Note: The order must match the label encoder's classes_ attribute
-    # For now, we'll use the order from the notebook output
-    try:
-        field_predictions = [
-            FieldPrediction(field_name=field_categories[i], probability=float(probs[i]))
-            for i in range(min(len(probs), len(field_categories)))
-        ]
-        
-        # Sort by probability descending
-        field_predictions.sort(key=lambda x: x.probability, reverse=True)
-        
-        print(f"[DEBUG] Field predictions: {[(f.field_name, f.probability) for f in field_predictions[:5]]}")
+    return response
+
+
+def field_probabilities(X: np.ndarray, active: Optional[ModelVersion] = None):
+    """
+    predict_proba for encoded /predict-fields rows (runs on an inference worker).
+    Returns (probs, model version used); defaults to the version serving now.
+    """
+    active = active or registry.current
+    BATCH_SIZE.observe(len(X), endpoint="predict_fields")
+    with stage("predict_proba"):
+        return active.scorer.predict_proba(X), active
+
+
+def coalesced_field_probabilities(X: np.ndarray) -> list:
+    """(probability row, model version) per row of a coalesced batch"""
+    probs, active = field_probabilities(X)
+    return [(row, active) for row in probs]
+
+
+field_coalescer = (
+    RowCoalescer(
+        lambda X: inference_pool.run(coalesced_field_probabilities, X),
+        window=FIELD_COALESCE_WINDOW_MS / 1000,
+        max_rows=FIELD_COALESCE_MAX_ROWS
+    )
+    if FIELD_COALESCE_WINDOW_MS > 0 else None
+)
+
+
+@app.post("/predict-fields/batch", response_model=FieldPredictionBatchResponse, response_model_exclude_none=True)
+@instrument_endpoint("predict_fields_batch")
+async def predict_field_interests_batch(request: FieldPredictionBatchRequest):
+    """
+    Predict field category interests for many student profiles in one call.
+    
+    Profiles are encoded into one feature matrix and scored in chunks of
+    FIELD_BATCH_CHUNK_SIZE rows. Results keep the order of the input profiles.
+    """
+    active = require_model()
+    
+    return await inference_pool.run(score_field_batch, request, active)
+
+
+def score_field_batch(request: FieldPredictionBatchRequest, active: ModelVersion) -> Response:
+    """Score a batch of profiles chunk by chunk (runs on an inference worker)"""
+    results = []
+    for start in range(0, len(request.profiles), FIELD_BATCH_CHUNK_SIZE):
+        chunk = request.profiles[start:start + FIELD_BATCH_CHUNK_SIZE]
+        with stage("features"):
+            X_chunk = encode_field_profiles(chunk, active.preprocessor)
+        BATCH_SIZE.observe(len(chunk), endpoint="predict_fields_batch")
+        try:
+            with stage("predict_proba"):
+                probs = active.scorer.predict_proba(X_chunk)
+        except Exception as e:
+            log_event(
+                logging.ERROR, "field_batch_prediction_failed",
+                error=str(e), first_profile=start, profiles=len(chunk)
+            )
+            raise HTTPException(
+                status_code=500,
+                detail=f"Model prediction error: {str(e)}"
+            )
         
-        return FieldPredictionResponse(fields=field_predictions)
-    except Exception as e:
-        print(f"[ERROR] Error creating field predictions: {e}")
-        print(f"[ERROR] probs length: {len(probs) if 'probs' in locals() else 'N/A'}, field_categories length: {len(field_categories)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing predictions: {str(e)}"
+        with stage("ranking"):
+            results.extend(
+                {"fields": field_items(ranked)} for ranked in rank_field_probabilities(probs, active.preprocessor)
+            )
+    
+    log_event(logging.INFO, "field_batch_prediction", profiles=len(results))
+    
+    # FieldPredictionBatchResponse body (per-result model_version omitted, as with response_model_exclude_none)
+    return json_response({"results": results, "model_version": active.version})
+
+
+def select_candidates(request: RecommendationRequest):
+    """
+    Resolve candidate programs and apply the hard constraints.
+    Returns (candidates, constraint_stats, catalog, catalog_rows); catalog and
+    catalog_rows (the candidates' rows in it) are None for inline payloads.
+    """
+    with stage("resolve"):
+        candidate_columns, current, rows = resolve_candidates(request)
+    candidates, constraint_stats, kept = apply_constraints(
+        request.student_profile, candidate_columns, excluded_by_index(request, current, rows)
+    )
+    return candidates, constraint_stats, current, rows[kept] if current is not None else None
+
+
+def apply_constraints(student_profile: StudentProfile, candidate_columns: ProgramColumns,
+                      excluded: Optional[ProgramColumns] = None):
+    """
+    Filter resolved candidates by the hard constraints.
+    Returns (candidates, constraint_stats, kept); kept holds the candidates' rows in candidate_columns.
+    excluded (see excluded_by_index) are counted in the stats as candidates too.
+    """
+    with stage("constraints"):
+        constraint_masks = evaluate_constraints(student_profile, candidate_columns)
+        kept = np.flatnonzero(constraint_masks.passed)
+        candidates = candidate_columns.take(kept)
+        constraint_stats = constraint_masks.stats()
+        if excluded is not None and len(excluded):
+            constraint_stats = combine_stats(constraint_stats, evaluate_constraints(student_profile, excluded).stats())
+    
+    for constraint, rejected in constraint_stats["rejected_by"].items():
+        PROGRAMS_FILTERED.inc(rejected, constraint=constraint)
+    PROGRAMS_SCORED.inc(constraint_stats["passed"])
+    return candidates, constraint_stats, kept
+
+
+def build_recommendation_payload(
+    request: RecommendationRequest,
+    candidates: ProgramColumns,
+    scores: np.ndarray,
+    constraint_stats: dict,
+    catalog_version: Optional[int],
+    model_version: Optional[str] = None
+) -> dict:
+    """
+    Rank scored candidates (top K when requested) into a RecommendationResponse
+    body, built from the id and score arrays without per-item models.
+    """
+    with stage("ranking"):
+        ranked = top_k_indices(scores, request.top_k)
+        return {
+            "recommendations": recommendation_items(candidates.program_id[ranked], scores[ranked]),
+            "constraint_stats": constraint_stats,
+            "catalog_version": catalog_version,
+            "model_version": model_version,
+        }
+
+
+class BinaryRecommendRoute(APIRoute):
+    """
+    /recommend route that also accepts the binary column format (see binary_format).
+    Binary bodies skip JSON decoding and per-program validation: the candidates
+    are mapped straight onto ProgramColumns and only the profile is validated.
+    """
+
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            if not is_binary_content_type(request.headers.get("content-type")):
+                return await json_handler(request)
+            parsed, candidates = parse_binary_recommendation(await request.body())
+            return await get_binary_recommendations(parsed, candidates)
+
+        return handler
+
+
+def parse_binary_recommendation(body: bytes):
+    """(RecommendationRequest without programs, candidate ProgramColumns) for a binary request body"""
+    try:
+        header, candidates = decode_recommend_request(body)
+        parsed = RecommendationRequest.model_validate(
+            {"student_profile": header.get("student_profile"), "top_k": header.get("top_k")}
         )
+    except BinaryFormatError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid binary request: {str(e)}")
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body",) + tuple(error["loc"])} for error in e.errors(include_url=False)]
+        )
+    return parsed, candidates
 
 
-@app.post("/recommend", response_model=RecommendationResponse)
+@instrument_endpoint("recommend")
 async def get_recommendations(request: RecommendationRequest):
     """
     Generate program recommendations based on student profile and candidate programs.
     
     Returns ranked list of program IDs with confidence scores.
     Programs that violate hard constraints are filtered out.
+    
+    Candidates can also be sent as application/x-recommend-columns (NumPy
+    structured-array bytes, see binary_format); the response is then binary too.
+    
+    field_id requests whose profile lies on the grid of the materialized top-K
+    table are answered from it without scoring (X-Recommend-Source: materialized).
     """
-    if not model_loaded or model is None:
-        raise HTTPException(
-            status_code=503,
-            detail="ML model not loaded. Service unavailable."
-        )
+    active = require_model()
     
-    # Debug logging
-    print(f"[DEBUG] Received request with {len(request.programs)} programs")
-    print(f"[DEBUG] Student profile: study_level={request.student_profile.study_level}, "
-          f"field_ids={request.student_profile.field_ids}, "
-          f"cgpa={request.student_profile.cgpa}, "
-          f"budget={request.student_profile.budget}, "
-          f"preferred_states={request.student_profile.preferred_states}")
-    
-    # Log first few program IDs received
-    if request.programs:
-        sample_ids = [p.program_id for p in request.programs[:5]]
-        print(f"[DEBUG] Sample program IDs received from backend: {sample_ids}")
-    
-    recommendations = []
-    filtered_count = 0
-    error_count = 0
-    
-    for program in request.programs:
-        # Apply hard constraints first
-        # Note: We need university state info, but it's not in ProgramInput
-        # For now, we'll skip location constraint check here
-        # In production, you'd pass university state from the backend
-        
-        # Level matching - normalize both sides for comparison (case-insensitive)
-        def normalize_level(level: str) -> str:
-            """Normalize level string for comparison"""
-            if not level:
-                return ""
-            level_lower = level.lower().strip()
-            # Map common variations to standard forms
-            if level_lower in ["bachelor", "bachelor's", "degree", "undergraduate", "bachelors"]:
-                return "bachelor"
-            elif level_lower in ["diploma"]:
-                return "diploma"
-            elif level_lower in ["foundation"]:
-                return "foundation"
-            elif level_lower in ["master", "masters"]:
-                return "master"
-            elif level_lower in ["phd", "doctorate"]:
-                return "phd"
-            return level_lower
-        
-        student_level_norm = normalize_level(request.student_profile.study_level or "")
-        program_level_norm = normalize_level(program.level or "")
-        
-        # Level match: if either is missing, allow it (don't filter)
-        level_match = (
-            not request.student_profile.study_level or
-            not program.level or
-            student_level_norm == program_level_norm
+    response = materialized_recommendation(request, active)
+    if response is not None:
+        return response
+    return await inference_pool.run(score_recommendation, request, active)
+
+
+def materialized_recommendation(request: RecommendationRequest, active: ModelVersion) -> Optional[Response]:
+    """
+    The response for a request that falls exactly in a bucket of the top-K table
+    built for the serving catalog and model; None when it must be scored live.
+    Same body as live scoring returns.
+    """
+    table, current = topk_table, catalog
+    if table is None or current is None or request.program_ids is not None or request.field_id is None \
+            or debug_features_enabled():
+        return None
+    if not table.serves(current.content_hash, active.token, recommend_scoring_mode(active)):
+        return None
+    hit = table.lookup(request.student_profile, request.field_id, request.top_k)
+    if hit is None:
+        return None
+    
+    program_ids, scores, constraint_stats = hit
+    body = dumps({
+        "recommendations": recommendation_items(program_ids, scores),
+        "constraint_stats": constraint_stats,
+        "catalog_version": current.version,
+        "model_version": active.version,
+    })
+    log_event(
+        logging.INFO, "recommendation",
+        served="materialized",
+        study_level=request.student_profile.study_level,
+        field_ids=request.student_profile.field_ids,
+        returned=len(program_ids),
+        top_ids=program_ids[:10].tolist(),
+        catalog_version=current.version,
+        model_version=active.version,
+        **constraint_stats
+    )
+    RECOMMEND_SERVED.inc(source="materialized")
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers={RECOMMEND_SOURCE_HEADER: "materialized"})
+
+
+@instrument_endpoint("recommend_binary")
+async def get_binary_recommendations(request: RecommendationRequest, candidates: ProgramColumns) -> Response:
+    """Binary-format /recommend: candidates arrive as columns, results leave as RESULT_DTYPE records"""
+    active = require_model()
+    
+    return await inference_pool.run(score_recommendation, request, active, candidates)
+
+
+app.router.add_api_route(
+    "/recommend",
+    get_recommendations,
+    methods=["POST"],
+    response_model=RecommendationResponse,
+    route_class_override=BinaryRecommendRoute,
+    openapi_extra={
+        "requestBody": {"content": {BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}},
+        "responses": {"200": {"content": {BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}}},
+    },
+)
+
+
+def score_recommendation(
+    request: RecommendationRequest,
+    active: ModelVersion,
+    binary_candidates: Optional[ProgramColumns] = None
+) -> Response:
+    """
+    Filter, score and rank candidates for one request (runs on an inference worker).
+    The response body is pre-rendered JSON (see json_response) or binary.
+    
+    With the result cache on, an identical earlier request returns its stored
+    response, and only programs not yet scored for this profile are scored.
+    Feature-dump requests (X-Debug-Features) bypass the cache.
+    
+    binary_candidates holds the candidates of a binary-format request; the
+    response is then encoded with the same format.
+    
+    The X-Recommend-Source response header tells whether the response came from
+    the result cache ("cache") or was scored now ("live").
+    """
+    binary = binary_candidates is not None
+    media_type = BINARY_MEDIA_TYPE if binary else JSON_MEDIA_TYPE
+    use_cache = recommend_cache.enabled and not debug_features_enabled()
+    with stage("resolve"):
+        if binary:
+            candidate_columns, current, catalog_rows = binary_candidates, None, None
+        else:
+            candidate_columns, current, catalog_rows = resolve_candidates(request)
+    catalog_version = current.version if current else None
+    
+    if use_cache:
+        profile_key = profile_fingerprint(request.student_profile, active.token, recommend_scoring_mode(active))
+        response_key = recommend_cache.response_key(
+            profile_key, request.top_k, candidate_columns, catalog_version, media_type,
+            request.field_id if request.program_ids is None else None
         )
+        body = recommend_cache.get_response(response_key)
+        if body is not None:
+            log_event(logging.INFO, "recommendation", served="cache", catalog_version=catalog_version)
+            RECOMMEND_SERVED.inc(source="cache")
+            return Response(content=body, media_type=media_type, headers={RECOMMEND_SOURCE_HEADER: "cache"})
+    
+    # Apply hard constraints first (level, field, budget, location) as boolean masks
+    candidates, constraint_stats, kept = apply_constraints(
+        request.student_profile, candidate_columns, excluded_by_index(request, current, catalog_rows)
+    )
+    
+    # Build one feature matrix for all surviving programs and score it in a single call
+    scores = np.empty(0)
+    if len(candidates):
+        if use_cache:
+            # Reuse scores of programs unchanged since they were last scored for this profile
+            fingerprints, scores = recommend_cache.cached_scores(profile_key, candidates)
+            unscored = np.flatnonzero(np.isnan(scores))
+            to_score = candidates.take(unscored)
+        else:
+            unscored = slice(None)
+            to_score = candidates
         
-        # Field match: if field_ids is empty, don't filter by field (allow all fields)
-        # This prevents filtering out all programs when student hasn't specified interests
-        field_match = (
-            not request.student_profile.field_ids or  # Empty list = no field preference
-            len(request.student_profile.field_ids) == 0 or  # Explicitly empty
-            program.field_id in request.student_profile.field_ids
-        )
+        if len(to_score):
+            BATCH_SIZE.observe(len(to_score), endpoint="recommend")
+            try:
+                new_scores = score_candidates(
+                    request.student_profile, to_score, active,
+                    current, catalog_rows[kept][unscored] if current is not None else None
+                )
+            except Exception as e:
+                log_event(logging.ERROR, "recommendation_prediction_failed", error=str(e), programs=len(to_score))
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Model prediction error: {str(e)}"
+                )
+            
+            if use_cache:
+                scores[unscored] = new_scores
+                recommend_cache.store_scores(profile_key, fingerprints[unscored], new_scores)
+            else:
+                scores = new_scores
         
-        budget_ok = (
-            not request.student_profile.budget or
-            not program.tuition_fee or
-            program.tuition_fee <= request.student_profile.budget * 1.1
+        if debug_features_enabled():
+            dumped = candidates.take(np.arange(min(len(candidates), DEBUG_DUMP_MAX_ROWS)))
+            features = build_feature_matrix(request.student_profile, dumped)
+            log_event(
+                logging.INFO, "recommendation_features",
+                features={int(program_id): row.tolist() for program_id, row in zip(dumped.program_id, features)}
+            )
+    
+    # Rank by score descending, keeping only the top K when requested
+    if binary:
+        with stage("ranking"):
+            ranked = top_k_indices(scores, request.top_k)
+            ranked_ids = candidates.program_id[ranked]
+            body = encode_recommend_response(
+                ranked_ids, scores[ranked], constraint_stats, catalog_version, active.version
+            )
+        top_ids = ranked_ids[:10].tolist()
+    else:
+        payload = build_recommendation_payload(
+            request, candidates, scores, constraint_stats, catalog_version, active.version
         )
-        
-        # Debug first few programs to see what's happening
-        if len(recommendations) + filtered_count < 5:
-            print(f"[DEBUG] Program {program.program_id}: level={program.level}, "
-                  f"field_id={program.field_id}, tuition={program.tuition_fee}, "
-                  f"level_match={level_match}, field_match={field_match}, budget_ok={budget_ok}")
-        
-        if not (level_match and field_match and budget_ok):
-            filtered_count += 1
-            continue  # Skip programs that violate constraints
-        
-        # Extract features and get prediction
+        body = dumps(payload)
+        ranked = payload["recommendations"]
+        top_ids = [r["program_id"] for r in ranked[:10]]
+    log_event(
+        logging.INFO, "recommendation",
+        served="live",
+        study_level=request.student_profile.study_level,
+        field_ids=request.student_profile.field_ids,
+        returned=len(ranked),
+        top_ids=top_ids,
+        catalog_version=catalog_version,
+        model_version=active.version,
+        **constraint_stats
+    )
+    RECOMMEND_SERVED.inc(source="live")
+    
+    if use_cache:
+        recommend_cache.set_response(response_key, body)
+    return Response(content=body, media_type=media_type, headers={RECOMMEND_SOURCE_HEADER: "live"})
+
+
+def recommend_scoring_mode(active: ModelVersion) -> str:
+    """Scoring /recommend uses with this model version: "decomposed", "compact" or "full" (see RECOMMEND_SCORING)"""
+    if RECOMMEND_SCORING in ("decomposed", "compact") and is_decomposable(active.scorer):
+        return RECOMMEND_SCORING
+    return "full"
+
+
+def score_candidates(
+    student_profile: StudentProfile,
+    candidates: ProgramColumns,
+    active: ModelVersion,
+    current: Optional[ProgramCatalog] = None,
+    catalog_rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Recommendation score (positive-class probability) of each candidate.
+    current and catalog_rows locate catalog candidates (see score_candidate_sets).
+    """
+    return score_candidate_sets([(student_profile, candidates, current, catalog_rows)], active)
+
+
+def score_candidate_sets(candidate_sets: list, active: ModelVersion) -> np.ndarray:
+    """
+    Scores of several (student_profile, candidates, catalog, catalog_rows) sets
+    from one model call, concatenated in order.
+    
+    With decomposed scoring, candidates taken from a catalog snapshot (at
+    catalog_rows) reuse its cached program-only logits; with compact scoring,
+    their rows of its quantized feature store. Inline candidates (catalog None)
+    get theirs computed here the same way, so a program scores the same
+    whichever way it was sent (and cached scores agree).
+    """
+    mode = recommend_scoring_mode(active)
+    if mode != "full":
+        with stage("features"):
+            blocks = []
+            for student_profile, candidates, current, catalog_rows in candidate_sets:
+                if mode == "compact":
+                    store = compact_feature_cache.get(current) if current is not None \
+                        else CompactProgramFeatures.from_columns(candidates)
+                    partial_logits = store.program_logits(active.scorer, catalog_rows)
+                elif current is not None:
+                    partial_logits = program_logits_cache.get(current, active.scorer, active.token)[catalog_rows]
+                else:
+                    partial_logits = program_logits(active.scorer, candidates)
+                blocks.append(decomposed_logits(active.scorer, student_profile, candidates, partial_logits))
+        with stage("predict_proba"):
+            logits = blocks[0] if len(blocks) == 1 else np.vstack(blocks)
+            return active.scorer.proba_from_logits(logits)[:, 1]
+    
+    with stage("features"):
+        matrices = [build_feature_matrix(profile, candidates) for profile, candidates, _, _ in candidate_sets]
+    # Get probability of positive class (recommendation)
+    with stage("predict_proba"):
+        features = matrices[0] if len(matrices) == 1 else np.vstack(matrices)
+        return active.scorer.predict_proba(features)[:, 1]  # Assuming binary classification
+
+
+@app.post("/predict-fields/stream")
+@instrument_endpoint("predict_fields_stream", streaming=True)
+async def predict_field_interests_stream(request: Request):
+    """
+    Stream field predictions for NDJSON input.
+    
+    Each request line is a FieldPredictionRequest; each response line is
+    {"index": n, "fields": [...]} or {"index": n, "error": "..."}, in input order.
+    Lines are scored in chunks of STREAM_CHUNK_SIZE through the batch pipeline.
+    """
+    require_model()
+    
+    async def results():
+        async for chunk in iter_chunks(request, STREAM_CHUNK_SIZE):
+            for line in await run_stream_chunk(score_field_stream_chunk, chunk):
+                yield ndjson_line(line)
+    
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def run_stream_chunk(score_chunk, chunk: list) -> list:
+    """
+    Score one stream chunk on the inference pool. Streams are already
+    flow-controlled, so chunks are never rejected; a timeout fails the chunk's lines.
+    """
+    try:
+        return await inference_pool.run(score_chunk, chunk, always_admit=True)
+    except HTTPException as e:
+        return [{"index": index, "error": e.detail} for index, _ in chunk]
+
+
+def score_field_stream_chunk(chunk: list) -> list:
+    """Result lines for one chunk of NDJSON field prediction requests, in input order"""
+    # Each chunk is scored by the version serving when it starts; a reload can switch versions mid-stream
+    active = registry.current
+    lines = {}
+    profiles = []
+    for index, raw in chunk:
         try:
-            features = extract_features(request.student_profile, program)
-            # Get probability of positive class (recommendation)
-            score = model.predict_proba(features)[0][1]  # Assuming binary classification
-            
-            # Debug first few successful predictions
-            if len(recommendations) < 3:
-                print(f"[DEBUG] Program {program.program_id} passed constraints, score={score:.4f}")
-            
-            recommendations.append(
-                ProgramRecommendation(
-                    program_id=program.program_id,
-                    score=float(score)
-                )
-            )
+            profiles.append((index, FieldPredictionRequest.model_validate_json(raw)))
+        except ValidationError as e:
+            lines[index] = {"index": index, "error": f"Invalid request: {e.errors(include_url=False)}"}
+    
+    if profiles:
+        BATCH_SIZE.observe(len(profiles), endpoint="predict_fields_stream")
+        try:
+            with stage("features"):
+                X_chunk = encode_field_profiles([p for _, p in profiles], active.preprocessor)
+            with stage("predict_proba"):
+                probs = active.scorer.predict_proba(X_chunk)
+            for (index, _), ranked in zip(profiles, rank_field_probabilities(probs, active.preprocessor)):
+                lines[index] = {
+                    "index": index,
+                    "fields": [{"field_name": name, "probability": p} for name, p in ranked],
+                    "model_version": active.version
+                }
         except Exception as e:
-            # Skip programs that cause prediction errors
-            error_count += 1
-            if error_count <= 3:
-                print(f"[DEBUG] Error predicting for program {program.program_id}: {e}")
-            continue
-    
-    # Sort by score descending
-    recommendations.sort(key=lambda x: x.score, reverse=True)
-    
-    # Debug: Log returned program IDs
-    if recommendations:
-        returned_ids = [r.program_id for r in recommendations[:10]]
-        print(f"[DEBUG] Returning {len(recommendations)} recommendations with IDs: {returned_ids}")
-    else:
-        print(f"[DEBUG] No recommendations generated (all programs filtered out or errors occurred)")
+            PREDICTION_ERRORS.inc(endpoint="predict_fields_stream")
+            for index, _ in profiles:
+                lines[index] = {"index": index, "error": f"Model prediction error: {str(e)}"}
     
-    # Debug summary
-    print(f"[DEBUG] Summary: {len(recommendations)} recommendations, "
-          f"{filtered_count} filtered by constraints, {error_count} prediction errors")
+    return [lines[index] for index, _ in chunk]
+
+
+@app.post("/recommend/stream")
+@instrument_endpoint("recommend_stream", streaming=True)
+async def get_recommendations_stream(request: Request):
+    """
+    Stream recommendations for NDJSON input.
     
-    return RecommendationResponse(recommendations=recommendations)
+    Each request line is a RecommendationRequest; each response line is
+    {"index": n, "recommendations": [...], ...} or {"index": n, "error": "..."},
+    in input order. A chunk of STREAM_CHUNK_SIZE requests is scored with a
+    single predict_proba call over all of their candidates.
+    """
+    require_model()
+    
+    async def results():
+        async for chunk in iter_chunks(request, STREAM_CHUNK_SIZE):
+            for line in await run_stream_chunk(score_recommend_stream_chunk, chunk):
+                yield ndjson_line(line)
+    
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
 
+
+def score_recommend_stream_chunk(chunk: list) -> list:
+    """Result lines for one chunk of NDJSON recommendation requests, in input order"""
+    active = registry.current
+    lines = {}
+    prepared = []
+    for index, raw in chunk:
+        try:
+            parsed = RecommendationRequest.model_validate_json(raw)
+            prepared.append((index, parsed, *select_candidates(parsed)))
+        except ValidationError as e:
+            lines[index] = {"index": index, "error": f"Invalid request: {e.errors(include_url=False)}"}
+        except HTTPException as e:
+            lines[index] = {"index": index, "error": e.detail}
+    
+    if prepared:
+        try:
+            # One model call for every candidate in the chunk, split back per request
+            sizes = [len(cands) for _, _, cands, _, _, _ in prepared]
+            total_rows = sum(sizes)
+            BATCH_SIZE.observe(total_rows, endpoint="recommend_stream")
+            all_scores = score_candidate_sets(
+                [(req.student_profile, cands, current, rows) for _, req, cands, _, current, rows in prepared], active
+            ) if total_rows else np.empty(0)
+            offsets = np.cumsum(sizes)[:-1]
+            for (index, req, cands, stats, current, _), scores in zip(prepared, np.split(all_scores, offsets)):
+                version = current.version if current else None
+                payload = build_recommendation_payload(req, cands, scores, stats, version, active.version)
+                lines[index] = {"index": index, **payload}
+        except Exception as e:
+            PREDICTION_ERRORS.inc(endpoint="recommend_stream")
+            for index, *_ in prepared:
+                lines[index] = {"index": index, "error": f"Model prediction error: {str(e)}"}
+    
+    return [lines[index] for index, _ in chunk]
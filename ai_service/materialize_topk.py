@@ -0,0 +1,122 @@
+"""
+Offline job: materialize the /recommend top-K table (see topk_table.py).
+
+Loads the model and catalog the service would load (MODEL_PATH,
+PROGRAM_CATALOG_PATH and the scoring settings from the environment), scores
+every grid bucket through the same resolve, constraint, scoring and ranking
+code as live /recommend requests, and writes the table to TOPK_TABLE_PATH (or
+--output). Scores do not depend on preferred_states, so each grid point is
+scored once and ranked per state set.
+
+Run it whenever the catalog or model changes, then call
+POST /admin/topk-table/reload (or restart) to serve the new table:
+
+    python materialize_topk.py [--top-k 20] [--cgpa 2.0 2.5 3.0 3.5 4.0] [--budgets 20000 50000 100000]
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+
+import main
+from catalog import ProgramCatalog, load_snapshot
+from constraints import combine_stats, evaluate_constraints
+from main import RecommendationRequest, StudentProfile
+from program_features import LEVEL_MAP
+from ranking import top_k_indices
+from service_logging import log_event
+from topk_table import STATS_COLUMNS, BucketGrid, default_state_sets, save_table
+
+DEFAULT_CGPA = [None, 2.0, 2.5, 3.0, 3.5, 4.0]
+DEFAULT_BUDGETS = [None, 20000, 30000, 50000, 75000, 100000, 150000, 200000]
+
+
+def build_table(grid: BucketGrid, top_k: int, active, current):
+    """(program_ids, scores, counts, stats) arrays for every bucket of grid"""
+    n_buckets = len(grid)
+    # Live scores come in the compiled scorer's dtype (float64 from sklearn)
+    scores_dtype = np.dtype(getattr(active.scorer, "dtype", np.float64))
+    program_ids = np.full((n_buckets, top_k), -1, dtype=np.int64)
+    scores = np.zeros((n_buckets, top_k), dtype=scores_dtype)
+    counts = np.zeros(n_buckets, dtype=np.int32)
+    stats = np.zeros((n_buckets, len(STATS_COLUMNS)), dtype=np.int32)
+
+    for first, field_id, profile_fields in grid.base_combinations():
+        request = RecommendationRequest(student_profile=StudentProfile(**profile_fields), field_id=field_id)
+        columns, _, rows = main.resolve_candidates(request)
+        excluded = main.excluded_by_index(request, current, rows)
+        point_scores = main.score_candidates(request.student_profile, columns, active, current, rows) \
+            if len(columns) else np.empty(0, dtype=scores_dtype)
+
+        for offset, states in enumerate(grid.state_sets):
+            profile = request.student_profile.model_copy(update={"preferred_states": states})
+            masks = evaluate_constraints(profile, columns)
+            kept = np.flatnonzero(masks.passed)
+            bucket_scores = point_scores[kept]
+            ranked = top_k_indices(bucket_scores, top_k)
+            bucket = first + offset
+            counts[bucket] = len(ranked)
+            program_ids[bucket, :len(ranked)] = columns.program_id[kept[ranked]]
+            scores[bucket, :len(ranked)] = bucket_scores[ranked]
+            bucket_stats = masks.stats()
+            if len(excluded):
+                bucket_stats = combine_stats(bucket_stats, evaluate_constraints(profile, excluded).stats())
+            stats[bucket] = [bucket_stats["candidates"], bucket_stats["passed"]] + [
+                bucket_stats["rejected_by"][name] for name in STATS_COLUMNS[2:]
+            ]
+    return program_ids, scores, counts, stats
+
+
+def materialize(output: str, top_k: int, levels: list, field_ids: list, cgpa: list, budgets: list,
+                states: list) -> None:
+    active = main.load_model()
+    # Built here rather than through load_catalog(), which would publish to the shared store
+    current = main.catalog = ProgramCatalog(load_snapshot(main.CATALOG_PATH), version=1, source=main.CATALOG_PATH)
+    grid = BucketGrid(
+        levels,
+        field_ids or sorted(np.unique(current.columns.field_id).tolist()),
+        cgpa,
+        budgets,
+        default_state_sets(states if states is not None else current.columns.university_state.tolist()),
+    )
+    log_event(logging.INFO, "topk_materialize_started", buckets=len(grid), top_k=top_k, programs=len(current))
+
+    started = time.perf_counter()
+    arrays = build_table(grid, top_k, active, current)
+    save_table(
+        output, grid, top_k, *arrays,
+        catalog_hash=current.content_hash, catalog_source=current.source,
+        model_token=active.token, scoring=main.recommend_scoring_mode(active)
+    )
+    log_event(
+        logging.INFO, "topk_materialized", path=output, buckets=len(grid), top_k=top_k,
+        bytes=sum(a.nbytes for a in arrays), seconds=round(time.perf_counter() - started, 2)
+    )
+    main.inference_pool.shutdown()
+
+
+def _optional_floats(values: list) -> list:
+    return [None if v.lower() in ("none", "null", "") else float(v) for v in values]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=main.TOPK_TABLE_PATH)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--levels", nargs="+", default=list(LEVEL_MAP))
+    parser.add_argument("--field-ids", type=int, nargs="+", help="default: every field in the catalog")
+    parser.add_argument("--cgpa", nargs="+", default=[str(v) for v in DEFAULT_CGPA],
+                        help="grid values; 'none' stands for no CGPA")
+    parser.add_argument("--budgets", nargs="+", default=[str(v) for v in DEFAULT_BUDGETS],
+                        help="grid values; 'none' stands for no budget")
+    parser.add_argument("--states", nargs="*",
+                        help="single preferred states to materialize besides no preference "
+                             "(default: every state in the catalog)")
+    args = parser.parse_args()
+    if args.top_k < 1:
+        sys.exit("--top-k must be at least 1")
+    materialize(args.output, args.top_k, args.levels, args.field_ids, _optional_floats(args.cgpa),
+                _optional_floats(args.budgets), args.states)
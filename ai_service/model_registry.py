@@ -0,0 +1,267 @@
+"""
+Versioned model registry with validated hot reload.
+
+A ModelVersion bundles the estimator, the scorer that serves it and a version
+id derived from the model file's content. The registry loads a new version
+off the request path, validates it (feature count, class count, a smoke batch
+through both the scorer and the estimator) and only then swaps it in with a
+single reference assignment. Requests take `registry.current` once and keep
+using that version until they finish, so a swap never mixes models inside a
+request and a failed load leaves the old version serving.
+
+Reloads are triggered by a change to the active model file (polled by
+watch()) or explicitly through load(), e.g. from an admin endpoint.
+
+A model file may have a preprocessing artifact next to it
+(<model file without extension>.preprocessing.json, see field_prediction.py).
+It is loaded, hashed into the version id and watched together with the model.
+
+With use_artifacts, each validated compiled scorer is also saved next to its
+model file (<model file>.compiled/) and later loads map it from there instead
+of unpickling the estimator, which avoids importing sklearn at all.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from cache import file_signature
+from compiled_scorer import LinearScorer, compile_scorer, load_scorer, save_scorer
+from field_prediction import DEFAULT_PREPROCESSOR, FieldPreprocessor, preprocessing_path
+from instrumentation import MODEL_RELOADS
+from service_logging import log_event
+
+MODEL_FILE_EXTENSIONS = (".pkl", ".joblib")
+COMPILED_ARTIFACT_SUFFIX = ".compiled"
+
+
+class ModelValidationError(ValueError):
+    """A candidate model failed validation and was not swapped in"""
+
+
+class ModelVersion:
+    """
+    A loaded, validated model, the scorer serving it and the preprocessing
+    that encodes its /predict-fields input. estimator is None when the
+    version was loaded from a compiled artifact.
+    """
+
+    def __init__(self, version: str, path: str, estimator, scorer, signature: Optional[tuple], digest: str,
+                 preprocessor: FieldPreprocessor = DEFAULT_PREPROCESSOR, preprocessing_file: Optional[str] = None):
+        self.version = version
+        self.path = path
+        self.estimator = estimator
+        self.scorer = scorer
+        self.signature = signature
+        # Content hash of the model file
+        self.digest = digest
+        self.preprocessor = preprocessor
+        self.preprocessing_file = preprocessing_file
+        self.loaded_at = time.time()
+
+    @property
+    def scorer_kind(self) -> str:
+        return f"compiled-{self.scorer.dtype}" if isinstance(self.scorer, LinearScorer) else "sklearn"
+
+    @property
+    def token(self) -> str:
+        """Cache-key component: the same version served by a different scorer scores differently"""
+        return f"{self.version}:{self.scorer_kind}"
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "scorer": self.scorer_kind,
+            "n_features": int(self.scorer.n_features_in_),
+            "n_classes": len(self.scorer.classes_),
+            "from_artifact": self.estimator is None,
+            "preprocessing": self.preprocessing_file,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the serving ModelVersion and replaces it atomically.
+
+    smoke_batch(candidate) returns a small feature matrix, encoded with the
+    candidate's preprocessing, that every candidate must score sanely. warm_up runs the request path once on a validated candidate
+    before it is swapped in; on_swap is called with the new version after
+    each swap.
+    """
+
+    def __init__(self, model_path: str, scorer_mode: str, scorer_dtype: str, expected_features: int,
+                 smoke_batch: Callable[["ModelVersion"], np.ndarray], on_swap: Optional[Callable[["ModelVersion"], None]] = None,
+                 warm_up: Optional[Callable[["ModelVersion"], None]] = None, use_artifacts: bool = False):
+        self.model_path = model_path
+        self.model_dir = os.path.dirname(model_path)
+        self.scorer_mode = scorer_mode
+        self.scorer_dtype = scorer_dtype
+        self.expected_features = expected_features
+        self.smoke_batch = smoke_batch
+        self.on_swap = on_swap
+        self.warm_up = warm_up
+        self.use_artifacts = use_artifacts and scorer_mode == "compiled"
+        self.current: Optional[ModelVersion] = None
+        self._load_lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        """Model files in the model directory"""
+        if not os.path.isdir(self.model_dir):
+            return []
+        return sorted(name for name in os.listdir(self.model_dir) if name.endswith(MODEL_FILE_EXTENSIONS))
+
+    def resolve(self, name: str) -> str:
+        """Path of a model file in the model directory (no path components allowed)"""
+        if os.path.basename(name) != name or not name.endswith(MODEL_FILE_EXTENSIONS):
+            raise ValueError(f"Invalid model file name: {name}")
+        path = os.path.join(self.model_dir, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found at {path}")
+        return path
+
+    def load(self, path: Optional[str] = None) -> ModelVersion:
+        """
+        Load, validate and swap in the model at path (default: the active model
+        file). Blocking; run it off the event loop. Raises on failure, in which
+        case the current version keeps serving.
+        """
+        path = path or self.model_path
+        with self._load_lock:
+            try:
+                candidate = self._load_version(path)
+                self._validate(candidate)
+                if self.warm_up:
+                    self.warm_up(candidate)
+            except Exception as e:
+                MODEL_RELOADS.inc(result="failed")
+                log_event(logging.ERROR, "model_load_failed", path=path, error=str(e))
+                raise
+
+            if self.use_artifacts and candidate.estimator is not None and isinstance(candidate.scorer, LinearScorer):
+                self._save_artifact(candidate)
+
+            previous = self.current
+            self.current = candidate
+            self.model_path = path
+            MODEL_RELOADS.inc(result="swapped")
+            log_event(
+                logging.INFO, "model_loaded", path=path, version=candidate.version, scorer=candidate.scorer_kind,
+                previous_version=previous.version if previous else None
+            )
+            if self.on_swap:
+                self.on_swap(candidate)
+            return candidate
+
+    def poll(self) -> Optional[ModelVersion]:
+        """Reload when the active model file or its preprocessing changed on disk; returns the new version if swapped"""
+        signature = self._signature(self.model_path)
+        current = self.current
+        if signature[0] is None or (current is not None and signature == current.signature):
+            return None
+        try:
+            return self.load()
+        except Exception:
+            # Already logged; keep serving the current version until the file changes again
+            if current is not None:
+                current.signature = signature
+            return None
+
+    async def watch(self, interval: float) -> None:
+        """Poll the active model file every interval seconds (run as a background task)"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.poll)
+
+    def _load_version(self, path: str) -> ModelVersion:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found at {path}")
+        signature = self._signature(path)
+        with open(path, "rb") as f:
+            model_bytes = f.read()
+        digest = hashlib.sha256(model_bytes).hexdigest()[:12]
+
+        # The version covers the preprocessing too: changing it changes every prediction
+        prep_path = preprocessing_path(path)
+        if os.path.exists(prep_path):
+            with open(prep_path, "rb") as f:
+                prep_bytes = f.read()
+            preprocessor = FieldPreprocessor.load(prep_path)
+            if preprocessor.field_classes is None:
+                log_event(logging.WARNING, "field_classes_missing", path=prep_path,
+                          detail="Field names fall back to FIELD_CATEGORIES")
+            version_digest = hashlib.sha256(model_bytes + prep_bytes).hexdigest()[:12]
+        else:
+            log_event(logging.WARNING, "preprocessing_artifact_missing", path=prep_path,
+                      detail="Using defaults; field names fall back to FIELD_CATEGORIES")
+            prep_path, preprocessor, version_digest = None, DEFAULT_PREPROCESSOR, digest
+        version = f"{os.path.splitext(os.path.basename(path))[0]}-{version_digest}"
+
+        if self.use_artifacts:
+            scorer = load_scorer(path + COMPILED_ARTIFACT_SUFFIX, digest, self.scorer_dtype)
+            if scorer is not None:
+                return ModelVersion(version, path, None, scorer, signature, digest, preprocessor, prep_path)
+
+        # Imported here so artifact loads never pay for joblib and sklearn
+        import joblib
+
+        # Use joblib.load() for sklearn models (more reliable than pickle)
+        estimator = joblib.load(path, mmap_mode="r")
+        scorer = compile_scorer(estimator, self.scorer_dtype) if self.scorer_mode == "compiled" else estimator
+        return ModelVersion(version, path, estimator, scorer, signature, digest, preprocessor, prep_path)
+
+    @staticmethod
+    def _signature(path: str) -> tuple:
+        return file_signature(path), file_signature(preprocessing_path(path))
+
+    def _save_artifact(self, candidate: ModelVersion) -> None:
+        try:
+            save_scorer(candidate.scorer, candidate.path + COMPILED_ARTIFACT_SUFFIX, candidate.digest)
+        except OSError as e:
+            # Read-only model directory: keep serving, just without the fast path next time
+            log_event(logging.WARNING, "compiled_artifact_save_failed", path=candidate.path, error=str(e))
+
+    def _validate(self, candidate: ModelVersion) -> None:
+        estimator = candidate.estimator
+        scorer = candidate.scorer
+        if not hasattr(scorer, "predict_proba"):
+            raise ModelValidationError(f"{type(scorer).__name__} has no predict_proba")
+
+        n_features = getattr(scorer, "n_features_in_", None)
+        if n_features != self.expected_features:
+            raise ModelValidationError(f"Model expects {n_features} features, service sends {self.expected_features}")
+        if candidate.preprocessor.n_features != n_features:
+            raise ModelValidationError(
+                f"Preprocessing produces {candidate.preprocessor.n_features} features, model expects {n_features}"
+            )
+
+        n_classes = len(getattr(scorer, "classes_", []))
+        expected_classes = len(self.current.scorer.classes_) if self.current else None
+        if n_classes < 2 or (expected_classes and n_classes != expected_classes):
+            raise ModelValidationError(
+                f"Model has {n_classes} classes, expected {expected_classes or 'at least 2'}"
+            )
+        field_names = candidate.preprocessor.field_names
+        if n_classes != len(field_names):
+            raise ModelValidationError(f"Model has {n_classes} classes, preprocessing names {len(field_names)} fields")
+
+        # Smoke batch: sane probabilities, and the serving scorer agrees with the estimator
+        X = self.smoke_batch(candidate)
+        probs = scorer.predict_proba(X)
+        if probs.shape != (len(X), n_classes):
+            raise ModelValidationError(f"Smoke batch returned shape {probs.shape}, expected {(len(X), n_classes)}")
+        if not np.all(np.isfinite(probs)) or probs.min() < 0 or probs.max() > 1:
+            raise ModelValidationError("Smoke batch returned probabilities outside [0, 1]")
+        if not np.allclose(probs.sum(axis=1), 1.0, atol=1e-3):
+            raise ModelValidationError("Smoke batch probabilities do not sum to 1")
+        if estimator is not None and scorer is not estimator:
+            drift = float(np.abs(probs - estimator.predict_proba(X)).max())
+            if drift > 1e-4:
+                raise ModelValidationError(f"Compiled scorer differs from the estimator by {drift:.2e}")
@@ -0,0 +1,261 @@
+"""
+On-demand per-request profiling.
+
+Off by default. A request is profiled when it sends `X-Profile: 1` (with a valid
+X-Admin-Token when an admin token is configured) or is picked by the sampling
+rate. Unprofiled requests cost one header scan.
+
+A profiled request is recorded by a statistical sampler: a background thread
+that captures the Python stack of every thread working on the request, every
+`interval` seconds (or as soon as it gets the GIL back). Each stack is weighted
+by the wall time since the previous sample, so long pure-Python stretches that
+hold the GIL are not under-counted. Those threads are the event loop thread (routing, body
+parsing and validation, serialization) and any inference worker running one of
+its jobs (constraints, features, predict_proba, ranking). One request is
+profiled at a time. While it awaits, the event loop thread may also run other
+requests, and their samples are included.
+
+Finished profiles are kept in a bounded ring and exported as collapsed stacks
+(one "frame;frame;frame microseconds" line per stack, for flamegraph.pl,
+inferno or speedscope) or as speedscope JSON.
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Stack samples of one request: per thread, wall microseconds per stack"""
+
+    def __init__(self, profile_id: int, method: str, path: str, interval: float):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.status: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.threads: Dict[int, str] = {}
+        self.samples: Dict[str, Counter] = {}
+        self.ticks = 0
+        self._started = time.perf_counter()
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def add_samples(self, frames: dict, elapsed_us: int) -> None:
+        self.ticks += 1
+        for ident, name in list(self.threads.items()):
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples.setdefault(name, Counter())[_stack(frame)] += elapsed_us
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "interval_ms": self.interval * 1000,
+            "samples": self.ticks,
+            "threads": sorted(self.samples),
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed stacks rooted at the thread name, weighted in microseconds"""
+        return "".join(
+            f"{thread};{';'.join(stack)} {count}\n"
+            for thread, stacks in sorted(self.samples.items())
+            for stack, count in stacks.most_common()
+        )
+
+    def speedscope(self) -> dict:
+        """speedscope file format: one sampled profile per thread, weights in milliseconds"""
+        frames: List[dict] = []
+        frame_index: Dict[str, int] = {}
+        profiles = []
+        for thread, stacks in sorted(self.samples.items()):
+            samples, weights = [], []
+            for stack, elapsed_us in stacks.items():
+                indexes = []
+                for label in stack:
+                    if label not in frame_index:
+                        frame_index[label] = len(frames)
+                        name, _, location = label.partition(" (")
+                        file, _, line = location.rstrip(")").rpartition(":")
+                        frames.append({"name": name, "file": file, "line": int(line) if line.isdigit() else None})
+                    indexes.append(frame_index[label])
+                samples.append(indexes)
+                weights.append(elapsed_us / 1000)
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self.method} {self.path} [{thread}]",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "ai_service",
+            "name": f"{self.method} {self.path} #{self.id}",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def _stack(frame) -> tuple:
+    """Root-first frame labels ("function (file.py:first line)") for a thread's current frame"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class Profiler:
+    """Decides which requests to profile, runs the sampler and keeps the ring of finished profiles"""
+
+    def __init__(self, sample_rate: float = 0.0, interval: float = 0.001, ring_size: int = 20,
+                 admin_token: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.admin_token = admin_token
+        self.ring: deque = deque(maxlen=ring_size)
+        self.skipped_busy = 0
+        self._busy = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def wants(self, headers: list) -> bool:
+        """Whether a request with these raw ASGI headers should be profiled"""
+        requested = False
+        token = None
+        for name, value in headers:
+            if name == PROFILE_HEADER:
+                requested = value.lower() in (b"1", b"true", b"yes")
+            elif name == ADMIN_TOKEN_HEADER:
+                token = value.decode("latin-1")
+        if requested and (not self.admin_token or token == self.admin_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def session(self, method: str, path: str):
+        """Profile the enclosed block; yields None when another request is being profiled"""
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            yield None
+            return
+        profile = RequestProfile(next(self._ids), method, path, self.interval)
+        token = _current_profile.set(profile)
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(profile, stop), name="profiler", daemon=True)
+        try:
+            with track_thread():
+                sampler.start()
+                yield profile
+        finally:
+            stop.set()
+            sampler.join()
+            _current_profile.reset(token)
+            self.ring.append(profile)
+            self._busy.release()
+
+    def _sample(self, profile: RequestProfile, stop: threading.Event) -> None:
+        last = time.perf_counter()
+        while not stop.wait(self.interval):
+            now = time.perf_counter()
+            profile.add_samples(sys._current_frames(), int((now - last) * 1e6))
+            last = now
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return next((p for p in self.ring if p.id == profile_id), None)
+
+    def info(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "ring_size": self.ring.maxlen,
+            "skipped_busy": self.skipped_busy,
+            "profiles": [p.summary() for p in reversed(self.ring)],
+        }
+
+
+@contextmanager
+def track_thread():
+    """Include the current thread in the active request profile (if any) for the enclosed block"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    ident = threading.get_ident()
+    profile.threads[ident] = threading.current_thread().name
+    try:
+        yield
+    finally:
+        profile.threads.pop(ident, None)
+
+
+def run_tracked(fn, *args):
+    """fn(*args) with the calling thread tracked by the active request profile"""
+    with track_thread():
+        return fn(*args)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests chosen by the Profiler. The response
+    of a profiled request carries its profile ID in X-Profile-Id.
+    """
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.wants(scope.get("headers") or []):
+            await self.app(scope, receive, send)
+            return
+
+        with self.profiler.session(scope.get("method"), scope.get("path")) as profile:
+            if profile is None:
+                await self.app(scope, receive, send)
+                return
+            status = None
+
+            async def tagged_send(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", [])) + [(PROFILE_ID_HEADER, str(profile.id).encode())]
+                    }
+                await send(message)
+
+            try:
+                await self.app(scope, receive, tagged_send)
+            finally:
+                profile.finish(status)
@@ -0,0 +1,257 @@
+"""
+Columnar feature engineering for program recommendations.
+Builds the 47-feature matrix for a whole candidate list at once, matching
+extract_features() in main.py row for row.
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NUM_FEATURES = 47
+
+# Level one-hot order (must match extract_features in main.py)
+LEVEL_MAP = {"Bachelor": 0, "Diploma": 1, "Foundation": 2, "Master": 3, "PhD": 4}
+
+# Field one-hot covers field IDs 1-20
+MAX_FIELD_ID = 20
+
+# Feature columns grouped by what they depend on. build_feature_matrix() fills
+# each group from its own block function; decomposed scoring caches the
+# program-only part of the logits per catalog (see decomposed_scoring.py).
+PROGRAM_FEATURES = np.r_[5:10, 11:31, 37:40, 43:45]
+STUDENT_FEATURES = np.r_[0:5, 35:37, 42]
+INTERACTION_FEATURES = np.r_[10, 31:35, 40:42, 45:47]
+
+
+class ProgramColumns:
+    """
+    Candidate programs stored as parallel NumPy columns.
+    Missing optional values (tuition_fee, duration_months) are stored as NaN,
+    a missing university_state as an empty string.
+
+    The string columns (level, university_state) are held as integer codes into
+    a small vocabulary of distinct values (level_codes/level_vocab,
+    state_codes/state_vocab). Constraints and the field index compare codes, so
+    catalogs attached from memory-mapped codes never build per-row objects.
+    level and university_state may be passed as strings, or as codes together
+    with their vocabulary.
+    """
+
+    def __init__(
+        self,
+        program_id: np.ndarray,
+        university_id: np.ndarray,
+        field_id: np.ndarray,
+        tuition_fee: np.ndarray,
+        duration_months: np.ndarray,
+        level: np.ndarray,
+        university_state: Optional[np.ndarray] = None,
+        level_idx: Optional[np.ndarray] = None,
+        level_vocab: Optional[Sequence[str]] = None,
+        state_vocab: Optional[Sequence[str]] = None,
+    ):
+        self.program_id = program_id
+        self.university_id = university_id
+        self.field_id = field_id
+        self.tuition_fee = tuition_fee
+        self.duration_months = duration_months
+        if level_vocab is None:
+            level, level_vocab = factorize(level)
+        self.level_codes = level
+        self.level_vocab = np.array(level_vocab, dtype=object)
+        if university_state is None:
+            university_state, state_vocab = np.zeros(len(program_id), dtype=np.int32), [""]
+        elif state_vocab is None:
+            university_state, state_vocab = factorize(university_state)
+        self.state_codes = university_state
+        self.state_vocab = np.array(state_vocab, dtype=object)
+        if level_idx is None:
+            level_idx = np.array([LEVEL_MAP.get(lv, 0) for lv in self.level_vocab], dtype=np.int64)[self.level_codes]
+        self.level_idx = level_idx
+
+    @classmethod
+    def from_programs(cls, programs: Iterable) -> "ProgramColumns":
+        """Build columns from ProgramInput objects (or anything with the same attributes)"""
+        programs = list(programs)
+        return cls(
+            program_id=np.array([p.program_id for p in programs], dtype=np.int64),
+            university_id=np.array([p.university_id for p in programs], dtype=np.int64),
+            field_id=np.array([p.field_id for p in programs], dtype=np.int64),
+            tuition_fee=_optional_column([p.tuition_fee for p in programs]),
+            duration_months=_optional_column([p.duration_months for p in programs]),
+            level=[p.level for p in programs],
+            university_state=[p.university_state or "" for p in programs],
+        )
+
+    def __len__(self) -> int:
+        return len(self.program_id)
+
+    @property
+    def level(self) -> np.ndarray:
+        """Program levels as an object array (built on access)"""
+        return self.level_vocab[self.level_codes]
+
+    @property
+    def university_state(self) -> np.ndarray:
+        """University states as an object array (built on access)"""
+        return self.state_vocab[self.state_codes]
+
+    def take(self, rows: np.ndarray) -> "ProgramColumns":
+        """Return a new ProgramColumns holding only the given row indices"""
+        return ProgramColumns(
+            program_id=self.program_id[rows],
+            university_id=self.university_id[rows],
+            field_id=self.field_id[rows],
+            tuition_fee=self.tuition_fee[rows],
+            duration_months=self.duration_months[rows],
+            level=self.level_codes[rows],
+            university_state=self.state_codes[rows],
+            level_idx=self.level_idx[rows],
+            level_vocab=self.level_vocab,
+            state_vocab=self.state_vocab,
+        )
+
+
+def factorize(values: Iterable) -> Tuple[np.ndarray, List[str]]:
+    """(int32 codes, vocabulary) of string values, vocabulary in order of first appearance"""
+    vocab: dict = {}
+    codes = np.fromiter((vocab.setdefault(str(v), len(vocab)) for v in values), dtype=np.int32)
+    return codes, list(vocab)
+
+
+def _optional_column(values: List) -> np.ndarray:
+    """Convert a list with possible None entries into a float64 column with NaN"""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _truthy(column: np.ndarray) -> np.ndarray:
+    """Vectorized Python truthiness for numeric columns (None/NaN and 0 are falsy)"""
+    return ~np.isnan(column) & (column != 0)
+
+
+def build_feature_matrix(student_profile, columns: ProgramColumns) -> np.ndarray:
+    """
+    Build the N x 47 float32 feature matrix for all programs in one pass.
+
+    Every column is computed in float64 with the same arithmetic as
+    extract_features() and cast to float32 at the end, so each row is
+    bit-identical to the per-program path.
+    """
+    X = np.empty((len(columns), NUM_FEATURES), dtype=np.float64)
+    X[:, PROGRAM_FEATURES] = program_features(columns)
+    X[:, STUDENT_FEATURES] = student_features(student_profile)
+    X[:, INTERACTION_FEATURES] = interaction_features(student_profile, columns)
+    return X.astype(np.float32)
+
+
+def program_features(columns: ProgramColumns) -> np.ndarray:
+    """N x len(PROGRAM_FEATURES) float64 block of the columns that depend only on the program"""
+    n = len(columns)
+    rows = np.arange(n)
+    P = np.zeros((n, len(PROGRAM_FEATURES)), dtype=np.float64)
+
+    # ===== PROGRAM LEVEL FEATURES (5-9: program level one-hot) =====
+    P[rows, columns.level_idx] = 1.0
+
+    # ===== FIELD FEATURES (11-30: field one-hot for field IDs 1-20) =====
+    field_id = columns.field_id
+    in_range = (field_id >= 1) & (field_id <= MAX_FIELD_ID)
+    P[rows[in_range], 4 + field_id[in_range]] = 1.0
+
+    # ===== DURATION FEATURES (37-38) =====
+    duration = columns.duration_months
+    has_duration = _truthy(duration)
+    duration_category = np.select([duration <= 24, duration <= 36], [0.0, 0.5], 1.0)
+    P[:, 25] = np.where(has_duration, np.minimum(duration / 48.0, 1.0), 0.5)
+    P[:, 26] = np.where(has_duration, duration_category, 0.5)
+
+    # ===== TUITION FEE FEATURE (39) =====
+    tuition = columns.tuition_fee
+    P[:, 27] = np.where(_truthy(tuition), np.minimum(tuition / 200000.0, 1.0), 0.5)
+
+    # ===== ADDITIONAL FEATURES (43-44) =====
+    university_id = columns.university_id
+    P[:, 28] = np.where(university_id != 0, np.minimum(university_id / 100.0, 1.0), 0.5)
+    program_id = columns.program_id
+    P[:, 29] = np.where(program_id != 0, np.minimum(program_id / 3000.0, 1.0), 0.5)
+    return P
+
+
+def student_features(student_profile) -> np.ndarray:
+    """float64 values of the STUDENT_FEATURES columns, shared by every program row"""
+    s = np.zeros(len(STUDENT_FEATURES), dtype=np.float64)
+
+    # ===== LEVEL FEATURES (0-4: student level one-hot) =====
+    s[LEVEL_MAP.get(student_profile.study_level, 0)] = 1.0
+
+    # ===== CGPA FEATURES (35-36) =====
+    cgpa = student_profile.cgpa
+    if cgpa:
+        s[5] = min(cgpa / 4.0, 1.0)
+        if cgpa >= 3.5:
+            s[6] = 1.0
+        elif cgpa >= 2.5:
+            s[6] = 0.5
+        else:
+            s[6] = 0.0
+    else:
+        s[5:7] = 0.5
+
+    # ===== LOCATION FEATURE (42: placeholder) =====
+    s[7] = 0.5
+    return s
+
+
+def interaction_features(student_profile, columns: ProgramColumns) -> np.ndarray:
+    """N x len(INTERACTION_FEATURES) float64 block of the columns that depend on both sides"""
+    n = len(columns)
+    I = np.empty((n, len(INTERACTION_FEATURES)), dtype=np.float64)
+
+    # ===== LEVEL MATCH FEATURE (10) =====
+    student_level_idx = LEVEL_MAP.get(student_profile.study_level, 0)
+    level_match = (columns.level_idx == student_level_idx).astype(np.float64)
+    I[:, 0] = level_match
+
+    # ===== FIELD MATCH FEATURE (31) =====
+    if student_profile.field_ids:
+        field_match = np.isin(columns.field_id, student_profile.field_ids).astype(np.float64)
+    else:
+        field_match = np.zeros(n, dtype=np.float64)
+    I[:, 1] = field_match
+
+    tuition = columns.tuition_fee
+    has_tuition = _truthy(tuition)
+    budget = student_profile.budget
+    cgpa = student_profile.cgpa
+
+    # ===== BUDGET FEATURES (32-34) =====
+    if budget:
+        budget_ratio = np.minimum(tuition / budget, 2.0)
+        within_budget = (tuition <= budget).astype(np.float64)
+        I[:, 2] = np.where(has_tuition, budget_ratio, 0.5)
+        I[:, 3] = np.where(has_tuition, within_budget, 0.5)
+        I[:, 4] = np.where(has_tuition, (tuition <= budget * 1.2).astype(np.float64), 0.5)
+    else:
+        I[:, 2:5] = 0.5
+
+    # ===== INTERACTION FEATURES (40-41) =====
+    if cgpa and budget:
+        cgpa_norm = min(cgpa / 4.0, 1.0)
+        I[:, 5] = np.where(has_tuition, cgpa_norm * budget_ratio, 0.5)
+    else:
+        I[:, 5] = 0.5
+    I[:, 6] = level_match * field_match
+
+    # ===== ADDITIONAL FEATURES (45-46) =====
+    if budget:
+        remaining = np.maximum(0.0, budget - tuition)
+        I[:, 7] = np.where(has_tuition, np.minimum(remaining / budget, 1.0), 0.5)
+    else:
+        I[:, 7] = 0.5
+
+    if cgpa and budget:
+        I[:, 8] = np.where(has_tuition, (cgpa_norm + within_budget) / 2.0, 0.5)
+    else:
+        I[:, 8] = 0.5
+    return I
@@ -0,0 +1,32 @@
+"""
+Score ranking helpers shared by the recommendation endpoints.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Return indices of the k highest scores, best first.
+
+    The result is identical to a stable descending sort truncated to k
+    (ties keep their input order), but only the selected k entries are
+    fully sorted. When k is None or covers every score, all indices are
+    returned in ranked order.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Score of the k-th best program; everything strictly above it is selected,
+    # remaining slots go to the earliest programs tied with it
+    kth_score = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth_score)
+    ties = np.flatnonzero(scores == kth_score)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    selected.sort()
+    return selected[np.argsort(-scores[selected], kind="stable")]
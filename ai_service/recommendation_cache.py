@@ -0,0 +1,199 @@
+"""
+Result cache for /recommend.
+
+Two layers share one pluggable byte-string backend:
+
+    response  key = profile fingerprint + top_k + content hash of the resolved
+              candidate programs + catalog version + model token + scoring
+              mode + response media type. A hit returns the serialized
+              response without any scoring.
+    scores    key = profile fingerprint + model token + scoring mode. Holds the
+              score of every program scored for that profile, indexed by a
+              fingerprint of the program fields the model sees.
+
+The scoring mode (RECOMMEND_SCORING) is part of both keys: compact scores
+differ from exact ones in the last digits, and workers sharing a Redis backend
+may run different modes.
+
+Any program change produces a new response key, but the score layer still
+matches every unchanged program, so only programs whose tuition, level, etc.
+changed (or that are new) are re-scored. Nothing needs to be flushed when the
+catalog is refreshed; stale entries age out of the backend.
+
+Backends: "memory" (per-process LRU) or "redis" (any Redis-compatible server,
+shared by all workers; needs the redis package).
+"""
+
+import hashlib
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+
+from cache import LRUCache
+from catalog import content_hash
+from instrumentation import RECOMMEND_CACHE_LOOKUPS, RECOMMEND_CACHE_SCORES_REUSED
+from program_features import ProgramColumns
+
+# Scores kept per profile; beyond this only the latest request's candidates are stored
+MAX_SCORES_PER_PROFILE = 100_000
+
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+class MemoryBackend:
+    """Per-process backend on the byte-bounded LRU"""
+
+    def __init__(self, max_bytes: int, ttl: Optional[float]):
+        self.cache = LRUCache("recommendations", max_bytes, ttl=ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.cache.put(key, value)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class RedisBackend:
+    """Backend on a Redis-compatible server so workers share entries"""
+
+    def __init__(self, url: str, ttl: Optional[float], prefix: str = "ai_service:recommend:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RECOMMEND_CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl) if ttl and ttl > 0 else None
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def create_backend(kind: str, max_bytes: int, ttl: Optional[float], url: str):
+    """Backend for RECOMMEND_CACHE_BACKEND; None disables the cache"""
+    if kind in ("", "off", "none") or (kind == "memory" and max_bytes <= 0):
+        return None
+    if kind == "memory":
+        return MemoryBackend(max_bytes, ttl)
+    if kind == "redis":
+        return RedisBackend(url, ttl)
+    raise ValueError(f"Unknown RECOMMEND_CACHE_BACKEND: {kind} (expected memory, redis or off)")
+
+
+class RecommendationCache:
+    """Response and per-profile score layers over a backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    # ===== RESPONSE LAYER =====
+
+    def response_key(self, profile_key: str, top_k: Optional[int], columns: ProgramColumns,
+                     catalog_version: Optional[int], media_type: str = "application/json",
+                     field_id: Optional[int] = None) -> str:
+        # field_id: the constraint stats of field requests also count programs the field index left out
+        return "response:" + _digest(profile_key, top_k, content_hash(columns), catalog_version, media_type,
+                                     field_id)
+
+    def get_response(self, key: str) -> Optional[bytes]:
+        body = self.backend.get(key)
+        if body is not None:
+            RECOMMEND_CACHE_LOOKUPS.inc(result="response_hit")
+        return body
+
+    def set_response(self, key: str, body: bytes) -> None:
+        self.backend.set(key, body)
+
+    # ===== SCORE LAYER =====
+
+    def cached_scores(self, profile_key: str, candidates: ProgramColumns) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (fingerprints, scores) for the candidates, with NaN scores for programs
+        that were never scored for this profile or changed since.
+        """
+        fingerprints = row_fingerprints(candidates)
+        scores = np.full(len(candidates), np.nan)
+        cached = self._load_scores(profile_key)
+        if cached is not None:
+            cached_fps, cached_scores = cached
+            pos = np.searchsorted(cached_fps, fingerprints)
+            pos[pos == len(cached_fps)] = 0
+            found = (cached_fps[pos] == fingerprints) if len(cached_fps) else np.zeros(len(fingerprints), bool)
+            scores[found] = cached_scores[pos[found]]
+
+        reused = int(np.count_nonzero(~np.isnan(scores)))
+        RECOMMEND_CACHE_SCORES_REUSED.inc(reused)
+        RECOMMEND_CACHE_LOOKUPS.inc(
+            result="scores_hit" if reused == len(scores) else "partial" if reused else "miss"
+        )
+        return fingerprints, scores
+
+    def store_scores(self, profile_key: str, fingerprints: np.ndarray, scores: np.ndarray) -> None:
+        """Merge newly scored programs into the profile's entry"""
+        cached = self._load_scores(profile_key)
+        if cached is not None and len(cached[0]) + len(fingerprints) <= MAX_SCORES_PER_PROFILE:
+            fingerprints = np.concatenate([cached[0], fingerprints])
+            scores = np.concatenate([cached[1], scores])
+        fingerprints, first = np.unique(fingerprints, return_index=True)
+        scores = scores[first].astype(np.float64)
+        self.backend.set(_scores_key(profile_key), fingerprints.tobytes() + scores.tobytes())
+
+    def _load_scores(self, profile_key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        raw = self.backend.get(_scores_key(profile_key))
+        if raw is None:
+            return None
+        values = np.frombuffer(raw, dtype=np.uint64)
+        n = len(values) // 2
+        return values[:n], values[n:].view(np.float64)
+
+
+def profile_fingerprint(student_profile, model_token: str, scoring: str) -> str:
+    """
+    Canonical key for everything in a profile that affects constraints and
+    scores, under a model token and scoring mode (both cache layers key on it)
+    """
+    profile = student_profile.model_dump()
+    profile["field_ids"] = sorted(set(profile["field_ids"]))
+    profile["preferred_states"] = sorted(set(profile["preferred_states"]))
+    return _digest(json.dumps(profile, sort_keys=True), model_token, scoring)
+
+
+def row_fingerprints(columns: ProgramColumns) -> np.ndarray:
+    """64-bit hash per program over the fields used by build_feature_matrix()"""
+    h = np.full(len(columns), _FNV_OFFSET, dtype=np.uint64)
+    for column in (columns.program_id, columns.university_id, columns.field_id,
+                   columns.tuition_fee, columns.duration_months, columns.level_idx):
+        # float64 bits, -0.0 folded into 0.0 (ids are exact below 2**53)
+        h ^= (np.asarray(column, dtype=np.float64) + 0.0).view(np.uint64)
+        h *= _FNV_PRIME
+    # Final avalanche (splitmix64) so nearby inputs spread across the key space
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def _scores_key(profile_key: str) -> str:
+    return "scores:" + profile_key
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,143 @@
+"""
+Structured, sampled, level-gated logging for the AI service.
+
+Configured through environment variables:
+    LOG_LEVEL            DEBUG, INFO (default), WARNING, ERROR
+    LOG_FORMAT           json (default) or text
+    LOG_SAMPLE_RATE      fraction of requests whose DEBUG/INFO events are logged (default 1.0)
+    LOG_DEBUG_DUMP_ROWS  max program rows in a /recommend feature dump (default 50)
+
+Warnings and errors are never sampled. Feature-vector dumps are only produced
+for requests sent with the X-Debug-Features header.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+LOGGER_NAME = "ai_service"
+DEBUG_HEADER = b"x-debug-features"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+# Max program rows included in a /recommend feature dump
+DEBUG_DUMP_MAX_ROWS = int(os.environ.get("LOG_DEBUG_DUMP_ROWS", "50"))
+
+# Per-request logging state (set by RequestLogContextMiddleware)
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+_debug_features: ContextVar[bool] = ContextVar("debug_features", default=False)
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event plus any structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for local development"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        suffix = " ".join(f"{key}={value}" for key, value in fields.items())
+        line = f"[{record.levelname}] {record.getMessage()}" + (f" {suffix}" if suffix else "")
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Drop DEBUG/INFO records from requests that were not sampled"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or _request_sampled.get()
+
+
+def configure_logging(stream=None) -> logging.Logger:
+    """Attach the configured handler to the service logger (idempotent)"""
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    handler.addFilter(SamplingFilter())
+    logger.handlers = [handler]
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    return logger
+
+
+def log_event(level: int, event: str, **fields) -> None:
+    """Log an event with structured fields; cheap no-op when the level or sample is off"""
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and not _request_sampled.get():
+        return
+    logger.log(level, event, extra={"fields": fields})
+
+
+def debug_features_enabled() -> bool:
+    """True when the current request asked for feature-vector dumps"""
+    return _debug_features.get()
+
+
+@contextmanager
+def request_log_context(sampled: bool = True, debug_features: bool = False):
+    """Set per-request logging state for the enclosed block"""
+    sampled_token = _request_sampled.set(sampled)
+    debug_token = _debug_features.set(debug_features)
+    try:
+        yield
+    finally:
+        _request_sampled.reset(sampled_token)
+        _debug_features.reset(debug_token)
+
+
+class RequestLogContextMiddleware:
+    """
+    ASGI middleware deciding per request whether it is sampled and whether
+    feature dumps are enabled. When an admin token is configured, the debug
+    header is only honored together with a valid X-Admin-Token.
+    """
+
+    def __init__(self, app, admin_token: Optional[str] = None):
+        self.app = app
+        self.admin_token = admin_token
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        debug = headers.get(DEBUG_HEADER, b"").lower() in (b"1", b"true", b"yes")
+        if debug and self.admin_token:
+            debug = headers.get(ADMIN_TOKEN_HEADER, b"").decode("latin-1") == self.admin_token
+        sampled = debug or LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
+
+        start = time.perf_counter()
+        with request_log_context(sampled=sampled, debug_features=debug):
+            await self.app(scope, receive, send)
+            log_event(
+                logging.DEBUG, "request_finished",
+                method=scope.get("method"), path=scope.get("path"),
+                duration_ms=round((time.perf_counter() - start) * 1000, 3)
+            )
@@ -0,0 +1,228 @@
+"""
+Catalog and model state shared by all uvicorn worker processes.
+
+With SHARED_DATA_DIR set, each catalog version is written once as a directory
+of .npy files and every worker memory-maps it. The columns, ID order, sorted
+IDs and field index then live once in the page cache instead of being copied
+into every process. String columns are stored as integer codes plus a small
+vocabulary and stay codes once attached (constraints compare codes), so a
+worker holds no per-program objects.
+
+    <root>/catalog-<version>/   arrays (*.npy) and meta.json
+    <root>/catalog-<version>/compact/
+                                compact program features (RECOMMEND_SCORING=compact),
+                                written by the first worker that needs them
+    <root>/logits-<hash>-<model>.npy
+                                program logits of a catalog content hash under a
+                                model token (decomposed scoring), written by the
+                                first worker that needs them
+    <root>/CATALOG              name of the current catalog directory
+    <root>/MODEL                model file every worker should serve
+    <root>/.lock                serializes publishers so versions stay unique
+
+Pointer files are replaced atomically. Workers poll them and attach to
+whatever is current, so all workers converge on the same catalog version and
+model file whichever worker received the admin call.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+
+from catalog import ProgramCatalog, ProgramIndex
+from compact_features import CompactProgramFeatures
+from program_features import ProgramColumns
+
+NUMERIC_COLUMNS = ("program_id", "university_id", "field_id", "tuition_fee", "duration_months", "level_idx")
+# Column name -> (ProgramColumns codes attribute, vocabulary attribute)
+STRING_COLUMNS = {"level": ("level_codes", "level_vocab"), "university_state": ("state_codes", "state_vocab")}
+
+# Catalog versions kept on disk: the current one and its predecessor
+# (workers that have not synced yet keep using the previous mapping)
+KEEP_CATALOG_VERSIONS = 2
+
+
+class SharedStore:
+    """Publishes and attaches shared catalog versions and the active model path under root"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # ===== CATALOG =====
+
+    def catalog_pointer(self) -> Optional[str]:
+        """Directory name of the current catalog version, or None before the first publish"""
+        return self._read(os.path.join(self.root, "CATALOG"))
+
+    def catalog_version(self) -> Optional[int]:
+        """Version number of the current catalog, or None before the first publish"""
+        name = self.catalog_pointer()
+        return int(name.split("-", 1)[1]) if name else None
+
+    def publish_catalog(self, columns: ProgramColumns, source: str, if_absent: bool = False) -> ProgramCatalog:
+        """
+        Validate columns and publish them as the next catalog version; returns
+        it attached. With if_absent, an already published catalog is attached
+        instead (every worker calls this at startup, only the first publishes).
+        """
+        with self.lock():
+            current = self.catalog_pointer()
+            if if_absent and current is not None:
+                return self.attach_catalog(current)
+
+            version = self._load_meta(current)["version"] + 1 if current else 1
+            catalog = ProgramCatalog(columns, version=version, source=source)
+            name = f"catalog-{version}"
+            staging = tempfile.mkdtemp(prefix=".publishing-", dir=self.root)
+            self._write_catalog(staging, catalog)
+            os.rename(staging, os.path.join(self.root, name))
+            self._write(os.path.join(self.root, "CATALOG"), name)
+            self._prune(version)
+        return self.attach_catalog(name)
+
+    def attach_catalog(self, name: Optional[str] = None) -> Optional[ProgramCatalog]:
+        """Memory-mapped catalog for a published version (default: the current one)"""
+        name = name or self.catalog_pointer()
+        if name is None:
+            return None
+        path = os.path.join(self.root, name)
+        meta = self._load_meta(name)
+
+        def mapped(array_name: str) -> np.ndarray:
+            return np.load(os.path.join(path, array_name + ".npy"), mmap_mode="r")
+
+        columns = ProgramColumns(
+            **{column: mapped(column) for column in NUMERIC_COLUMNS},
+            level=mapped("level_codes"), level_vocab=meta["vocab"]["level"],
+            university_state=mapped("university_state_codes"), state_vocab=meta["vocab"]["university_state"],
+        )
+        index = ProgramIndex.from_arrays(mapped("index_keys"), mapped("index_rows"), meta["index_buckets"])
+        return ProgramCatalog(
+            columns, version=meta["version"], source=meta["source"], loaded_at=meta["loaded_at"],
+            columns_hash=meta["content_hash"], order=mapped("order"), index=index,
+            # Versions published before sorted IDs were shared compute them on attach
+            sorted_ids=mapped("sorted_ids") if os.path.exists(os.path.join(path, "sorted_ids.npy")) else None
+        )
+
+    # ===== PROGRAM LOGITS =====
+
+    def program_logits(self, content_hash: str, model_token: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Memory-mapped program logits of a catalog under a model. The first
+        worker to ask computes and publishes them; the others map that file.
+        """
+        path = os.path.join(self.root, f"logits-{content_hash}-{model_token.replace(':', '-')}.npy")
+        if not os.path.exists(path):
+            with self.lock():
+                if not os.path.exists(path):
+                    staging = path + ".tmp.npy"
+                    np.save(staging, compute())
+                    os.replace(staging, path)
+        return np.load(path, mmap_mode="r")
+
+    # ===== COMPACT FEATURES =====
+
+    def compact_features(self, catalog: ProgramCatalog,
+                         build: Callable[[], CompactProgramFeatures]) -> Optional[CompactProgramFeatures]:
+        """
+        Memory-mapped compact features of a published catalog version. The
+        first worker to ask builds and publishes them; the others map them.
+        None when the version is no longer on disk.
+        """
+        catalog_path = os.path.join(self.root, f"catalog-{catalog.version}")
+        path = os.path.join(catalog_path, "compact")
+        if not os.path.isdir(path):
+            with self.lock():
+                if not os.path.isdir(catalog_path):
+                    return None
+                if not os.path.isdir(path):
+                    features = build()
+                    staging = tempfile.mkdtemp(prefix=".publishing-", dir=catalog_path)
+                    for name in CompactProgramFeatures.ARRAYS:
+                        np.save(os.path.join(staging, name + ".npy"), getattr(features, name))
+                    os.rename(staging, path)
+        return CompactProgramFeatures(**{
+            name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in CompactProgramFeatures.ARRAYS
+        })
+
+    # ===== MODEL =====
+
+    def model_path(self) -> Optional[str]:
+        """Model file published by the last model switch, or None"""
+        return self._read(os.path.join(self.root, "MODEL"))
+
+    def publish_model_path(self, path: str) -> None:
+        with self.lock():
+            self._write(os.path.join(self.root, "MODEL"), path)
+
+    # ===== INTERNALS =====
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock shared by every process using this store"""
+        with open(os.path.join(self.root, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_catalog(self, path: str, catalog: ProgramCatalog) -> None:
+        columns = catalog.columns
+        vocab = {}
+        for column in NUMERIC_COLUMNS:
+            np.save(os.path.join(path, column + ".npy"), np.ascontiguousarray(getattr(columns, column)))
+        for column, (codes, values) in STRING_COLUMNS.items():
+            vocab[column] = getattr(columns, values).tolist()
+            np.save(os.path.join(path, column + "_codes.npy"), np.ascontiguousarray(getattr(columns, codes), np.int32))
+        keys, rows, buckets = catalog.index.to_arrays()
+        np.save(os.path.join(path, "index_keys.npy"), keys)
+        np.save(os.path.join(path, "index_rows.npy"), rows)
+        np.save(os.path.join(path, "order.npy"), catalog._order)
+        np.save(os.path.join(path, "sorted_ids.npy"), catalog._sorted_ids)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "version": catalog.version,
+                "source": catalog.source,
+                "loaded_at": catalog.loaded_at,
+                "content_hash": catalog.content_hash,
+                "vocab": vocab,
+                "index_buckets": buckets,
+            }, f)
+
+    def _load_meta(self, name: str) -> dict:
+        with open(os.path.join(self.root, name, "meta.json")) as f:
+            return json.load(f)
+
+    def _prune(self, version: int) -> None:
+        # Unlinking a mapped file is safe: existing mappings stay valid until released
+        for name in os.listdir(self.root):
+            if name.startswith("catalog-") and int(name.split("-", 1)[1]) <= version - KEEP_CATALOG_VERSIONS:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        # Program logits go with the last catalog version of their content
+        kept = {self._load_meta(name)["content_hash"] for name in os.listdir(self.root) if name.startswith("catalog-")}
+        for name in os.listdir(self.root):
+            if name.startswith("logits-") and name.split("-")[1] not in kept:
+                os.remove(os.path.join(self.root, name))
+
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write(path: str, value: str) -> None:
+        staging = path + ".tmp"
+        with open(staging, "w") as f:
+            f.write(value)
+        os.replace(staging, path)
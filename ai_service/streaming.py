@@ -0,0 +1,61 @@
+"""
+NDJSON streaming helpers for bulk scoring endpoints.
+Input lines are read from the request body as they arrive and results are
+written back line by line, so memory stays bounded by the chunk size.
+"""
+
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from json_response import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator may keep reading the request body.
+
+    The stock StreamingResponse listens for client disconnects on the same
+    receive channel, which would swallow request body chunks. Here the
+    generator owns the receive channel; a disconnect surfaces as ClientDisconnect
+    while reading the request stream and ends the response.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yield non-empty lines from a request body as it is received"""
+    buffer = b""
+    async for body_chunk in request.stream():
+        buffer += body_chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_chunks(request: Request, chunk_size: int) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    """Group NDJSON lines into chunks of (line_index, line) pairs"""
+    chunk = []
+    index = 0
+    async for line in iter_ndjson_lines(request):
+        chunk.append((index, line))
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ndjson_line(payload: dict) -> bytes:
+    return dumps(payload) + b"\n"
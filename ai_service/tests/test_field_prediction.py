@@ -0,0 +1,89 @@
+"""
+Field names of /predict-fields come from the label classes stored in the
+model's preprocessing artifact, and the registry rejects a model whose class
+count does not match them.
+
+Run from ai_service/:
+    python -m pytest tests
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from field_prediction import (  # noqa: E402
+    DEFAULT_PREPROCESSOR,
+    FIELD_CATEGORIES,
+    FieldPreprocessor,
+    preprocessing_path,
+    rank_field_probabilities,
+)
+from model_registry import ModelRegistry, ModelValidationError  # noqa: E402
+
+MODEL_FILE = "best_logistic_regression_model.pkl"
+
+
+class FittedEncoder:
+    def __init__(self, classes):
+        self.classes_ = np.array(classes)
+
+
+class FittedOneHot:
+    def __init__(self, categories):
+        self.categories_ = [np.array(categories)]
+
+
+class FittedScaler:
+    def __init__(self, n):
+        self.mean_, self.scale_ = np.zeros(n), np.ones(n)
+
+
+def test_from_fitted_stores_field_classes(tmp_path):
+    preprocessor = FieldPreprocessor.from_fitted(
+        FittedScaler(7), FittedScaler(7), FittedScaler(15), FittedOneHot(["SPM", "STPM"]),
+        FittedEncoder(["No", "Yes"]), FittedEncoder(["Law", "Engineering"])
+    )
+    path = str(tmp_path / "model.preprocessing.json")
+    preprocessor.save(path)
+    assert FieldPreprocessor.load(path).field_classes == ["Law", "Engineering"]
+
+    ranked = rank_field_probabilities(np.array([[0.3, 0.7]]), preprocessor)
+    assert ranked == [[("Engineering", 0.7), ("Law", 0.3)]]
+
+
+def test_names_fall_back_without_field_classes():
+    assert DEFAULT_PREPROCESSOR.field_classes is None
+    probs = np.full((1, len(FIELD_CATEGORIES)), 1 / len(FIELD_CATEGORIES))
+    assert [name for name, _ in rank_field_probabilities(probs)[0]] == FIELD_CATEGORIES
+    with pytest.raises(ValueError):
+        rank_field_probabilities(probs[:, :3])
+
+
+def registry_for(model_path: str) -> ModelRegistry:
+    def smoke_batch(version):
+        return np.zeros((4, version.preprocessor.n_features))
+    return ModelRegistry(model_path, "compiled", "float64", DEFAULT_PREPROCESSOR.n_features, smoke_batch)
+
+
+def test_registry_rejects_class_count_mismatch(tmp_path):
+    model_path = str(tmp_path / MODEL_FILE)
+    shutil.copy(os.path.join(SERVICE_DIR, "model", MODEL_FILE), model_path)
+    with open(preprocessing_path(os.path.join(SERVICE_DIR, "model", MODEL_FILE))) as f:
+        artifact = json.load(f)
+
+    with open(preprocessing_path(model_path), "w") as f:
+        json.dump(artifact, f)
+    assert registry_for(model_path).load().preprocessor.field_names == artifact["field_classes"]
+
+    # A retrained model's label classes no longer line up with its outputs
+    with open(preprocessing_path(model_path), "w") as f:
+        json.dump({**artifact, "field_classes": artifact["field_classes"][:-1]}, f)
+    with pytest.raises(ModelValidationError):
+        registry_for(model_path).load()
@@ -0,0 +1,198 @@
+"""
+Shared worker state (shared_store.py): attached catalogs match built ones
+without per-worker copies, and every uvicorn worker converges on the catalog
+version published through any one of them.
+
+Run from ai_service/:
+    python -m pytest tests
+"""
+
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, "benchmarks"))
+
+from catalog import ProgramCatalog  # noqa: E402
+from generators import student_profiles, synthetic_catalog  # noqa: E402
+from shared_store import SharedStore  # noqa: E402
+
+MODEL_FILE = "best_logistic_regression_model.pkl"
+SYNC_INTERVAL = 0.2
+LEVELS = ["Bachelor", "Diploma", "Foundation", "Master"]
+
+
+def test_attached_catalog_matches_built(tmp_path):
+    columns = synthetic_catalog(5000, seed=1)
+    built = ProgramCatalog(columns, version=1, source="test")
+    attached = SharedStore(str(tmp_path)).publish_catalog(columns, source="test")
+
+    assert attached.version == 1
+    assert attached.content_hash == built.content_hash
+    for field_id in range(1, 21):
+        for level in ("Bachelor", "Diploma", None):
+            assert np.array_equal(built.index.select(field_id, level, 60000.0),
+                                  attached.index.select(field_id, level, 60000.0))
+    ids = list(range(0, 5100, 7))
+    rows, missing = attached.rows_for_ids(ids)
+    assert (rows.tolist(), missing) == tuple(x.tolist() if isinstance(x, np.ndarray) else x
+                                             for x in built.rows_for_ids(ids))
+    for column in ("level", "university_state", "level_idx", "program_id"):
+        assert np.array_equal(getattr(attached.columns, column), getattr(built.columns, column))
+
+
+def test_attached_catalog_holds_no_per_worker_copies(tmp_path):
+    attached = SharedStore(str(tmp_path)).publish_catalog(synthetic_catalog(1000, seed=2), source="test")
+    columns = attached.columns
+    for array in (columns.program_id, columns.level_codes, columns.state_codes, columns.level_idx,
+                  attached._order, attached._sorted_ids):
+        assert isinstance(array, np.memmap)
+    # Only the vocabularies are per-worker objects
+    assert len(columns.level_vocab) < 10 and len(columns.state_vocab) < 20
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(port: int, method: str, path: str, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, body=json.dumps(body).encode() if body is not None else None,
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    except OSError:
+        return 0, None
+    finally:
+        conn.close()
+
+
+def _worker_states(port: int, workers: int, timeout: float = 90.0) -> dict:
+    """pid -> (catalog_version, model_version), over fresh connections until every worker answered"""
+    states, started = {}, time.monotonic()
+    while time.monotonic() - started < timeout:
+        status, body = _request(port, "GET", "/health")
+        if status == 200 and body["catalog_version"] is not None and body["model_version"] is not None:
+            states[body["worker_pid"]] = (body["catalog_version"], body["model_version"])
+            if len(states) == workers:
+                return states
+        else:
+            time.sleep(0.05)
+    pytest.fail(f"only {len(states)} of {workers} workers answered within {timeout}s")
+
+
+@pytest.mark.parametrize("workers", [2])
+def test_workers_converge_on_published_catalog(tmp_path, workers):
+    snapshot = tmp_path / "programs.json"
+    snapshot.write_text(json.dumps([
+        {"program_id": i, "university_id": 1, "field_id": 3, "level": "Bachelor"} for i in range(1, 51)
+    ]))
+    # Model copy: shared mode writes the compiled artifact next to the model file
+    shutil.copytree(os.path.join(SERVICE_DIR, "model"), tmp_path / "model")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PROGRAM_CATALOG_PATH": str(snapshot),
+        "MODEL_PATH": str(tmp_path / "model" / MODEL_FILE),
+        "SHARED_DATA_DIR": str(tmp_path / "shared"),
+        "SHARED_SYNC_INTERVAL_SECONDS": str(SYNC_INTERVAL),
+        "MODEL_WATCH_INTERVAL_SECONDS": "0",
+        "INFERENCE_WORKERS": "1",
+        "LOG_LEVEL": "WARNING",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        before = _worker_states(port, workers)
+        assert {version for version, _ in before.values()} == {1}
+
+        status, info = _request(port, "PUT", "/admin/catalog", {"programs": [
+            {"program_id": i, "university_id": 2, "field_id": 4, "level": LEVELS[i % len(LEVELS)]}
+            for i in range(1, 101)
+        ]})
+        assert status == 200 and info["version"] == 2
+
+        deadline = time.monotonic() + 30
+        while True:
+            after = _worker_states(port, workers)
+            if set(after.values()) == {(2, before[next(iter(before))][1])}:
+                break
+            assert time.monotonic() < deadline, f"workers did not converge on catalog v2: {after}"
+            time.sleep(SYNC_INTERVAL)
+
+        # Whichever workers score, the catalog's program logits are published once
+        for profile in student_profiles(8, seed=6):
+            status, body = _request(port, "POST", "/recommend",
+                                    {"student_profile": {**profile.model_dump(mode="json"), "field_ids": [4]}, "field_id": 4})
+            assert status == 200 and body["recommendations"]
+        assert len([name for name in os.listdir(tmp_path / "shared") if name.startswith("logits-")]) == 1
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def test_program_logits_are_computed_once_and_shared(tmp_path):
+    import main
+    from decomposed_scoring import ProgramLogitsCache, program_logits
+
+    active = main.load_model()
+    published = SharedStore(str(tmp_path)).publish_catalog(synthetic_catalog(2000, seed=3), source="test")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return program_logits(active.scorer, published.columns)
+
+    # Two workers: separate stores and attached catalogs over the same root
+    first = SharedStore(str(tmp_path)).program_logits(published.content_hash, active.token, compute)
+    other = SharedStore(str(tmp_path))
+    second = ProgramLogitsCache(other).get(other.attach_catalog(), active.scorer, active.token)
+
+    assert len(calls) == 1
+    assert isinstance(second, np.memmap) and second.filename == first.filename
+    assert np.array_equal(second, program_logits(active.scorer, published.columns))
+
+    # Logits leave with the last catalog version of their content
+    store = SharedStore(str(tmp_path))
+    store.publish_catalog(synthetic_catalog(10, seed=4), source="test")
+    store.publish_catalog(synthetic_catalog(20, seed=5), source="test")
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("logits-")]
+    main.inference_pool.shutdown()
+
+
+def test_compact_features_are_built_once_and_shared(tmp_path):
+    from compact_features import CompactFeatureCache, CompactProgramFeatures
+
+    columns = synthetic_catalog(2000, seed=7)
+    published = SharedStore(str(tmp_path)).publish_catalog(columns, source="test")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return CompactProgramFeatures.from_columns(published.columns)
+
+    SharedStore(str(tmp_path)).compact_features(published, build)
+    other = SharedStore(str(tmp_path))
+    shared = CompactFeatureCache(other).get(other.attach_catalog())
+
+    assert len(builds) == 1
+    expected = CompactProgramFeatures.from_columns(columns)
+    for name in CompactProgramFeatures.ARRAYS:
+        assert isinstance(getattr(shared, name), np.memmap)
+        assert np.array_equal(getattr(shared, name), getattr(expected, name))
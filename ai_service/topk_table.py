@@ -0,0 +1,257 @@
+"""
+Materialized top-K table for /recommend.
+
+Catalog requests by field_id whose profile lies exactly on a fixed grid are
+answered from a table built offline by materialize_topk.py. A bucket is one
+combination of:
+
+    study_level       one of the grid's levels (exact spelling, as the features use it)
+    field_id          the request's field_id
+    field match       field_ids empty, or containing field_id (any other field_ids
+                      reject every candidate and are scored live)
+    cgpa              one of the grid's values, or none (missing or 0)
+    budget            one of the grid's values, or none (missing or 0)
+    preferred_states  one of the grid's state sets (order and duplicates ignored)
+
+Each bucket holds the ranked top K program IDs and scores and the constraint
+stats that live scoring returns for it. The bucket index is computed from the
+grid positions (mixed radix), so a lookup is a few dict lookups and one row
+read. The arrays are memory-mapped, and worker processes share their pages.
+
+A table serves only while the catalog content, the model token and the scoring
+mode it was built with are the ones serving; otherwise every request is scored
+live. Layout (a directory, written under a temporary name and renamed into place):
+
+    meta.json        grid, top_k, catalog content hash, model token, scoring mode
+    program_ids.npy  (buckets, top_k) int32 (int64 for larger IDs), padded with -1
+    scores.npy       (buckets, top_k) scores in the scorer's dtype
+    counts.npy       (buckets,) int32 entries stored per bucket
+    stats.npy        (buckets, 6) int32 candidates, passed, rejected by level/field/budget/location
+"""
+
+import itertools
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Column order of stats.npy
+STATS_COLUMNS = ("candidates", "passed", "level", "field", "budget", "location")
+
+
+class BucketGrid:
+    """The profile values a table is materialized for, and their bucket index"""
+
+    def __init__(self, levels: Sequence[str], field_ids: Sequence[int], cgpa: Sequence[Optional[float]],
+                 budgets: Sequence[Optional[float]], state_sets: Sequence[Sequence[str]]):
+        self.levels = list(levels)
+        self.field_ids = [int(f) for f in field_ids]
+        self.cgpa = [None if not v else float(v) for v in cgpa]
+        self.budgets = [None if not v else float(v) for v in budgets]
+        self.state_sets = [sorted(set(states)) for states in state_sets]
+
+        self._level_pos = {v: i for i, v in enumerate(self.levels)}
+        self._field_pos = {v: i for i, v in enumerate(self.field_ids)}
+        self._cgpa_pos = {v: i for i, v in enumerate(self.cgpa)}
+        self._budget_pos = {v: i for i, v in enumerate(self.budgets)}
+        self._states_pos = {tuple(v): i for i, v in enumerate(self.state_sets)}
+        for name, values, positions in (
+            ("levels", self.levels, self._level_pos), ("field_ids", self.field_ids, self._field_pos),
+            ("cgpa", self.cgpa, self._cgpa_pos), ("budgets", self.budgets, self._budget_pos),
+            ("state_sets", self.state_sets, self._states_pos),
+        ):
+            if not values or len(positions) != len(values):
+                raise ValueError(f"Grid {name} must be non-empty and distinct")
+
+        self.shape = (len(self.levels), len(self.field_ids), 2, len(self.cgpa), len(self.budgets),
+                      len(self.state_sets))
+
+    def __len__(self) -> int:
+        return int(np.prod(self.shape))
+
+    def index(self, student_profile, field_id: int) -> Optional[int]:
+        """Bucket of a profile requesting field_id, or None when it is off the grid"""
+        if student_profile.field_ids:
+            if field_id not in student_profile.field_ids:
+                return None
+            match = 1
+        else:
+            match = 0
+        positions = (
+            self._level_pos.get(student_profile.study_level),
+            self._field_pos.get(field_id),
+            match,
+            self._cgpa_pos.get(student_profile.cgpa or None),
+            self._budget_pos.get(student_profile.budget or None),
+            self._states_pos.get(tuple(sorted(set(student_profile.preferred_states)))),
+        )
+        if None in positions:
+            return None
+        index = 0
+        for position, size in zip(positions, self.shape):
+            index = index * size + position
+        return index
+
+    def base_combinations(self) -> Iterator[Tuple[int, int, dict]]:
+        """
+        (first bucket index, field_id, StudentProfile fields) for every grid
+        point with no preferred states. The len(state_sets) buckets from the
+        first one differ only in preferred_states, in state_sets order.
+        """
+        n_states = len(self.state_sets)
+        for index, (level, field_id, match, cgpa, budget) in enumerate(itertools.product(
+            self.levels, self.field_ids, (0, 1), self.cgpa, self.budgets
+        )):
+            yield index * n_states, field_id, {
+                "study_level": level,
+                "field_ids": [field_id] if match else [],
+                "cgpa": cgpa,
+                "budget": budget,
+            }
+
+    def to_dict(self) -> dict:
+        return {
+            "levels": self.levels,
+            "field_ids": self.field_ids,
+            "cgpa": self.cgpa,
+            "budgets": self.budgets,
+            "state_sets": self.state_sets,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BucketGrid":
+        return cls(data["levels"], data["field_ids"], data["cgpa"], data["budgets"], data["state_sets"])
+
+
+class TopKTable:
+    """A materialized table loaded (memory-mapped) from disk"""
+
+    def __init__(self, path: str, meta: dict, program_ids: np.ndarray, scores: np.ndarray,
+                 counts: np.ndarray, stats: np.ndarray):
+        self.path = path
+        self.meta = meta
+        self.grid = BucketGrid.from_dict(meta["grid"])
+        self.top_k = meta["top_k"]
+        self.program_ids = program_ids
+        self.scores = scores
+        self.counts = counts
+        self.stats = stats
+
+    @classmethod
+    def load(cls, path: str) -> "TopKTable":
+        """Raises FileNotFoundError when there is no table at path and ValueError when it is invalid"""
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Top-K table not found at {path}")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported top-K table format {meta.get('format')!r}")
+
+        def array(name: str) -> np.ndarray:
+            # Plain ndarray view of the mapping: np.memmap indexing is slower per lookup
+            return np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+
+        table = cls(path, meta, array("program_ids.npy"), array("scores.npy"), array("counts.npy"),
+                    array("stats.npy"))
+        buckets = len(table.grid)
+        if table.program_ids.shape != (buckets, table.top_k) or table.scores.shape != (buckets, table.top_k) \
+                or table.counts.shape != (buckets,) or table.stats.shape != (buckets, len(STATS_COLUMNS)):
+            raise ValueError(f"Top-K table arrays do not match its grid ({buckets} buckets, top_k={table.top_k})")
+        return table
+
+    def serves(self, catalog_hash: str, model_token: str, scoring: str) -> bool:
+        """Whether the table was built from this catalog content, model and scoring mode"""
+        meta = self.meta
+        return meta["catalog_hash"] == catalog_hash and meta["model_token"] == model_token \
+            and meta["scoring"] == scoring
+
+    def lookup(self, student_profile, field_id: int,
+               top_k: Optional[int]) -> Optional[Tuple[np.ndarray, np.ndarray, dict]]:
+        """
+        (ranked program IDs, scores, constraint_stats) for a request in one of
+        the buckets, or None when it is off the grid or asks for more than the
+        bucket holds.
+        """
+        bucket = self.grid.index(student_profile, field_id)
+        if bucket is None:
+            return None
+        count = int(self.counts[bucket])
+        candidates, passed, level, field, budget, location = self.stats[bucket].tolist()
+        if top_k is None or top_k > count:
+            if passed > count:
+                return None
+            top_k = count
+        return self.program_ids[bucket, :top_k], self.scores[bucket, :top_k], {
+            "candidates": candidates,
+            "passed": passed,
+            "rejected_by": {"level": level, "field": field, "budget": budget, "location": location},
+        }
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "buckets": len(self.grid),
+            "top_k": self.top_k,
+            "built_at": self.meta.get("built_at"),
+            "catalog_source": self.meta.get("catalog_source"),
+            "catalog_hash": self.meta["catalog_hash"],
+            "model_token": self.meta["model_token"],
+            "scoring": self.meta["scoring"],
+            "grid": {name: len(values) for name, values in self.grid.to_dict().items()},
+        }
+
+
+def save_table(path: str, grid: BucketGrid, top_k: int, program_ids: np.ndarray, scores: np.ndarray,
+               counts: np.ndarray, stats: np.ndarray, catalog_hash: str, catalog_source: str,
+               model_token: str, scoring: str) -> None:
+    """Write a table directory to path; readers never see a partial one"""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".materializing-", dir=parent)
+    if program_ids.size and int(program_ids.max()) <= np.iinfo(np.int32).max \
+            and int(program_ids.min()) >= np.iinfo(np.int32).min:
+        program_ids = program_ids.astype(np.int32)
+    np.save(os.path.join(staging, "program_ids.npy"), program_ids)
+    np.save(os.path.join(staging, "scores.npy"), scores)
+    np.save(os.path.join(staging, "counts.npy"), counts.astype(np.int32))
+    np.save(os.path.join(staging, "stats.npy"), stats.astype(np.int32))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "grid": grid.to_dict(),
+            "top_k": top_k,
+            "catalog_hash": catalog_hash,
+            "catalog_source": catalog_source,
+            "model_token": model_token,
+            "scoring": scoring,
+        }, f)
+
+    if os.path.isdir(path):
+        # Swap the old table out first; a reader that already mapped it keeps its pages
+        retired = tempfile.mkdtemp(prefix=".retired-", dir=parent)
+        os.rename(path, os.path.join(retired, "table"))
+        os.rename(staging, path)
+        _remove_tree(retired)
+    else:
+        os.rename(staging, path)
+
+
+def _remove_tree(path: str) -> None:
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            os.remove(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(path)
+
+
+def default_state_sets(states: List[str]) -> List[List[str]]:
+    """No preference, then each state on its own"""
+    return [[]] + [[state] for state in sorted(set(states)) if state]
@@ -534,6 +534,7 @@ export class AIService {
             preferred_states: studentProfile.preferredStates,
           },
           programs: programsForML,
+          top_k: 5,
         };
 
         this.logger.log(
@@ -1,4 +1,4 @@
-import { ApiProperty } from '@nestjs/swagger';
+import { ApiProperty, ApiPropertyOptional } from '@nestjs/swagger';
 
 export class AIRecommendationRequestDto {
   @ApiProperty({
@@ -40,5 +40,12 @@ export class AIRecommendationRequestDto {
     duration_months?: number;
     level: string;
   }>;
+
+  @ApiPropertyOptional({
+    description:
+      'Return only the K highest-scoring programs (all programs when omitted)',
+    example: 5,
+  })
+  top_k?: number;
 }
 